@@ -0,0 +1,8 @@
+"""
+Benchmarks of the catalog plugin.
+
+They run against the SQLite test settings and the `CourseOverviewTestModel`
+backend on a throwaway test database, e.g.:
+
+    python -m benchmarks.query_plans
+"""
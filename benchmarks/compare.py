@@ -0,0 +1,104 @@
+"""
+Compare two benchmark result files and report the regressions.
+
+A benchmark regresses when its median time grows by more than `--threshold`
+(and by more than `--min-seconds`), when it runs more queries or when it starts
+failing. The exit status is 1 when any benchmark regressed.
+
+Usage:
+    python -m benchmarks.compare base.json head.json [--threshold 0.25] [--min-seconds 0.001]
+"""
+import argparse
+import json
+import sys
+
+
+def load_results(path):
+    """Return the results of a benchmark file."""
+    with open(path, encoding='utf-8') as results_file:
+        return json.load(results_file)['results']
+
+
+def compare(base, head, threshold, min_seconds):
+    """
+    Compare the results of two runs.
+
+    Args:
+        base (dict): Results of the reference run, indexed by benchmark name.
+        head (dict): Results of the run under test, indexed by benchmark name.
+        threshold (float): Relative slowdown tolerated, e.g. 0.25 for 25%.
+        min_seconds (float): Absolute slowdown ignored regardless of the ratio.
+
+    Returns:
+        list[tuple]: (name, base median, head median, ratio, base queries, head queries, status) rows.
+    """
+    rows = []
+
+    for name in sorted(set(base) | set(head)):
+        base_result, head_result = base.get(name), head.get(name)
+
+        if base_result is None or head_result is None:
+            rows.append((name, None, None, None, None, None, 'added' if base_result is None else 'removed'))
+            continue
+        if 'error' in head_result:
+            rows.append((name, None, None, None, None, None, 'still failing' if 'error' in base_result else 'error'))
+            continue
+        if 'error' in base_result:
+            rows.append((name, None, None, None, None, None, 'fixed'))
+            continue
+
+        base_seconds, head_seconds = base_result['median_seconds'], head_result['median_seconds']
+        ratio = head_seconds / base_seconds if base_seconds else None
+        status = 'ok'
+        if head_result['queries'] > base_result['queries']:
+            status = 'more queries'
+        elif ratio and ratio > 1 + threshold and head_seconds - base_seconds > min_seconds:
+            status = 'slower'
+        elif ratio and ratio < 1 / (1 + threshold) and base_seconds - head_seconds > min_seconds:
+            status = 'faster'
+        rows.append((
+            name,
+            base_seconds,
+            head_seconds,
+            ratio,
+            base_result['queries'],
+            head_result['queries'],
+            status,
+        ))
+
+    return rows
+
+
+def format_number(value, pattern):
+    """Format a number, or a dash when it is missing."""
+    return '-' if value is None else pattern.format(value)
+
+
+def main(argv=None):
+    """Print the comparison table and exit with status 1 on regressions."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('base', help='Results of the reference commit.')
+    parser.add_argument('head', help='Results of the commit under test.')
+    parser.add_argument('--threshold', type=float, default=0.25, help='Relative slowdown tolerated.')
+    parser.add_argument('--min-seconds', type=float, default=0.001, help='Absolute slowdown always tolerated.')
+    options = parser.parse_args(argv)
+
+    rows = compare(load_results(options.base), load_results(options.head), options.threshold, options.min_seconds)
+    width = max((len(row[0]) for row in rows), default=10)
+
+    print(f'{"benchmark":<{width}}  {"base s":>10}  {"head s":>10}  {"ratio":>6}  {"queries":>9}  status')
+    for name, base_seconds, head_seconds, ratio, base_queries, head_queries, status in rows:
+        queries = '-' if base_queries is None else f'{base_queries}->{head_queries}'
+        print(
+            f'{name:<{width}}  {format_number(base_seconds, "{:.4f}"):>10}  {format_number(head_seconds, "{:.4f}"):>10}'
+            f'  {format_number(ratio, "{:.2f}"):>6}  {queries:>9}  {status}',
+        )
+
+    regressions = [row for row in rows if row[-1] in ('slower', 'more queries', 'error')]
+    if regressions:
+        print(f'\n{len(regressions)} regression(s).')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
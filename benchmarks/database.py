@@ -0,0 +1,33 @@
+"""Throwaway database helpers shared by the benchmarks."""
+import os
+from contextlib import contextmanager
+
+import django
+
+
+def setup_django():
+    """Configure Django with the test settings unless another settings module is selected."""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'test_settings')
+    django.setup()
+
+
+@contextmanager
+def benchmark_database():
+    """Create a test database for the duration of the block and destroy it afterwards."""
+    from django.db import connection  # pylint: disable=import-outside-toplevel
+
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def analyze(connection, models):
+    """Refresh the planner statistics of the given models so the query plans reflect the seeded data."""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'mysql':
+            tables = ', '.join(connection.ops.quote_name(model._meta.db_table) for model in models)
+            cursor.execute(f'ANALYZE TABLE {tables}')
+        else:
+            cursor.execute('ANALYZE')
@@ -0,0 +1,144 @@
+"""
+Show the query plans of the catalog access patterns without and with the indexes of migration 0007.
+
+The indexes declared by the models are dropped to reproduce the plans before the
+migration, then created again to show the plans after it. On PostgreSQL the
+trigram indexes are included as well. The unique constraint on
+`AvailableCourse.course` is left in place, since the foreign key index already
+covers lookups on that column alone.
+
+Usage:
+    python -m benchmarks.query_plans [--courses 5000] [--catalogs 1000]
+"""
+import argparse
+import datetime
+from importlib import import_module
+
+from benchmarks.database import analyze, benchmark_database, setup_django
+
+BATCH_SIZE = 1000
+
+
+def seed(courses, catalogs):
+    """Create course overviews, one available course per overview and plain catalogs."""
+    # pylint: disable=import-outside-toplevel
+    from catalog_plugin.edxapp_wrapper.course_module import course_overview
+    from catalog_plugin.models import AvailableCourse, FlexibleCatalogModel
+
+    overview_model = course_overview()
+    overview_model.objects.bulk_create(
+        [
+            overview_model(id=f'course-v1:Bench+C{index}+2024', display_name=f'Course {index}')
+            for index in range(courses)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    AvailableCourse.objects.bulk_create(
+        [
+            AvailableCourse(course_id=f'course-v1:Bench+C{index}+2024', active=index % 2 == 0)
+            for index in range(courses)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    FlexibleCatalogModel.objects.bulk_create(
+        [FlexibleCatalogModel(name=f'Catalog {index}', slug=f'catalog-{index}') for index in range(catalogs)],
+        batch_size=BATCH_SIZE,
+    )
+
+
+def get_access_patterns():
+    """Return the labelled querysets issued by the API clients, filters and paginators."""
+    # pylint: disable=import-outside-toplevel
+    from catalog_plugin.models import AvailableCourse, FlexibleCatalogModel
+
+    now = datetime.datetime.now(datetime.timezone.utc)
+
+    return {
+        'AvailableCourse by course and active': AvailableCourse.objects.filter(
+            course_id='course-v1:Bench+C10+2024',
+            active=True,
+        ),
+        'Catalogs created in a range': FlexibleCatalogModel.objects.filter(
+            created__gte=now - datetime.timedelta(days=1),
+            created__lte=now,
+        ),
+        'Cursor page on created and id': FlexibleCatalogModel.objects.filter(
+            created__gt=now - datetime.timedelta(days=1),
+        ).order_by('created', 'id')[:100],
+        'Catalogs modified since': FlexibleCatalogModel.objects.filter(modified__gte=now - datetime.timedelta(hours=1)),
+        'Catalog name search': FlexibleCatalogModel.objects.filter(name__icontains='log 12'),
+    }
+
+
+def get_trigram_migration():
+    """Return the migration module that creates the trigram indexes."""
+    return import_module('catalog_plugin.migrations.0007_catalog_indexes')
+
+
+def drop_indexes(connection):
+    """Drop the indexes added by migration 0007."""
+    # pylint: disable=import-outside-toplevel
+    from django.apps import apps
+
+    from catalog_plugin.models import AvailableCourse, FlexibleCatalogModel
+
+    with connection.schema_editor() as schema_editor:
+        for model in (AvailableCourse, FlexibleCatalogModel):
+            for index in model._meta.indexes:
+                schema_editor.remove_index(model, index)
+        get_trigram_migration().drop_trigram_indexes(apps, schema_editor)
+
+
+def create_indexes(connection):
+    """Create the indexes added by migration 0007."""
+    # pylint: disable=import-outside-toplevel
+    from django.apps import apps
+
+    from catalog_plugin.models import AvailableCourse, FlexibleCatalogModel
+
+    with connection.schema_editor() as schema_editor:
+        for model in (AvailableCourse, FlexibleCatalogModel):
+            for index in model._meta.indexes:
+                schema_editor.add_index(model, index)
+        get_trigram_migration().create_trigram_indexes(apps, schema_editor)
+
+
+def explain_all():
+    """Return the query plan of every access pattern."""
+    return {label: queryset.explain() for label, queryset in get_access_patterns().items()}
+
+
+def main(argv=None):
+    """Seed a throwaway database and print the plans without and with the indexes."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--courses', type=int, default=5000, help='Number of course overviews to create.')
+    parser.add_argument('--catalogs', type=int, default=1000, help='Number of catalogs to create.')
+    options = parser.parse_args(argv)
+
+    setup_django()
+
+    # pylint: disable=import-outside-toplevel
+    from catalog_plugin.models import AvailableCourse, FlexibleCatalogModel
+
+    with benchmark_database() as connection:
+        seed(options.courses, options.catalogs)
+
+        drop_indexes(connection)
+        analyze(connection, [AvailableCourse, FlexibleCatalogModel])
+        before = explain_all()
+
+        create_indexes(connection)
+        analyze(connection, [AvailableCourse, FlexibleCatalogModel])
+        after = explain_all()
+
+    print(f'Database: {connection.vendor}')
+    for label in before:
+        print(f'\n== {label}')
+        print('-- before')
+        print(before[label])
+        print('-- after')
+        print(after[label])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,381 @@
+"""
+Time the hot paths of the catalog plugin and record their query counts.
+
+A throwaway database is seeded with `benchmarks.seed`, then every benchmark runs
+`--repeat` times. The results are written as JSON, to be compared between commits
+with `benchmarks.compare`.
+
+Usage:
+    python -m benchmarks.run [--courses 10000] [--catalogs 250] [--fan-out 200] [--output results.json]
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+from benchmarks.database import analyze, benchmark_database, setup_django
+
+SAMPLE_SIZE = 20
+PAGE_SIZE = 100
+CLIENT_BATCH_SIZE = 100
+IMPORT_ROWS = 200
+INDEX_CHECKS = 10000
+
+
+def measure(func, repeat):
+    """
+    Run a benchmark `repeat` times.
+
+    Args:
+        func (callable): The benchmark. It returns the number of rows it produced.
+        repeat (int): Number of runs.
+
+    Returns:
+        dict: Median and minimum wall time in seconds, queries and rows of the last run.
+    """
+    # pylint: disable=import-outside-toplevel
+    from django.core.cache import cache
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    timings = []
+    queries = rows = 0
+
+    for _ in range(repeat):
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            start = time.perf_counter()
+            rows = func()
+            timings.append(time.perf_counter() - start)
+        queries = len(context.captured_queries)
+
+    return {
+        'median_seconds': statistics.median(timings),
+        'min_seconds': min(timings),
+        'queries': queries,
+        'rows': rows,
+    }
+
+
+def get_courses_benchmarks(catalog_ids):
+    """Return benchmarks evaluating `get_courses()` and `get_course_keys()` on a sample of every catalog type."""
+    # pylint: disable=import-outside-toplevel
+    from catalog_plugin.models import FlexibleCatalogModel
+
+    def evaluate(catalog_type):
+        sample_ids = catalog_ids[catalog_type][:SAMPLE_SIZE]
+        catalogs = list(FlexibleCatalogModel.objects.filter(pk__in=sample_ids).select_subclasses())
+        return lambda: sum(len(catalog.get_courses()) for catalog in catalogs)
+
+    def project(catalog_type):
+        sample_ids = catalog_ids[catalog_type][:SAMPLE_SIZE]
+        catalogs = list(FlexibleCatalogModel.objects.filter(pk__in=sample_ids).select_subclasses())
+        return lambda: sum(len(catalog.get_course_keys()) for catalog in catalogs)
+
+    return {
+        **{f'get_courses.{catalog_type}': evaluate(catalog_type) for catalog_type in catalog_ids},
+        **{f'get_course_keys.{catalog_type}': project(catalog_type) for catalog_type in catalog_ids},
+    }
+
+
+def api_benchmarks(user, course_keys):
+    """Return benchmarks requesting the first page of every v0 list endpoint."""
+    # pylint: disable=import-outside-toplevel
+    from rest_framework.test import APIRequestFactory, force_authenticate
+
+    from catalog_plugin.api.v0 import views
+
+    factory = APIRequestFactory()
+
+    def request(viewset, data=None):
+        def run():
+            request = factory.get('/', data={'page_size': PAGE_SIZE, **(data or {})})
+            force_authenticate(request, user=user)
+            response = viewset.as_view({'get': 'list'})(request)
+            response.render()
+            return len(response.data['results'])
+        return run
+
+    return {
+        'api.available_courses': request(views.AvailableCourseViewSet),
+        'api.flexible_catalogs': request(views.FlexibleCatalogViewSet),
+        'api.flexible_catalogs.expanded': request(views.FlexibleCatalogViewSet, {'expand': 'courses'}),
+        'api.fixed_catalogs': request(views.FixedCatalogViewSet),
+        'api.catalog_courses': request(views.CatalogCoursesViewSet),
+        'api.course_catalogs': request(views.CourseCatalogsViewSet, {'course_id': course_keys[:PAGE_SIZE]}),
+    }
+
+
+def client_benchmarks(catalog_ids, course_keys):
+    """Return benchmarks adding and then removing courses with the API clients."""
+    # pylint: disable=import-outside-toplevel
+    from opaque_keys.edx.keys import CourseKey
+
+    from catalog_plugin.api.catalog_api_client import (
+        AvailableCourseAPIClient,
+        CatalogCoursesAPIClient,
+        FixedCatalogAPIClient,
+    )
+
+    keys = [CourseKey.from_string(key) for key in course_keys[-CLIENT_BATCH_SIZE:]]
+    fixed_client = FixedCatalogAPIClient(catalog_ids['fixed'][0])
+    courses_client = CatalogCoursesAPIClient(catalog_ids['catalog_courses'][0])
+    fixed_ids = catalog_ids['fixed'][:SAMPLE_SIZE]
+    catalog_courses_ids = catalog_ids['catalog_courses'][:SAMPLE_SIZE]
+
+    def fixed_add_remove():
+        fixed_client.add_courses_to_fixed_catalog(keys)
+        fixed_client.remove_courses_from_fixed_catalog(keys)
+        return len(keys)
+
+    def catalog_courses_add_remove():
+        courses_client.add_courses_to_catalog(keys)
+        courses_client.remove_courses_from_catalog(keys)
+        return len(keys)
+
+    def fixed_bulk_add_remove():
+        results = FixedCatalogAPIClient.bulk_update_course_runs(fixed_ids, keys)
+        FixedCatalogAPIClient.bulk_update_course_runs(fixed_ids, keys, action='remove')
+        return sum(result['added'] for result in results.values())
+
+    def catalog_courses_bulk_add_remove():
+        results = CatalogCoursesAPIClient.bulk_update_courses(catalog_courses_ids, keys)
+        CatalogCoursesAPIClient.bulk_update_courses(catalog_courses_ids, keys, action='remove')
+        return sum(result['added'] for result in results.values())
+
+    def available_course_upsert():
+        AvailableCourseAPIClient.bulk_upsert_available_courses((key, False) for key in keys)
+        results = AvailableCourseAPIClient.bulk_upsert_available_courses((key, True) for key in keys)
+        return len(results['updated'])
+
+    return {
+        'client.fixed_catalog.add_remove': fixed_add_remove,
+        'client.catalog_courses.add_remove': catalog_courses_add_remove,
+        'client.fixed_catalog.bulk_add_remove': fixed_bulk_add_remove,
+        'client.catalog_courses.bulk_add_remove': catalog_courses_bulk_add_remove,
+        'client.available_course.bulk_upsert': available_course_upsert,
+    }
+
+
+def import_benchmarks(course_keys):
+    """Return benchmarks importing fixed catalogs, whose rows per second are `rows` over the median time."""
+    # pylint: disable=import-outside-toplevel
+    import itertools
+
+    from catalog_plugin.importer import CatalogImporter
+
+    runs = itertools.count()
+
+    def import_rows(dry_run):
+        def run():
+            prefix = f'import-{next(runs)}'
+            rows = (
+                (index, {
+                    'type': 'fixed',
+                    'name': f'{prefix}-{index}',
+                    'courses': course_keys[index * CLIENT_BATCH_SIZE % len(course_keys):][:CLIENT_BATCH_SIZE],
+                })
+                for index in range(IMPORT_ROWS)
+            )
+            results = CatalogImporter(dry_run=dry_run).import_rows(rows)
+            return sum(result['status'] != 'error' for result in results)
+        return run
+
+    return {
+        'import.fixed_catalogs': import_rows(dry_run=False),
+        'import.fixed_catalogs.dry_run': import_rows(dry_run=True),
+    }
+
+
+def admin_benchmarks(user):
+    """Return benchmarks rendering the admin changelist of every catalog model."""
+    # pylint: disable=import-outside-toplevel
+    from django.contrib import admin
+    from django.contrib.messages.storage.fallback import FallbackStorage
+    from django.test import RequestFactory
+
+    factory = RequestFactory()
+
+    def changelist(model_admin):
+        def run():
+            request = factory.get('/')
+            request.user = user
+            request.session = {}
+            request._messages = FallbackStorage(request)  # pylint: disable=protected-access
+            response = model_admin.changelist_view(request)
+            response.render()
+            return response.context_data['cl'].result_count
+        return run
+
+    return {
+        f'admin.{model._meta.model_name}.changelist': changelist(model_admin)
+        for model, model_admin in admin.site._registry.items()  # pylint: disable=protected-access
+        if model._meta.app_label == 'catalog_plugin'
+    }
+
+
+def async_benchmarks(catalog_ids):
+    """Return benchmarks looking up a sample of catalogs concurrently with `asyncio.gather`."""
+    # pylint: disable=import-outside-toplevel
+    import asyncio
+
+    from asgiref.sync import async_to_sync, sync_to_async
+
+    from catalog_plugin.api.catalog_api_client import FlexibleCatalogAPIClient
+    from catalog_plugin.membership import get_cached_course_keys
+
+    sample_ids = [catalog_id for ids in catalog_ids.values() for catalog_id in ids[:SAMPLE_SIZE]]
+
+    def gather(lookup, count_rows=len):
+        async def lookups():
+            clients = [FlexibleCatalogAPIClient(catalog_uuid=catalog_id) for catalog_id in sample_ids]
+            return await asyncio.gather(*(lookup(client) for client in clients))
+        return lambda: sum(count_rows(result) if count_rows else 1 for result in async_to_sync(lookups)())
+
+    def sync_courses(client):
+        return get_cached_course_keys(client.get_flexible_catalog())
+
+    return {
+        'async.flexible_catalog.sync_to_async': gather(
+            lambda client: sync_to_async(client.get_flexible_catalog)(),
+            count_rows=None,
+        ),
+        'async.flexible_catalog.aget': gather(lambda client: client.aget_flexible_catalog(), count_rows=None),
+        'async.courses.sync_to_async': gather(lambda client: sync_to_async(sync_courses)(client)),
+        'async.courses.aget': gather(lambda client: client.aget_course_keys()),
+    }
+
+
+def index_benchmarks(catalog_ids, course_keys):
+    """Return benchmarks loading the membership index and checking courses against it."""
+    # pylint: disable=import-outside-toplevel
+    from catalog_plugin.membership_index import MembershipIndex
+
+    sample_ids = [catalog_id for ids in catalog_ids.values() for catalog_id in ids[:SAMPLE_SIZE]]
+    sample_keys = course_keys[:INDEX_CHECKS // len(sample_ids)]
+    warm_index = MembershipIndex(refresh_interval=3600)
+
+    def load():
+        return len(MembershipIndex(refresh_interval=3600).get_members(sample_ids))
+
+    def contains():
+        warm_index.get_members(sample_ids)
+        return sum(
+            warm_index.contains(catalog_id, course_key) for catalog_id in sample_ids for course_key in sample_keys
+        )
+
+    def contains_many():
+        return sum(len(keys) for keys in warm_index.contains_many(sample_ids, sample_keys).values())
+
+    def intersect():
+        return len(warm_index.intersect(catalog_ids['live_dynamic'][:1] + catalog_ids['plain'][:1]))
+
+    return {
+        'index.load': load,
+        'index.contains': contains,
+        'index.contains_many': contains_many,
+        'index.intersect': intersect,
+    }
+
+
+def get_commit():
+    """Return the current git commit, if any."""
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(options):
+    """Seed a throwaway database and run every benchmark selected by the options."""
+    # pylint: disable=import-outside-toplevel
+    import django
+    from django.contrib.auth import get_user_model
+    from django.test.utils import override_settings
+
+    from benchmarks.seed import course_key, seed
+    from catalog_plugin.models import AvailableCourse, FlexibleCatalogModel
+
+    results = {}
+
+    with benchmark_database() as connection, override_settings(
+        ROOT_URLCONF='benchmarks.urls',
+        ALLOWED_HOSTS=['testserver'],
+    ):
+        seed_start = time.perf_counter()
+        catalog_ids = seed(options.courses, options.catalogs, options.fan_out)
+        seed_seconds = time.perf_counter() - seed_start
+        analyze(connection, [AvailableCourse, FlexibleCatalogModel])
+
+        user = get_user_model().objects.create(username='benchmark', is_staff=True, is_superuser=True)
+        course_keys = [course_key(index) for index in range(options.courses)]
+        benchmarks = {
+            **get_courses_benchmarks(catalog_ids),
+            **api_benchmarks(user, course_keys),
+            **client_benchmarks(catalog_ids, course_keys),
+            **admin_benchmarks(user),
+            **import_benchmarks(course_keys),
+            **async_benchmarks(catalog_ids),
+            **index_benchmarks(catalog_ids, course_keys),
+        }
+
+        for name, func in benchmarks.items():
+            if options.select and not any(name.startswith(prefix) for prefix in options.select):
+                continue
+            try:
+                results[name] = measure(func, options.repeat)
+            except Exception as error:  # pylint: disable=broad-except
+                results[name] = {'error': f'{type(error).__name__}: {error}'}
+            print(f'{name}: {results[name]}', file=sys.stderr)
+
+        vendor = connection.vendor
+
+    return {
+        'metadata': {
+            'commit': get_commit(),
+            'created': datetime.now(timezone.utc).isoformat(),
+            'database': vendor,
+            'django': django.get_version(),
+            'python': platform.python_version(),
+            'courses': options.courses,
+            'catalogs': options.catalogs,
+            'fan_out': options.fan_out,
+            'repeat': options.repeat,
+            'seed_seconds': seed_seconds,
+        },
+        'results': results,
+    }
+
+
+def main(argv=None):
+    """Parse the arguments, run the benchmarks and write the JSON results."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--courses', type=int, default=10000, help='Number of course overviews to seed.')
+    parser.add_argument('--catalogs', type=int, default=250, help='Number of catalogs of each type to seed.')
+    parser.add_argument('--fan-out', type=int, default=200, help='Number of courses of every static catalog.')
+    parser.add_argument('--repeat', type=int, default=5, help='Number of runs of every benchmark.')
+    parser.add_argument(
+        '--select',
+        action='append',
+        default=[],
+        help='Only run the benchmarks whose name starts with this prefix. Can be repeated.',
+    )
+    parser.add_argument('--output', help='File to write the JSON results to. Defaults to the standard output.')
+    options = parser.parse_args(argv)
+
+    setup_django()
+    report = json.dumps(run(options), indent=2, sort_keys=True)
+
+    if options.output:
+        with open(options.output, 'w', encoding='utf-8') as output:
+            output.write(report + '\n')
+    else:
+        print(report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""Synthetic datasets for the benchmarks."""
+import json
+
+from django.db import transaction
+
+BATCH_SIZE = 5000
+ORG_COUNT = 20
+CATALOG_TYPES = ('fixed', 'catalog_courses', 'live_dynamic', 'materialized_dynamic', 'plain', 'composite')
+
+
+def course_key(index):
+    """Return the course key of the seeded course overview at `index`."""
+    return f'course-v1:Org{index % ORG_COUNT}+C{index}+2024'
+
+
+def through_row(relation, catalog_id, target_id):
+    """Return an unsaved row of the through table of a catalog many-to-many relation."""
+    through = relation.through
+    catalog_attname = through._meta.get_field(relation.field.m2m_field_name()).attname
+    target_attname = through._meta.get_field(relation.field.m2m_reverse_field_name()).attname
+
+    return through(**{catalog_attname: catalog_id, target_attname: target_id})
+
+
+def seed(courses=10000, catalogs=250, fan_out=200):
+    """
+    Seed course overviews, available courses and catalogs of every type.
+
+    Every course overview belongs to one of `ORG_COUNT` organizations and has an
+    AvailableCourse, one in ten of them inactive. Each fixed catalog and catalog
+    courses instance contains `fan_out` courses and each dynamic catalog selects
+    one organization. Each composite catalog is the difference between a fixed
+    catalog and a live dynamic catalog. Through tables, composite children and
+    materialized memberships are written with `bulk_create`, so the signal
+    receivers only run for the catalog rows.
+
+    Args:
+        courses (int): Number of course overviews.
+        catalogs (int): Number of catalogs of each type.
+        fan_out (int): Number of courses of every fixed catalog and catalog courses.
+
+    Returns:
+        dict: The ids of the created catalogs indexed by catalog type.
+    """
+    # pylint: disable=import-outside-toplevel
+    from catalog_plugin.edxapp_wrapper.course_module import course_overview
+    from catalog_plugin.models import (
+        AvailableCourse,
+        CatalogCourses,
+        CompositeCatalog,
+        CompositeCatalogChild,
+        DynamicCatalog,
+        DynamicCatalogMembership,
+        FixedCatalog,
+        FlexibleCatalogModel,
+    )
+
+    overview_model = course_overview()
+    fan_out = min(fan_out, courses)
+
+    with transaction.atomic():
+        for start in range(0, courses, BATCH_SIZE):
+            indexes = range(start, min(start + BATCH_SIZE, courses))
+            overview_model.objects.bulk_create([
+                overview_model(id=course_key(index), display_name=f'Course {index}', org=f'Org{index % ORG_COUNT}')
+                for index in indexes
+            ])
+            AvailableCourse.objects.bulk_create([
+                AvailableCourse(course_id=course_key(index), active=index % 10 != 0) for index in indexes
+            ])
+        available_course_ids = dict(AvailableCourse.objects.values_list('course_id', 'pk'))
+
+        catalog_ids = {catalog_type: [] for catalog_type in CATALOG_TYPES}
+        fixed_rows, course_rows, membership_rows, composite_rows = [], [], [], []
+
+        for index in range(catalogs):
+            members = [course_key((index * fan_out + offset) % courses) for offset in range(fan_out)]
+            org = f'Org{index % ORG_COUNT}'
+
+            fixed_catalog = FixedCatalog.objects.create(name=f'Fixed {index}', slug=f'fixed-{index}')
+            fixed_rows.extend(through_row(FixedCatalog.course_runs, fixed_catalog.pk, key) for key in members)
+            catalog_courses = CatalogCourses.objects.create(name=f'Courses {index}', slug=f'courses-{index}')
+            course_rows.extend(
+                through_row(CatalogCourses.courses, catalog_courses.pk, available_course_ids[key]) for key in members
+            )
+            live_catalog = DynamicCatalog.objects.create(
+                name=f'Live {index}',
+                slug=f'live-{index}',
+                query_string=json.dumps({'org': org}),
+            )
+            materialized_catalog = DynamicCatalog.objects.create(
+                name=f'Materialized {index}',
+                slug=f'materialized-{index}',
+                query_string=json.dumps({'org': org}),
+            )
+            membership_rows.extend(
+                DynamicCatalogMembership(catalog_id=materialized_catalog.pk, course_id=course_key(course_index))
+                for course_index in range(index % ORG_COUNT, courses, ORG_COUNT)
+            )
+            plain_catalog = FlexibleCatalogModel.objects.create(name=f'Plain {index}', slug=f'plain-{index}')
+            composite_catalog = CompositeCatalog.objects.create(
+                name=f'Composite {index}',
+                slug=f'composite-{index}',
+                operation=CompositeCatalog.DIFFERENCE,
+            )
+            composite_rows.extend(
+                CompositeCatalogChild(composite=composite_catalog, child=child, position=position)
+                for position, child in enumerate((fixed_catalog, live_catalog))
+            )
+
+            for catalog_type, catalog in zip(
+                CATALOG_TYPES,
+                (fixed_catalog, catalog_courses, live_catalog, materialized_catalog, plain_catalog, composite_catalog),
+            ):
+                catalog_ids[catalog_type].append(catalog.pk)
+
+        DynamicCatalog.objects.filter(pk__in=catalog_ids['materialized_dynamic']).update(materialized=True)
+        FixedCatalog.course_runs.through.objects.bulk_create(fixed_rows, batch_size=BATCH_SIZE)
+        CatalogCourses.courses.through.objects.bulk_create(course_rows, batch_size=BATCH_SIZE)
+        DynamicCatalogMembership.objects.bulk_create(membership_rows, batch_size=BATCH_SIZE)
+        CompositeCatalogChild.objects.bulk_create(composite_rows, batch_size=BATCH_SIZE)
+
+    return catalog_ids
@@ -0,0 +1,7 @@
+"""URL configuration used by the benchmarks to render the admin changelists."""
+from django.contrib import admin
+from django.urls import path
+
+urlpatterns = [
+    path('admin/', admin.site.urls),
+]
@@ -1,65 +1,148 @@
 """Django admin pages for Catalog models."""
+from django.conf import settings
 from django.contrib import admin
-from django.urls import reverse
-from django.utils.html import format_html
-
+from django.contrib.admin.views.autocomplete import AutocompleteJsonView
+from django.contrib.admin.views.main import ChangeList
+from django.contrib.admin.widgets import AutocompleteSelectMultiple
+from django.db.models import Q
+from django.urls import path, reverse
+from django.utils.html import format_html, format_html_join
+from django.utils.safestring import mark_safe
+
+from catalog_plugin.edxapp_wrapper.course_module import course_overview
+from catalog_plugin.membership import get_cached_course_keys, get_many_cached_course_keys
 from catalog_plugin.models import (
     AvailableCourse,
     CatalogCourses,
+    CompositeCatalog,
+    CompositeCatalogChild,
     DynamicCatalog,
     FlexibleCatalogModel,
     FixedCatalog,
 )
 
+DEFAULT_ADMIN_MAX_COURSE_KEYS = 10
+SUMMARY_FIELDS = ('course_count', 'active_course_count', 'membership_modified')
+COURSE_KEY_PREFIX = 'course-v1:'
+
+
+class CourseKeysChangeList(ChangeList):
+    """Changelist resolving the course keys of all the catalogs of a page together."""
+
+    def get_results(self, request):
+        """Fetch the page and attach the course keys of every catalog, in a bounded number of queries."""
+        super().get_results(request)
+        course_keys = get_many_cached_course_keys(self.result_list)
+        for catalog in self.result_list:
+            catalog.admin_course_keys = course_keys[catalog.pk]
+
+
+def render_course_keys(course_keys):
+    """
+    Render at most `CP_ADMIN_MAX_COURSE_KEYS` course keys, one per line, and the number of hidden ones.
+
+    Args:
+        course_keys (list[str]): The sorted course keys of a catalog.
+
+    Returns:
+        str: The HTML to display, or "No courses available" if there are no course keys.
+    """
+    if not course_keys:
+        return 'No courses available'
+
+    limit = getattr(settings, 'CP_ADMIN_MAX_COURSE_KEYS', DEFAULT_ADMIN_MAX_COURSE_KEYS)
+    html = format_html_join(mark_safe('<br>'), '{}', ((course_key,) for course_key in course_keys[:limit]))
+    if len(course_keys) > limit:
+        html = format_html('{}<br>+{} more', html, len(course_keys) - limit)
+
+    return html
+
 
 class CourseKeysMixin:
     """
-    Mixin class providing functionality to render a list of course IDs.
+    Mixin class providing functionality to render the course keys of catalogs.
 
-    This mixin can be used by other classes to easily display the IDs of
-    associated courses. It relies on the presence of a method named
-    `get_courses` on the mixed-in class, which should return a queryset of
-    course objects.
+    The changelist resolves the course keys of the whole page at once with
+    `get_many_cached_course_keys`, which serves them from the membership
+    cache and resolves the misses with one query per catalog type, so the
+    number of queries does not depend on the number of rows. Only the first
+    `CP_ADMIN_MAX_COURSE_KEYS` keys of every catalog are rendered.
 
     Usage:
-        - Inherit from `CourseKeysMixin` in your class definition.
-        - Ensure your class implements the `get_courses` method to retrieve
-            relevant courses.
+        - Inherit from `CourseKeysMixin` before `admin.ModelAdmin`, so its
+            changelist is used.
+        - Add `course_keys` to the `list_display` of the admin.
 
     Attributes:
         course_keys (method): A method that retrieves and formats a list of
             course IDs.
     """
 
+    def get_changelist(self, request, **kwargs):
+        """Return the changelist class resolving the course keys of the page together."""
+        return CourseKeysChangeList
+
     def course_keys(self, obj):
         """
-        Retrieve and formats a list of course IDs for the provided object.
-
-        This method leverages the `get_courses` method (assumed to be
-        implemented in the mixed-in class) to retrieve associated courses
-        for the given object (`obj`). It then extracts the IDs from the
-        courses and formats them into a human-readable HTML string with line
-        breaks.
+        Retrieve and format the course keys of the provided catalog.
 
         Args:
-            obj (Any): The object for which to retrieve course IDs.
+            obj (FlexibleCatalogModel): The catalog, resolved to its subclass.
 
         Returns:
-            str: A formatted HTML string containing a list of course IDs, or
+            str: A formatted HTML string containing the first course keys, or
                 the message "No courses available" if no courses are found.
         """
-        courses = obj.get_courses()
-        if courses.exists():
-            course_ids = [str(course.id) for course in courses]
-            return format_html('<br>'.join(course_ids))
-        return 'No courses available'
+        course_keys = getattr(obj, 'admin_course_keys', None)
+        if course_keys is None:
+            course_keys = get_cached_course_keys(obj)
+        return render_course_keys(course_keys)
+
+
+class CourseOverviewAutocompleteView(AutocompleteJsonView):
+    """
+    Search the course overviews of a catalog relation by prefix of their course key.
+
+    The edx-platform CourseOverview admin searches with `icontains`, which scans
+    the whole table, so the course runs of the fixed catalogs are searched here
+    instead. The term matches the start of the course key, with or without its
+    `course-v1:` prefix, so the search is a range scan of the primary key on
+    MySQL, whose case-insensitive collations use the index for `istartswith`.
+
+    Attributes:
+        source_admin (ModelAdmin): The admin of the catalog model whose form uses the autocomplete.
+    """
+
+    source_admin = None
+
+    def process_request(self, request):
+        """Return the search term, the catalog admin, the catalog relation and the name of the course key field."""
+        return request.GET.get('term', ''), self.source_admin, self.source_admin.model.course_runs.field, 'pk'
+
+    def get_queryset(self):
+        """Return the course overviews whose course key starts with the term, ordered by course key."""
+        courses = course_overview().objects.order_by('pk')
+        if self.term:
+            courses = courses.filter(
+                Q(pk__istartswith=self.term) | Q(pk__istartswith=f'{COURSE_KEY_PREFIX}{self.term}'),
+            )
+        return courses
+
+
+class CourseOverviewAutocompleteSelectMultiple(AutocompleteSelectMultiple):
+    """Autocomplete widget of the fixed catalog course runs, served by `CourseOverviewAutocompleteView`."""
+
+    def get_url(self):
+        """Return the URL of the course overview autocomplete of the fixed catalog admin."""
+        return reverse(f'{self.admin_site.name}:catalog_plugin_fixedcatalog_course_runs_autocomplete')
 
 
 @admin.register(FlexibleCatalogModel)
-class FlexibleCatalogModelAdmin(admin.ModelAdmin, CourseKeysMixin):
+class FlexibleCatalogModelAdmin(CourseKeysMixin, admin.ModelAdmin):
     """Admin for the FlexibleCatalog model."""
 
-    list_display = ('name', 'slug', 'id', 'model_class_name', 'course_keys')
+    list_display = ('name', 'slug', 'id', 'model_class_name') + SUMMARY_FIELDS + ('course_keys',)
+    readonly_fields = SUMMARY_FIELDS
     search_fields = ('name', 'slug', 'id')
     prepopulated_fields = {'slug': ('name',)}
 
@@ -77,53 +160,74 @@ class FlexibleCatalogModelAdmin(admin.ModelAdmin, CourseKeysMixin):
 
 
 @admin.register(FixedCatalog)
-class FixedCatalogAdmin(admin.ModelAdmin, CourseKeysMixin):
-    list_display = ('__str__', 'course_keys')
-    search_fields = ('flexible_catalog__name', 'flexible_catalog__slug', 'flexible_catalog__id')
-    filter_horizontal = ('course_runs',)
+class FixedCatalogAdmin(CourseKeysMixin, admin.ModelAdmin):
+    list_display = ('__str__',) + SUMMARY_FIELDS + ('course_keys',)
+    readonly_fields = SUMMARY_FIELDS
+    search_fields = ('name', 'slug', 'id')
+
+    def get_urls(self):
+        """Add the course overview autocomplete of the course runs to the admin URLs."""
+        return [
+            path(
+                'course-runs-autocomplete/',
+                self.admin_site.admin_view(
+                    CourseOverviewAutocompleteView.as_view(admin_site=self.admin_site, source_admin=self),
+                ),
+                name='catalog_plugin_fixedcatalog_course_runs_autocomplete',
+            ),
+            *super().get_urls(),
+        ]
+
+    def formfield_for_manytomany(self, db_field, request, **kwargs):
+        """Select the course runs with the course key prefix autocomplete."""
+        if db_field.name == 'course_runs':
+            kwargs['widget'] = CourseOverviewAutocompleteSelectMultiple(db_field, self.admin_site)
+        return super().formfield_for_manytomany(db_field, request, **kwargs)
 
 
 @admin.register(CatalogCourses)
-class CatalogCoursesAdmin(admin.ModelAdmin, CourseKeysMixin):
+class CatalogCoursesAdmin(CourseKeysMixin, admin.ModelAdmin):
     """Admin for the CatalogCourse model."""
 
-    list_display = ('__str__', 'display_courses')
-    search_fields = ('flexible_catalog__name', 'flexible_catalog__slug', 'flexible_catalog__id')
-    filter_horizontal = ('courses',)
-
-    def display_courses(self, obj):
-        """
-        Return a comma-separated string representation of courses associated with the object.
-
-        Args:
-            obj (Any): The object for which to retrieve and display associated courses.
+    list_display = ('__str__',) + SUMMARY_FIELDS + ('course_keys',)
+    readonly_fields = SUMMARY_FIELDS
+    search_fields = ('name', 'slug', 'id')
+    autocomplete_fields = ('courses',)
 
-        Returns:
-            str: A comma-separated string containing the string representations of
-                all associated courses, or an empty string if no courses are found.
-        """
-        return ', '.join([str(course) for course in obj.courses.all()])
+    def formfield_for_manytomany(self, db_field, request, **kwargs):
+        """Fetch the selected available courses with their course overview, which is part of their label."""
+        if db_field.name == 'courses':
+            kwargs['queryset'] = AvailableCourse.objects.select_related('course')
+        return super().formfield_for_manytomany(db_field, request, **kwargs)
 
 
 @admin.register(DynamicCatalog)
-class DynamicCatalogAdmin(admin.ModelAdmin, CourseKeysMixin):
+class DynamicCatalogAdmin(CourseKeysMixin, admin.ModelAdmin):
     """Admin for the DynamicCatalog model."""
 
-    list_display = ('__str__', 'query_string', 'course_keys')
-    search_fields = (
-        'flexible_catalog__name',
-        'flexible_catalog__slug',
-        'flexible_catalog__id',
-        'query_string',
-    )
+    list_display = ('__str__', 'query_string', 'materialized') + SUMMARY_FIELDS + ('course_keys',)
+    readonly_fields = SUMMARY_FIELDS
+    list_filter = ('materialized',)
+    search_fields = ('name', 'slug', 'id', 'query_string')
 
-    def course_keys(self, obj):
-        """Return the ids for easy debug in the admin views."""
-        course_runs = obj.get_course_runs()
-        if course_runs.exists():
-            course_ids = [str(course.id) for course in course_runs]
-            return format_html('<br>'.join(course_ids))
-        return 'No courses available'
+
+class CompositeCatalogChildInline(admin.TabularInline):
+    """Inline to edit the ordered children of a composite catalog."""
+
+    model = CompositeCatalogChild
+    fk_name = 'composite'
+    extra = 1
+
+
+@admin.register(CompositeCatalog)
+class CompositeCatalogAdmin(CourseKeysMixin, admin.ModelAdmin):
+    """Admin for the CompositeCatalog model."""
+
+    list_display = ('__str__', 'operation') + SUMMARY_FIELDS + ('course_keys',)
+    readonly_fields = SUMMARY_FIELDS
+    list_filter = ('operation',)
+    search_fields = ('name', 'slug', 'id')
+    inlines = (CompositeCatalogChildInline,)
 
 
 @admin.register(AvailableCourse)
@@ -131,4 +235,10 @@ class AvailableCourseAdmin(admin.ModelAdmin):
     """Admin for the AvailableCourse model."""
 
     list_display = ('id', 'course', 'active')
-    search_fields = ('course',)
+    list_filter = ('active',)
+    search_fields = ('course__id__startswith', '^course__display_name')
+    ordering = ('course_id',)
+
+    def get_queryset(self, request):
+        """Fetch the course overview of every available course, which is part of its label."""
+        return super().get_queryset(request).select_related('course')
@@ -1,25 +1,120 @@
 """Catalogs API client module."""
+import asyncio
 import uuid
 import logging
+import weakref
 
 from django.core.validators import validate_slug
 from django.core.exceptions import ValidationError
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import Case, Q, Value, When
 
 from opaque_keys.edx.keys import CourseKey
 from opaque_keys import InvalidKeyError
 
+from catalog_plugin.async_compat import aget, alist
+from catalog_plugin.changelog import record_activation_events, record_membership_events
 from catalog_plugin.edxapp_wrapper.course_module import course_overview
+from catalog_plugin.identity_map import MISSING, cache_catalog, get_cached_catalog
+from catalog_plugin.instrumentation import instrument_methods
+from catalog_plugin.membership import (
+    aget_cached_course_keys,
+    aget_catalog_ids_for_courses,
+    bump_membership_versions,
+    get_cached_course_keys,
+    get_catalog_ids_for_courses,
+    get_plain_catalog_ids,
+    update_course_catalogs,
+)
 from catalog_plugin.models import (
     AvailableCourse,
     CatalogCourses,
     FixedCatalog,
     FlexibleCatalogModel,
+    MembershipEvent,
 )
 
 logger = logging.getLogger(__name__)
 
+MEMBERSHIP_ACTIONS = ('add', 'remove', 'replace')
+BULK_BATCH_SIZE = 1000
+
+_catalog_loaders = weakref.WeakKeyDictionary()
+
+
+class CatalogLoader:
+    """
+    Coalesce the catalog lookups by id or slug awaited together into one query.
+
+    Lookups requested while the event loop is busy, e.g. by the coroutines of
+    an `asyncio.gather`, are collected and fetched with a single query on the
+    next iteration of the loop. Every event loop has its own loader, see
+    `get_catalog_loader`.
+    """
+
+    def __init__(self):
+        self.pending = {}
+        self.task = None
+
+    def load(self, field, value):
+        """
+        Return a future resolved with the catalog whose `field` is `value`, or None if there is none.
+
+        Args:
+            field (str): `id` or `slug`.
+            value (str or UUID): The value to look up.
+
+        Raises:
+            ValidationError: If the id is not a valid UUID.
+        """
+        if field == 'id':
+            value = FlexibleCatalogModel._meta.pk.to_python(value)  # pylint: disable=protected-access
+        key = (field, str(value))
+
+        if key not in self.pending:
+            self.pending[key] = asyncio.get_running_loop().create_future()
+            if self.task is None:
+                self.task = asyncio.ensure_future(self.dispatch())
+
+        return self.pending[key]
+
+    async def dispatch(self):
+        """Fetch every pending lookup with one query and resolve their futures."""
+        pending, self.pending, self.task = self.pending, {}, None
+        lookups = Q()
+        for field, values in (('id', 'pk__in'), ('slug', 'slug__in')):
+            matching = [value for key_field, value in pending if key_field == field]
+            if matching:
+                lookups |= Q(**{values: matching})
+
+        try:
+            catalogs = await alist(FlexibleCatalogModel.objects.filter(lookups).select_subclasses())
+        except Exception as error:  # pylint: disable=broad-except
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(error)
+            return
+
+        found = {}
+        for catalog in catalogs:
+            found[('id', str(catalog.pk))] = found[('slug', catalog.slug)] = catalog
+        for key, future in pending.items():
+            if not future.done():
+                future.set_result(found.get(key))
+
 
+def get_catalog_loader():
+    """Return the catalog loader of the running event loop."""
+    loop = asyncio.get_running_loop()
+    loader = _catalog_loaders.get(loop)
+
+    if loader is None:
+        loader = _catalog_loaders[loop] = CatalogLoader()
+
+    return loader
+
+
+@instrument_methods('api_client.FlexibleCatalogAPIClient')
 class FlexibleCatalogAPIClient:
     """
     A Python API client for FlexibleCatalogModel to interact with flexible catalog models backend-to-backend.
@@ -65,13 +160,83 @@ class FlexibleCatalogAPIClient:
         if name is not None and not isinstance(name, str):
             raise ValidationError('"name" must be a string.')
 
+    def _get_identity_key(self):
+        """Return the identity map key of the lookup, or None when the lookup dict is not hashable."""
+        if self.lookup_dict:
+            key = ('lookup', tuple(sorted(self.lookup_dict.items())))
+            try:
+                hash(key)
+            except TypeError:
+                return None
+            return key
+        if self.catalog_uuid:
+            return ('id', str(self.catalog_uuid))
+        return ('slug', self.catalog_slug)
+
     def fetch_flexible_catalog(self):
         """
         Fetch a flexible catalog by UUID or slug.
 
+        During a request, results are memoized in the catalog identity map, so
+        repeated lookups of the same catalog run no query.
+
         Returns:
             FlexibleCatalogModel or QuerySet.none(): The retrieved flexible catalog object or empty QuerySet if not found.
         """
+        key = self._get_identity_key()
+        catalog = get_cached_catalog(key)
+
+        if catalog is MISSING:
+            catalog = self._query_flexible_catalog()
+            self._cache_catalog(key, catalog)
+
+        return catalog
+
+    async def afetch_flexible_catalog(self):
+        """
+        Async counterpart of `fetch_flexible_catalog`.
+
+        Catalogs in the identity map are returned without any database hop.
+        Lookups by UUID or slug awaited concurrently, e.g. with `asyncio.gather`,
+        are fetched together in one query by the `CatalogLoader` of the event loop.
+
+        Returns:
+            FlexibleCatalogModel or QuerySet.none(): The retrieved catalog or empty QuerySet if not found.
+        """
+        key = self._get_identity_key()
+        catalog = get_cached_catalog(key)
+
+        if catalog is MISSING:
+            if self.lookup_dict:
+                catalog = self._query_flexible_catalog()
+            else:
+                field, value = ('id', self.catalog_uuid) if self.catalog_uuid else ('slug', self.catalog_slug)
+                catalog = await get_catalog_loader().load(field, value)
+                if catalog is None:
+                    self._log_missing_catalog()
+                    catalog = FlexibleCatalogModel.objects.none()
+            self._cache_catalog(key, catalog)
+
+        return catalog
+
+    def _cache_catalog(self, key, catalog):
+        """Store a fetched catalog in the identity map under the lookup key, its UUID and its slug."""
+        cache_catalog(key, catalog)
+        if isinstance(catalog, FlexibleCatalogModel):
+            cache_catalog(('id', str(catalog.pk)), catalog)
+            cache_catalog(('slug', catalog.slug), catalog)
+
+    def _log_missing_catalog(self):
+        """Log that the requested catalog does not exist."""
+        logger.warning(
+            'FlexibleCatalogModel not found. UUID: %s, Slug: %s, Lookup Dict: %s',
+            self.catalog_uuid,
+            self.catalog_slug,
+            self.lookup_dict,
+        )
+
+    def _query_flexible_catalog(self):
+        """Query a flexible catalog by lookup dict, UUID or slug."""
         try:
             if self.lookup_dict:
                 lookup_query = Q()
@@ -83,12 +248,7 @@ class FlexibleCatalogAPIClient:
             elif self.catalog_slug:
                 return FlexibleCatalogModel.objects.get_subclass(slug=self.catalog_slug)
         except FlexibleCatalogModel.DoesNotExist:
-            logger.warning(
-                'FlexibleCatalogModel not found. UUID: %s, Slug: %s, Lookup Dict: %s',
-                self.catalog_uuid,
-                self.catalog_slug,
-                self.lookup_dict,
-            )
+            self._log_missing_catalog()
         return FlexibleCatalogModel.objects.none()
 
     def get_flexible_catalog(self):
@@ -98,9 +258,82 @@ class FlexibleCatalogAPIClient:
         Returns:
             FlexibleCatalogModel or QuerySet: The retrieved catalog or empty QuerySet if not found.
         """
+        return self.fetch_flexible_catalog()
+
+    async def aget_flexible_catalog(self):
+        """
+        Async counterpart of `get_flexible_catalog`.
+
+        Returns:
+            FlexibleCatalogModel or QuerySet: The retrieved catalog or empty QuerySet if not found.
+        """
+        return await self.afetch_flexible_catalog()
+
+    def get_course_keys(self):
+        """
+        Retrieve the course keys of the catalog from the membership cache.
+
+        The keys are resolved against the database only on a cache miss, and
+        stay cached until the membership version of the catalog is bumped.
+
+        Returns:
+            list[str]: The sorted course keys, or an empty list if the lookup does not match a single catalog.
+        """
         catalog = self.fetch_flexible_catalog()
 
-        return catalog if catalog else FlexibleCatalogModel.objects.none()
+        if not isinstance(catalog, FlexibleCatalogModel):
+            return []
+
+        return get_cached_course_keys(catalog)
+
+    async def aget_course_keys(self):
+        """
+        Async counterpart of `get_course_keys`.
+
+        Returns:
+            list[str]: The sorted course keys, or an empty list if the lookup does not match a single catalog.
+        """
+        catalog = await self.afetch_flexible_catalog()
+
+        if not isinstance(catalog, FlexibleCatalogModel):
+            return []
+
+        return await aget_cached_course_keys(catalog)
+
+    # Name used before the async methods were aligned with the sync ones.
+    aget_courses = aget_course_keys
+
+    @classmethod
+    def get_catalog_ids_for_courses(cls, course_ids):
+        """
+        Retrieve the ids of the catalogs that contain each of the given courses.
+
+        Args:
+            course_ids (list[CourseKey]): The course IDs to look up.
+
+        Returns:
+            dict: Sorted lists of catalog ids indexed by every given course ID.
+        """
+        course_ids = validate_course_ids(course_ids)
+        catalog_ids = get_catalog_ids_for_courses(course_ids)
+
+        return {course_id: catalog_ids[str(course_id)] for course_id in course_ids}
+
+    @classmethod
+    async def aget_catalog_ids_for_courses(cls, course_ids):
+        """
+        Async counterpart of `get_catalog_ids_for_courses`.
+
+        Args:
+            course_ids (list[CourseKey]): The course IDs to look up.
+
+        Returns:
+            dict: Sorted lists of catalog ids indexed by every given course ID.
+        """
+        course_ids = validate_course_ids(course_ids)
+        catalog_ids = await aget_catalog_ids_for_courses(course_ids)
+
+        return {course_id: catalog_ids[str(course_id)] for course_id in course_ids}
 
     def update_flexible_catalog(self, **kwargs):
         """
@@ -157,6 +390,7 @@ class FlexibleCatalogAPIClient:
         return True
 
 
+@instrument_methods('api_client.AvailableCourseAPIClient')
 class AvailableCourseAPIClient:
     """
     A Python API client for the AvailableCourse model to interact with flexible catalog models backend-to-backend.
@@ -190,6 +424,19 @@ class AvailableCourseAPIClient:
             logger.warning('AvailableCourse with course ID "%s" does not exist.', self.course_id)
         return AvailableCourse.objects.none()
 
+    async def aget_available_course(self):
+        """
+        Async counterpart of `get_available_course`.
+
+        Returns:
+            AvailableCourse: The retrieved AvailableCourse instance, or QuerySet.none() if not found.
+        """
+        try:
+            return await aget(AvailableCourse.objects, course__id=self.course_id)
+        except AvailableCourse.DoesNotExist:
+            logger.warning('AvailableCourse with course ID "%s" does not exist.', self.course_id)
+        return AvailableCourse.objects.none()
+
     def get_all_available_courses(self):
         """
         Retrieve all available courses.
@@ -248,6 +495,102 @@ class AvailableCourseAPIClient:
 
         return available_course
 
+    @classmethod
+    def bulk_upsert_available_courses(cls, course_states):
+        """
+        Create or update the active status of many available courses at once.
+
+        Course overviews are resolved with one `id__in` query, the missing
+        AvailableCourse objects are created with `bulk_create` and the active
+        flags are flipped with a single `UPDATE ... WHERE id IN`. The activated
+        and deactivated courses are recorded in the changelog.
+
+        Courses created by a concurrent upsert between the read and the insert
+        are skipped by the insert, read again and updated when their active
+        flag differs, so concurrent upserts never fail on the unique course.
+
+        Args:
+            course_states (Iterable[tuple[CourseKey, bool]]): Pairs of course ID and active status.
+                When a course ID is repeated, the last status wins.
+
+        Returns:
+            dict: Lists of course IDs that were `created`, `updated`, left `unchanged`,
+            or are `missing` because no course overview exists for them.
+        """
+        states = dict(course_states)
+        validate_course_ids(list(states))
+        results = {'created': [], 'updated': [], 'unchanged': [], 'missing': []}
+
+        if not states:
+            return results
+
+        keys_by_id = {str(course_id): course_id for course_id in states}
+        overview_ids = {
+            str(overview_id): overview_id
+            for overview_id in course_overview().objects.filter(id__in=list(keys_by_id)).values_list('pk', flat=True)
+        }
+        existing_courses = {}
+        for available_course_id, overview_id, active in AvailableCourse.objects.filter(
+            course_id__in=list(overview_ids.values()),
+        ).values_list('pk', 'course_id', 'active'):
+            existing_courses.setdefault(str(overview_id), []).append((available_course_id, active))
+
+        courses_to_create = []
+        ids_to_update = {True: [], False: []}
+        changed_course_ids = []
+        toggled_courses = []
+
+        for key, course_id in keys_by_id.items():
+            active = states[course_id]
+            if key not in overview_ids:
+                results['missing'].append(course_id)
+            elif key not in existing_courses:
+                courses_to_create.append(AvailableCourse(course_id=overview_ids[key], active=active))
+                changed_course_ids.append(overview_ids[key])
+                if active:
+                    toggled_courses.append((overview_ids[key], active))
+                results['created'].append(course_id)
+            else:
+                outdated_ids = [pk for pk, current_active in existing_courses[key] if current_active != active]
+                ids_to_update[active].extend(outdated_ids)
+                if outdated_ids:
+                    changed_course_ids.append(overview_ids[key])
+                    toggled_courses.append((overview_ids[key], active))
+                results['updated' if outdated_ids else 'unchanged'].append(course_id)
+
+        with transaction.atomic():
+            AvailableCourse.objects.bulk_create(courses_to_create, batch_size=BULK_BATCH_SIZE, ignore_conflicts=True)
+            if courses_to_create:
+                # Rows with another active flag than the requested one were created by a concurrent upsert.
+                for available_course_id, overview_id, active in AvailableCourse.objects.filter(
+                    course_id__in=[course.course_id for course in courses_to_create],
+                ).values_list('pk', 'course_id', 'active'):
+                    course_id = keys_by_id[str(overview_id)]
+                    if active != states[course_id]:
+                        ids_to_update[states[course_id]].append(available_course_id)
+                        results['created'].remove(course_id)
+                        results['updated'].append(course_id)
+                        if active:
+                            toggled_courses.append((overview_id, False))
+
+            updated_ids = ids_to_update[True] + ids_to_update[False]
+            if updated_ids:
+                AvailableCourse.objects.filter(pk__in=updated_ids).update(
+                    active=Case(When(pk__in=ids_to_update[True], then=Value(True)), default=Value(False)),
+                )
+            if changed_course_ids:
+                update_course_catalogs(changed_course_ids, get_plain_catalog_ids() if courses_to_create else [])
+            record_activation_events(toggled_courses)
+
+        logger.info(
+            'Upserted AvailableCourses. Created: %s, Updated: %s, Unchanged: %s, Missing: %s',
+            len(results['created']),
+            len(results['updated']),
+            len(results['unchanged']),
+            len(results['missing']),
+        )
+        return results
+
     def delete_available_course(self):
         """
         Delete an available course by its course ID.
@@ -312,6 +655,100 @@ def validate_course_ids(course_ids):
     return course_ids
 
 
+def get_through_attnames(relation):
+    """
+    Return the column attributes of the through table of a catalog many-to-many relation.
+
+    Args:
+        relation (ManyToManyDescriptor): The catalog relation, e.g. `FixedCatalog.course_runs`.
+
+    Returns:
+        tuple[str, str]: The attribute names of the catalog and of the related object.
+    """
+    through = relation.through
+    return (
+        through._meta.get_field(relation.field.m2m_field_name()).attname,
+        through._meta.get_field(relation.field.m2m_reverse_field_name()).attname,
+    )
+
+
+def apply_bulk_membership(relation, catalog_ids, target_ids, action):
+    """
+    Apply the same membership diff to many catalogs in a single transaction.
+
+    The rows of the many-to-many through table are written with `bulk_create`
+    and removed with a single `DELETE`, so the number of queries does not depend
+    on the number of catalogs or courses. Since this bypasses `m2m_changed`,
+    the membership versions of the modified catalogs are bumped and the added
+    and removed courses recorded in the changelog explicitly.
+
+    Args:
+        relation (ManyToManyDescriptor): The catalog relation, e.g. `FixedCatalog.course_runs`.
+        catalog_ids (Iterable[uuid.UUID]): Ids of existing catalogs to modify.
+        target_ids (Iterable): Primary keys of the related objects.
+        action (str): `add` the targets, `remove` them or `replace` the memberships with them.
+
+    Returns:
+        dict: Number of `added` and `removed` memberships indexed by catalog id.
+
+    Raises:
+        ValueError: If the action is not supported.
+    """
+    if action not in MEMBERSHIP_ACTIONS:
+        raise ValueError(f'action must be one of {MEMBERSHIP_ACTIONS}, but got: {action}')
+
+    through = relation.through
+    catalog_attname, target_attname = get_through_attnames(relation)
+    catalog_ids, target_ids = set(catalog_ids), set(target_ids)
+    results = {catalog_id: {'added': 0, 'removed': 0} for catalog_id in catalog_ids}
+
+    if not catalog_ids:
+        return results
+
+    with transaction.atomic():
+        existing_rows = through.objects.filter(**{f'{catalog_attname}__in': catalog_ids})
+        if action != 'replace':
+            existing_rows = existing_rows.filter(**{f'{target_attname}__in': target_ids})
+        existing_pairs = set(existing_rows.values_list(catalog_attname, target_attname))
+
+        if action == 'remove':
+            pairs_to_remove = existing_pairs
+            pairs_to_add = set()
+        else:
+            desired_pairs = {(catalog_id, target_id) for catalog_id in catalog_ids for target_id in target_ids}
+            pairs_to_remove = existing_pairs - desired_pairs if action == 'replace' else set()
+            pairs_to_add = desired_pairs - existing_pairs
+
+        if pairs_to_remove:
+            rows_to_remove = through.objects.filter(**{f'{catalog_attname}__in': catalog_ids})
+            if action == 'replace':
+                rows_to_remove = rows_to_remove.exclude(**{f'{target_attname}__in': target_ids})
+            else:
+                rows_to_remove = rows_to_remove.filter(**{f'{target_attname}__in': target_ids})
+            rows_to_remove.delete()
+
+        through.objects.bulk_create(
+            [
+                through(**{catalog_attname: catalog_id, target_attname: target_id})
+                for catalog_id, target_id in pairs_to_add
+            ],
+            batch_size=BULK_BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+
+        for catalog_id, _ in pairs_to_add:
+            results[catalog_id]['added'] += 1
+        for catalog_id, _ in pairs_to_remove:
+            results[catalog_id]['removed'] += 1
+
+        record_membership_events(relation, MembershipEvent.COURSE_ADDED, pairs_to_add)
+        record_membership_events(relation, MembershipEvent.COURSE_REMOVED, pairs_to_remove)
+        bump_membership_versions(catalog_id for catalog_id, _ in pairs_to_add | pairs_to_remove)
+
+    return results
+
+
+@instrument_methods('api_client.FixedCatalogAPIClient')
 class FixedCatalogAPIClient:
     """
     A Python API client for FixedCatalog model to interact with flexible catalog models backend-to-backend.
@@ -351,6 +788,31 @@ class FixedCatalogAPIClient:
         """
         return FixedCatalog.objects.all()
 
+    @classmethod
+    def bulk_update_course_runs(cls, catalog_ids, course_run_ids, action='add'):
+        """
+        Add, remove or replace the course runs of many fixed catalogs at once.
+
+        Args:
+            catalog_ids (list[uuid.UUID or str]): Ids of the fixed catalogs to modify.
+            course_run_ids (list[CourseKey]): Course run IDs applied to every catalog.
+            action (str): One of `add`, `remove` or `replace`. Defaults to `add`.
+
+        Returns:
+            dict: Number of `added` and `removed` course runs indexed by the id of every
+            existing catalog. Ids that do not match a fixed catalog are left out.
+        """
+        catalog_ids = {validate_catalog_id(catalog_id) for catalog_id in catalog_ids}
+        course_run_ids = validate_course_ids(course_run_ids)
+
+        existing_catalog_ids = set(FixedCatalog.objects.filter(pk__in=catalog_ids).values_list('pk', flat=True))
+        if existing_catalog_ids != catalog_ids:
+            logger.warning('FixedCatalogs not found: %s', catalog_ids - existing_catalog_ids)
+
+        course_ids = course_overview().objects.filter(id__in=course_run_ids).values_list('pk', flat=True)
+
+        return apply_bulk_membership(FixedCatalog.course_runs, existing_catalog_ids, course_ids, action)
+
     def add_courses_to_fixed_catalog(self, course_run_ids=[]):
         """
         Add the course runs from the provided list or the initialized list to the fixed catalog.
@@ -382,8 +844,7 @@ class FixedCatalogAPIClient:
             logger.warning('No valid courses found for IDs: %s', course_run_ids)
             return FixedCatalog.objects.none()
 
-        catalog.course_runs.add(courses)
-        catalog.save()
+        catalog.course_runs.add(*courses)
 
         return catalog
 
@@ -418,12 +879,12 @@ class FixedCatalogAPIClient:
             logger.warning('No valid courses found for IDs: %s', course_run_ids)
             return FixedCatalog.objects.none()
 
-        catalog.course_runs.remove(courses)
-        catalog.save()
+        catalog.course_runs.remove(*courses)
 
         return catalog
 
 
+@instrument_methods('api_client.CatalogCoursesAPIClient')
 class CatalogCoursesAPIClient:
     """
     A Python API client for CatalogCourses model to interact with flexible catalog models backend-to-backend.
@@ -469,6 +930,40 @@ class CatalogCoursesAPIClient:
             logger.warning('No CatalogCourses found with ID "%s".', self.catalog_id)
         return CatalogCourses.objects.none()
 
+    @classmethod
+    def bulk_update_courses(cls, catalog_ids, course_ids, action='add'):
+        """
+        Add, remove or replace the AvailableCourse objects of many catalogs at once.
+
+        As with `add_courses_to_catalog`, only active courses are added.
+
+        Args:
+            catalog_ids (list[uuid.UUID or str]): Ids of the CatalogCourses instances to modify.
+            course_ids (list[CourseKey]): Course IDs applied to every catalog.
+            action (str): One of `add`, `remove` or `replace`. Defaults to `add`.
+
+        Returns:
+            dict: Number of `added` and `removed` courses indexed by the id of every
+            existing catalog. Ids that do not match a CatalogCourses instance are left out.
+        """
+        catalog_ids = {validate_catalog_id(catalog_id) for catalog_id in catalog_ids}
+        course_ids = validate_course_ids(course_ids)
+
+        existing_catalog_ids = set(CatalogCourses.objects.filter(pk__in=catalog_ids).values_list('pk', flat=True))
+        if existing_catalog_ids != catalog_ids:
+            logger.warning('CatalogCourses not found: %s', catalog_ids - existing_catalog_ids)
+
+        available_courses = AvailableCourse.objects.filter(course__id__in=[str(course_id) for course_id in course_ids])
+        if action != 'remove':
+            available_courses = available_courses.filter(active=True)
+
+        return apply_bulk_membership(
+            CatalogCourses.courses,
+            existing_catalog_ids,
+            available_courses.values_list('pk', flat=True),
+            action,
+        )
+
     def add_courses_to_catalog(self, course_ids=[]):
         """
         Add multiple AvailableCourse objects to the catalog.
@@ -495,8 +990,7 @@ class CatalogCoursesAPIClient:
         if not catalog:
             return CatalogCourses.objects.none()
 
-        catalog.courses.add(active_courses)
-        catalog.save()
+        catalog.courses.add(*active_courses)
 
         return catalog
 
@@ -528,7 +1022,6 @@ class CatalogCoursesAPIClient:
         if not catalog:
             return CatalogCourses.objects.none()
 
-        catalog.courses.remove(courses_to_remove)
-        catalog.save()
+        catalog.courses.remove(*courses_to_remove)
 
         return catalog
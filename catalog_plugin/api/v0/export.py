@@ -0,0 +1,92 @@
+"""
+Streaming export of the course overviews of a catalog.
+
+The rows are read with `.iterator()`, which uses server-side cursors where the
+database supports them, and written to a `StreamingHttpResponse` one chunk at a
+time, so the memory used does not depend on the size of the catalog.
+
+Attributes:
+    EXPORT_FORMATS (dict): Content type and file extension of every export format.
+    DEFAULT_EXPORT_FIELDS (list): Exported CourseOverview fields when the
+        `CP_EXPORT_COURSE_FIELDS` setting is not defined.
+    DEFAULT_EXPORT_CHUNK_SIZE (int): Rows fetched per round trip when the
+        `CP_EXPORT_CHUNK_SIZE` setting is not defined.
+"""
+import csv
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'csv': ('text/csv', 'csv'),
+}
+DEFAULT_EXPORT_FIELDS = ['id', 'display_name', 'org', 'start', 'end']
+DEFAULT_EXPORT_CHUNK_SIZE = 2000
+
+
+class EchoBuffer:
+    """File-like object returning what is written, so `csv.writer` can produce one line at a time."""
+
+    def write(self, value):
+        """Return the written value instead of storing it."""
+        return value
+
+
+def get_export_fields():
+    """Return the exported CourseOverview fields."""
+    return list(getattr(settings, 'CP_EXPORT_COURSE_FIELDS', DEFAULT_EXPORT_FIELDS))
+
+
+def iter_course_rows(rows):
+    """Yield the rows of a `values_list` queryset in chunks of `CP_EXPORT_CHUNK_SIZE`."""
+    chunk_size = getattr(settings, 'CP_EXPORT_CHUNK_SIZE', DEFAULT_EXPORT_CHUNK_SIZE)
+
+    yield from rows.iterator(chunk_size=chunk_size)
+
+
+def stream_ndjson(rows, fields):
+    """Yield one JSON object per course overview, each on its own line."""
+    for row in iter_course_rows(rows):
+        yield json.dumps(dict(zip(fields, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+def stream_csv(rows, fields):
+    """Yield a CSV header followed by one line per course overview."""
+    writer = csv.writer(EchoBuffer())
+
+    yield writer.writerow(fields)
+    for row in iter_course_rows(rows):
+        yield writer.writerow(str(value) if value is not None else '' for value in row)
+
+
+def export_response(catalog, export_format):
+    """
+    Return a streaming response with the course overviews of a catalog.
+
+    The filter of the catalog is resolved before the response is created, so
+    an invalid dynamic query or a composite cycle is raised here instead of
+    in the middle of the stream, after the headers were sent.
+
+    Args:
+        catalog (FlexibleCatalogModel): The catalog, resolved to its subclass.
+        export_format (str): One of the `EXPORT_FORMATS`.
+
+    Returns:
+        StreamingHttpResponse: The export, as an attachment named after the catalog slug.
+
+    Raises:
+        ValueError: If the query string of a dynamic catalog is not valid.
+        ValidationError: If a composite catalog contains itself.
+    """
+    content_type, extension = EXPORT_FORMATS[export_format]
+    fields = get_export_fields()
+    rows = catalog.get_course_overviews().order_by('pk').values_list(*fields)
+    stream = stream_ndjson if export_format == 'ndjson' else stream_csv
+
+    response = StreamingHttpResponse(stream(rows, fields), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{catalog.slug or catalog.pk}.{extension}"'
+
+    return response
@@ -1,5 +1,6 @@
 """Filters for the api.v0 module."""
 import django_filters
+from rest_framework import filters
 from catalog_plugin.models import (
     FlexibleCatalogModel,
     AvailableCourse,
@@ -64,3 +65,23 @@ class CatalogCoursesFilter(django_filters.FilterSet):
         """Meta class."""
         model = CatalogCourses
         fields = ['name', 'active', 'course_id']
+
+
+class SubquerySearchFilter(filters.SearchFilter):
+    """
+    SearchFilter that matches the search terms in a subquery.
+
+    Searching through many-to-many relations joins one row per related object.
+    Instead of deduplicating the full rows with DISTINCT, this filter restricts
+    the queryset to the primary keys matched by the search, so the results and
+    any prefetches stay free of duplicates.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        """Restrict the queryset to the primary keys that match the search terms."""
+        if not self.get_search_terms(request) or not self.get_search_fields(view, request):
+            return queryset
+
+        matching_rows = super().filter_queryset(request, queryset.model._default_manager.all(), view)
+
+        return queryset.filter(pk__in=matching_rows.values('pk'))
@@ -0,0 +1,144 @@
+"""Viewset mixins for the api.v0 module."""
+import hashlib
+
+from django.db.models import Count, Max, Sum
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+from catalog_plugin.instrumentation import measure
+
+
+class ConditionalGetMixin:
+    """
+    Answer conditional GET requests on catalog resources.
+
+    The list and detail actions send a strong `ETag` and honor `If-None-Match`.
+    The ETag is derived from the `modified` timestamp, the membership version
+    and the course counts of the catalogs, so changing a catalog, the courses
+    it resolves or their active flags produces a new ETag. When the client copy
+    is still fresh, a `304 Not Modified` response is returned before any
+    serialization work.
+
+    The detail action also sends a `Last-Modified` header and honors
+    `If-Modified-Since`, with the whole-second precision of HTTP dates. The list
+    action does not, since deleting a catalog does not move the latest
+    modification time of the remaining ones.
+
+    The list ETag is computed with a single aggregate query over the filtered
+    queryset, and every ETag includes the full path and the `Accept` header of
+    the request, since they select the representation.
+    """
+
+    def get_etag(self, *parts):
+        """Return a strong ETag for the requested representation of the given state."""
+        digest = hashlib.sha256()
+        for part in (self.request.get_full_path(), self.request.META.get('HTTP_ACCEPT', ''), *parts):
+            digest.update(str(part).encode())
+            digest.update(b'\0')
+
+        return f'"{digest.hexdigest()}"'
+
+    def get_conditional_response(self, etag, last_modified):
+        """
+        Return a `304 Not Modified` response when the client copy is fresh, None otherwise.
+
+        The modification time is truncated to whole seconds like the `Last-Modified`
+        header, so a client sending that header back gets a 304.
+        """
+        response = get_conditional_response(
+            self.request,
+            etag=etag,
+            last_modified=int(last_modified.timestamp()) if last_modified else None,
+        )
+
+        if response is not None:
+            self.set_validators(response, etag, last_modified)
+
+        return response
+
+    @staticmethod
+    def set_validators(response, etag, last_modified):
+        """Set the ETag and Last-Modified headers of a response."""
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(int(last_modified.timestamp()))
+
+    def retrieve(self, request, *args, **kwargs):
+        """Retrieve a catalog unless the client copy is still fresh."""
+        instance = self.get_object()
+        last_modified = max(filter(None, (instance.modified, instance.membership_modified)))
+        etag = self.get_etag(
+            instance.pk,
+            instance.modified.isoformat(),
+            instance.membership_version,
+            instance.course_count,
+            instance.active_course_count,
+        )
+
+        response = self.get_conditional_response(etag, last_modified)
+        if response is not None:
+            return response
+
+        response = Response(self.get_serializer(instance).data)
+        self.set_validators(response, etag, last_modified)
+
+        return response
+
+    def list(self, request, *args, **kwargs):
+        """List the catalogs unless the client copy is still fresh."""
+        summary = self.filter_queryset(self.get_queryset()).aggregate(
+            count=Count('pk'),
+            modified=Max('modified'),
+            membership_modified=Max('membership_modified'),
+            membership_version=Sum('membership_version'),
+            course_count=Sum('course_count'),
+            active_course_count=Sum('active_course_count'),
+        )
+        last_modified = max(filter(None, (summary['modified'], summary['membership_modified'])), default=None)
+        etag = self.get_etag(
+            summary['count'],
+            last_modified.isoformat() if last_modified else '',
+            summary['membership_version'],
+            summary['course_count'],
+            summary['active_course_count'],
+        )
+
+        response = self.get_conditional_response(etag, None)
+        if response is not None:
+            return response
+
+        response = super().list(request, *args, **kwargs)
+        self.set_validators(response, etag, None)
+
+        return response
+
+
+class InstrumentedViewSetMixin:
+    """
+    Measure every request handled by the viewset.
+
+    The measurements are reported as `api.v0.<viewset>.<action>`, with the
+    number of serialized objects as rows. See `catalog_plugin.instrumentation`.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        """Dispatch the request inside a measurement."""
+        with measure(f'api.v0.{type(self).__name__}') as measurement:
+            response = super().dispatch(request, *args, **kwargs)
+            if measurement is not None:
+                measurement.name = f'{measurement.name}.{getattr(self, "action", None) or request.method.lower()}'
+                measurement.rows = self.count_response_rows(response)
+
+        return response
+
+    @staticmethod
+    def count_response_rows(response):
+        """Return the number of objects in the response data, None when it has no data."""
+        data = getattr(response, 'data', None)
+
+        if isinstance(data, dict) and isinstance(data.get('results'), list):
+            return len(data['results'])
+        if isinstance(data, list):
+            return len(data)
+        return None if data is None else 1
@@ -0,0 +1,61 @@
+"""Pagination classes for the api.v0 module."""
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+DEFAULT_PAGE_SIZE = 100
+DEFAULT_MAX_PAGE_SIZE = 1000
+
+
+def get_page_size(request, page_size_query_param='page_size'):
+    """Return the page size requested with the query parameter, bounded by the `CP_API_MAX_PAGE_SIZE` setting."""
+    page_size = getattr(settings, 'CP_API_PAGE_SIZE', DEFAULT_PAGE_SIZE)
+    max_page_size = getattr(settings, 'CP_API_MAX_PAGE_SIZE', DEFAULT_MAX_PAGE_SIZE)
+
+    try:
+        requested_page_size = int(request.query_params[page_size_query_param])
+    except (KeyError, ValueError):
+        requested_page_size = 0
+
+    if requested_page_size > 0:
+        page_size = requested_page_size
+
+    return min(page_size, max_page_size)
+
+
+class CatalogCursorPagination(CursorPagination):
+    """
+    Cursor pagination on the creation date and id of the catalogs.
+
+    Cursors point to a position in a stable ordering instead of an offset, so
+    every page costs the same and clients can stream through large listings
+    without OFFSET scans. The page size can be requested with `page_size` and
+    is bounded by the `CP_API_MAX_PAGE_SIZE` setting.
+    """
+
+    ordering = ('created', 'id')
+    page_size_query_param = 'page_size'
+
+    def get_page_size(self, request):
+        """Return the requested page size, bounded by the configured maximum."""
+        return get_page_size(request, self.page_size_query_param)
+
+    def get_ordering(self, request, queryset, view):
+        """
+        Return the requested ordering, with the id appended as a tiebreaker.
+
+        Cursors hold the value of the first ordering field and an offset among
+        the rows sharing it, so those rows must come in a stable order, e.g.
+        when ordering by a non-unique `name`.
+        """
+        ordering = tuple(super().get_ordering(request, queryset, view))
+
+        if not any(field.lstrip('-') in ('id', 'pk') for field in ordering):
+            ordering += ('-id' if ordering[0].startswith('-') else 'id',)
+
+        return ordering
+
+
+class AvailableCourseCursorPagination(CatalogCursorPagination):
+    """Cursor pagination on the id of the available courses."""
+
+    ordering = ('id',)
@@ -1,14 +1,17 @@
 """Serializers module for API v0."""
 # your_app_name/serializers.py
+from django.conf import settings
 from rest_framework import serializers
 from opaque_keys import InvalidKeyError
 from opaque_keys.edx.keys import CourseKey
 
+from catalog_plugin.api.v0.pagination import DEFAULT_MAX_PAGE_SIZE
 from catalog_plugin.models import (
     FlexibleCatalogModel,
     AvailableCourse,
     FixedCatalog,
     CatalogCourses,
+    MembershipEvent,
 )
 
 
@@ -32,21 +35,52 @@ class CourseKeySerializer(serializers.BaseSerializer):  # pylint: disable=abstra
 class AvailableCourseSerializer(serializers.ModelSerializer):
     """
     Serializer for the AvailableCourse model.
+
+    The course key is read from the foreign key column, so serializing a list
+    does not fetch the related course overviews.
     """
-    course = CourseKeySerializer()
+    course = CourseKeySerializer(source='course_id')
 
     class Meta:
         model = AvailableCourse
         fields = ['id', 'course', 'active']
 
 
+SUMMARY_FIELDS = ['course_count', 'active_course_count', 'membership_modified']
+
+
 class FlexibleCatalogSerializer(serializers.ModelSerializer):
     """
     Serializer for the FlexibleCatalog model.
+
+    The course counts and the last membership change are denormalized columns
+    of the catalog, so listing them does not run any extra query.
     """
     class Meta:
         model = FlexibleCatalogModel
-        fields = ['id', 'slug', 'name']
+        fields = ['id', 'slug', 'name', *SUMMARY_FIELDS]
+
+
+class ExpandedFlexibleCatalogSerializer(FlexibleCatalogSerializer):
+    """
+    Serializer for the FlexibleCatalog model including its type and course keys.
+
+    The course keys are read from the `course_keys` context entry, a dict
+    indexed by catalog id resolved in bulk by the view.
+    """
+    type = serializers.SerializerMethodField()
+    course_keys = serializers.SerializerMethodField()
+
+    class Meta(FlexibleCatalogSerializer.Meta):
+        fields = ['id', 'slug', 'name', *SUMMARY_FIELDS, 'type', 'course_keys']
+
+    def get_type(self, obj):
+        """Return the name of the catalog subclass."""
+        return obj.__class__.__name__
+
+    def get_course_keys(self, obj):
+        """Return the course keys resolved for the catalog."""
+        return self.context.get('course_keys', {}).get(obj.pk, [])
 
 
 class FixedCatalogSerializer(serializers.ModelSerializer):
@@ -61,7 +95,7 @@ class FixedCatalogSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = FixedCatalog
-        fields = ['id', 'slug', 'name', 'course_runs']
+        fields = ['id', 'slug', 'name', *SUMMARY_FIELDS, 'course_runs']
 
 
 class CatalogCoursesSerializer(serializers.ModelSerializer):
@@ -75,4 +109,41 @@ class CatalogCoursesSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = CatalogCourses
-        fields = ['id', 'slug', 'name', 'courses']
+        fields = ['id', 'slug', 'name', *SUMMARY_FIELDS, 'courses']
+
+
+class CourseCatalogsQuerySerializer(serializers.Serializer):  # pylint: disable=abstract-method
+    """
+    Serializer for the query parameters of the course catalogs endpoint.
+
+    The `course_id` parameter can be repeated, up to the `CP_API_MAX_PAGE_SIZE` setting.
+    """
+    course_id = serializers.ListField(child=CourseKeySerializer(), allow_empty=False)
+
+    def validate_course_id(self, value):
+        """Limit the number of course keys looked up by a single request."""
+        max_course_ids = getattr(settings, 'CP_API_MAX_PAGE_SIZE', DEFAULT_MAX_PAGE_SIZE)
+
+        if len(value) > max_course_ids:
+            raise serializers.ValidationError(f'At most {max_course_ids} course IDs can be requested.')
+
+        return value
+
+
+class MembershipEventSerializer(serializers.ModelSerializer):
+    """
+    Serializer for the MembershipEvent model.
+    """
+
+    class Meta:
+        model = MembershipEvent
+        fields = ['seq', 'event', 'catalog_id', 'course_id', 'created']
+
+
+class MembershipEventsQuerySerializer(serializers.Serializer):  # pylint: disable=abstract-method
+    """
+    Serializer for the query parameters of the membership events endpoint.
+
+    `since` is the last sequence number applied by the consumer, 0 to read the whole changelog.
+    """
+    since = serializers.IntegerField(min_value=0, default=0)
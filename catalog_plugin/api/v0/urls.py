@@ -11,6 +11,8 @@ router.register(r'flexible-catalogs', views.FlexibleCatalogViewSet, basename='fl
 router.register(r'available-courses', views.AvailableCourseViewSet, basename='availablecourse')
 router.register(r'fixed-catalogs', views.FixedCatalogViewSet, basename='fixedcatalog')
 router.register(r'catalog-courses', views.CatalogCoursesViewSet, basename='catalogcourses')
+router.register(r'course-catalogs', views.CourseCatalogsViewSet, basename='coursecatalogs')
+router.register(r'membership-events', views.MembershipEventsViewSet, basename='membershipevents')
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -1,9 +1,18 @@
 """Views module for API v0."""
 from edx_rest_framework_extensions.auth.jwt.authentication import JwtAuthentication
 from edx_rest_framework_extensions.permissions import IsAuthenticated, IsStaff
-from rest_framework import viewsets, filters
+from rest_framework import viewsets, filters, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Prefetch
 from django_filters.rest_framework import DjangoFilterBackend
 
+from catalog_plugin.changelog import get_events, get_resync_seq
+from catalog_plugin.edxapp_wrapper.course_module import course_overview
+from catalog_plugin.membership import get_catalog_ids_for_courses, get_many_cached_course_keys
 from catalog_plugin.models import (
     FlexibleCatalogModel,
     AvailableCourse,
@@ -11,20 +20,28 @@ from catalog_plugin.models import (
     CatalogCourses,
 )
 from catalog_plugin.api.v0.serializers import (
+    ExpandedFlexibleCatalogSerializer,
     FlexibleCatalogSerializer,
     AvailableCourseSerializer,
     FixedCatalogSerializer,
     CatalogCoursesSerializer,
+    CourseCatalogsQuerySerializer,
+    MembershipEventSerializer,
+    MembershipEventsQuerySerializer,
 )
 from catalog_plugin.api.v0.filters import (
     FlexibleCatalogFilter,
     AvailableCourseFilter,
     FixedCatalogFilter,
     CatalogCoursesFilter,
+    SubquerySearchFilter,
 )
+from catalog_plugin.api.v0.export import EXPORT_FORMATS, export_response
+from catalog_plugin.api.v0.mixins import ConditionalGetMixin, InstrumentedViewSetMixin
+from catalog_plugin.api.v0.pagination import AvailableCourseCursorPagination, CatalogCursorPagination, get_page_size
 
 
-class AvailableCourseViewSet(viewsets.ModelViewSet):
+class AvailableCourseViewSet(InstrumentedViewSetMixin, viewsets.ModelViewSet):
     """
     A viewset for viewing and editing AvailableCourse instances.
     """
@@ -33,60 +50,188 @@ class AvailableCourseViewSet(viewsets.ModelViewSet):
     permission_classes = (IsAuthenticated, IsStaff)
     queryset = AvailableCourse.objects.all()
     serializer_class = AvailableCourseSerializer
+    pagination_class = AvailableCourseCursorPagination
 
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_class = AvailableCourseFilter
-    search_fields = ['course__name']
+    search_fields = ['course__display_name']
     ordering_fields = ['course', 'active', 'id']
     ordering = ['id']
 
 
-class FlexibleCatalogViewSet(viewsets.ModelViewSet):
+class FlexibleCatalogViewSet(InstrumentedViewSetMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     """
     A viewset for viewing and editing FlexibleCatalogModel instances.
+
+    With `?expand=courses`, catalogs are resolved to their subclasses and each
+    one includes its type and course keys. The course keys of a page are
+    resolved together, with one query per catalog type on cache misses.
+
+    The `export` action streams the course overviews of a catalog as NDJSON or
+    CSV, selected with `?export_format=`.
     """
 
     authentication_classes = (JwtAuthentication,)
     permission_classes = (IsAuthenticated, IsStaff)
     queryset = FlexibleCatalogModel.objects.all()
     serializer_class = FlexibleCatalogSerializer
+    pagination_class = CatalogCursorPagination
 
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_class = FlexibleCatalogFilter
     search_fields = ['name', 'slug']
-    ordering_fields = ['name', 'slug', 'id']
-    ordering = ['name']
-
-
-class FixedCatalogViewSet(viewsets.ModelViewSet):
+    ordering_fields = ['name', 'slug', 'created', 'id']
+    ordering = ['created', 'id']
+
+    def expand_courses(self):
+        """Return whether the request asks for the catalog types and course keys."""
+        return 'courses' in self.request.query_params.get('expand', '').split(',')
+
+    def get_queryset(self):
+        """Resolve the catalog subclasses when expanding the courses or exporting a catalog."""
+        queryset = super().get_queryset()
+        return queryset.select_subclasses() if self.expand_courses() or self.action == 'export' else queryset
+
+    def get_serializer_class(self):
+        """Use the expanded serializer when expanding the courses."""
+        return ExpandedFlexibleCatalogSerializer if self.expand_courses() else FlexibleCatalogSerializer
+
+    def get_serializer(self, *args, **kwargs):
+        """Resolve the course keys of every serialized catalog at once when expanding the courses."""
+        if args and self.expand_courses():
+            catalogs = args[0] if kwargs.get('many') else [args[0]]
+            kwargs.setdefault('context', self.get_serializer_context())
+            kwargs['context']['course_keys'] = get_many_cached_course_keys(catalogs)
+        return super().get_serializer(*args, **kwargs)
+
+    @action(detail=True, methods=['get'])
+    def export(self, request, pk=None):  # pylint: disable=unused-argument
+        """Stream the course overviews of the catalog as NDJSON or CSV."""
+        export_format = request.query_params.get('export_format', 'ndjson')
+
+        if export_format not in EXPORT_FORMATS:
+            raise ValidationError({'export_format': f'Must be one of: {", ".join(EXPORT_FORMATS)}.'})
+
+        try:
+            return export_response(self.get_object(), export_format)
+        except DjangoValidationError as error:
+            raise ValidationError({'detail': error.messages}) from error
+        except ValueError as error:
+            raise ValidationError({'detail': [str(error)]}) from error
+
+
+class FixedCatalogViewSet(InstrumentedViewSetMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     """
     A viewset for viewing and editing FixedCatalog instances.
     """
 
     authentication_classes = (JwtAuthentication,)
     permission_classes = (IsAuthenticated, IsStaff)
-    queryset = FixedCatalog.objects.all()
+    queryset = FixedCatalog.objects.prefetch_related(
+        Prefetch('course_runs', queryset=course_overview().objects.only('pk')),
+    )
     serializer_class = FixedCatalogSerializer
+    pagination_class = CatalogCursorPagination
 
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_class = FixedCatalogFilter
     search_fields = ['name']
     ordering_fields = ['name', 'created', 'modified', 'id']
-    ordering = ['created']
+    ordering = ['created', 'id']
 
 
-class CatalogCoursesViewSet(viewsets.ModelViewSet):
+class CatalogCoursesViewSet(InstrumentedViewSetMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     """
     A viewset for viewing and editing CatalogCourses instances.
     """
 
     authentication_classes = (JwtAuthentication,)
     permission_classes = (IsAuthenticated, IsStaff)
-    queryset = CatalogCourses.objects.all()
+    queryset = CatalogCourses.objects.prefetch_related(
+        Prefetch('courses', queryset=AvailableCourse.objects.only('pk')),
+    )
     serializer_class = CatalogCoursesSerializer
+    pagination_class = CatalogCursorPagination
 
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, SubquerySearchFilter, filters.OrderingFilter]
     filterset_class = CatalogCoursesFilter
-    search_fields = ['name', 'courses__course__name']
+    search_fields = ['name', 'courses__course__display_name']
     ordering_fields = ['name', 'created', 'modified', 'id']
-    ordering = ['name']
+    ordering = ['created', 'id']
+
+
+class CourseCatalogsViewSet(InstrumentedViewSetMixin, viewsets.ViewSet):
+    """
+    A viewset to find the catalogs that contain the given courses.
+
+    Every `course_id` query parameter is answered with the ids of the catalogs
+    that contain it, looked up in a fixed number of queries. For example:
+
+        GET /course-catalogs/?course_id=course-v1:edX+DemoX+Demo&course_id=course-v1:edX+Other+2024
+    """
+
+    authentication_classes = (JwtAuthentication,)
+    permission_classes = (IsAuthenticated, IsStaff)
+
+    def list(self, request):
+        """Return the ids of the catalogs containing each requested course."""
+        serializer = CourseCatalogsQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        course_ids = [str(course_id) for course_id in serializer.validated_data['course_id']]
+        catalog_ids = get_catalog_ids_for_courses(course_ids)
+
+        return Response({
+            'results': [
+                {'course_id': course_id, 'catalog_ids': catalog_ids[course_id]}
+                for course_id in dict.fromkeys(course_ids)
+            ],
+        })
+
+
+class MembershipEventsViewSet(InstrumentedViewSetMixin, viewsets.ViewSet):
+    """
+    A viewset to read the membership changelog after a sequence number.
+
+    Consumers apply the returned events in order, then send the `since` value of
+    the response to read the following ones. `next` links to them while full
+    pages are returned. For example:
+
+        GET /membership-events/?since=1500&page_size=500
+
+    When events after `since` were pruned, a `410 Gone` response with
+    `resync_required` tells the consumer to read the catalogs again, then to
+    read the events after the `since` value of the response.
+    """
+
+    authentication_classes = (JwtAuthentication,)
+    permission_classes = (IsAuthenticated, IsStaff)
+
+    def list(self, request):
+        """Return the events recorded after the `since` sequence number."""
+        serializer = MembershipEventsQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        resync_seq = get_resync_seq(serializer.validated_data['since'])
+
+        if resync_seq is not None:
+            return Response(
+                {
+                    'detail': 'The events after the requested sequence number were pruned.',
+                    'resync_required': True,
+                    'since': resync_seq,
+                },
+                status=status.HTTP_410_GONE,
+            )
+
+        page_size = get_page_size(request)
+        events = get_events(serializer.validated_data['since'], page_size)
+        since = events[-1].seq if events else serializer.validated_data['since']
+        next_url = None
+
+        if len(events) == page_size:
+            next_url = replace_query_param(request.build_absolute_uri(), 'since', since)
+
+        return Response({
+            'results': MembershipEventSerializer(events, many=True).data,
+            'since': since,
+            'next': next_url,
+        })
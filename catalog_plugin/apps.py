@@ -26,3 +26,7 @@ class CatalogPluginConfig(AppConfig):
             },
         },
     }
+
+    def ready(self):
+        """Connect the signal receivers of the plugin."""
+        from catalog_plugin import signals  # pylint: disable=import-outside-toplevel, unused-import
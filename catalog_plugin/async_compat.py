@@ -0,0 +1,58 @@
+"""
+Async ORM and cache calls that work on every supported Django version.
+
+Django 4.1 added async queryset methods such as `aget()` and `async for`, and
+Django 4.0 async cache methods such as `aget_many()`. On older versions these
+helpers fall back to running the synchronous call through `sync_to_async`, so
+the async read path of the API clients has the same behavior everywhere.
+
+Database calls are always thread sensitive, as Django's own async methods are,
+so they share the connection of the request. Several queries that belong
+together should be grouped in one `sync_to_async` call rather than awaited one
+by one, since every call is a hop to the database thread.
+"""
+from asgiref.sync import sync_to_async
+
+
+async def aget(queryset, **kwargs):
+    """Return the single object of a queryset matching the lookups, like `QuerySet.get()`."""
+    if hasattr(queryset, 'aget'):
+        return await queryset.aget(**kwargs)
+    return await sync_to_async(queryset.get)(**kwargs)
+
+
+async def alist(queryset):
+    """Evaluate a queryset into a list."""
+    if hasattr(queryset, '__aiter__'):
+        return [item async for item in queryset]
+    return await sync_to_async(list)(queryset)
+
+
+async def acache_get(cache, key):
+    """Return the value of a cache key, or None when it is missing."""
+    if hasattr(cache, 'aget'):
+        return await cache.aget(key)
+    return await sync_to_async(cache.get, thread_sensitive=False)(key)
+
+
+async def acache_set(cache, key, value, timeout):
+    """Store a value in the cache."""
+    if hasattr(cache, 'aset'):
+        await cache.aset(key, value, timeout)
+    else:
+        await sync_to_async(cache.set, thread_sensitive=False)(key, value, timeout)
+
+
+async def acache_get_many(cache, keys):
+    """Return the values of the cache keys that are stored, indexed by key."""
+    if hasattr(cache, 'aget_many'):
+        return await cache.aget_many(keys)
+    return await sync_to_async(cache.get_many, thread_sensitive=False)(keys)
+
+
+async def acache_set_many(cache, data, timeout):
+    """Store many values in the cache."""
+    if hasattr(cache, 'aset_many'):
+        await cache.aset_many(data, timeout)
+    else:
+        await sync_to_async(cache.set_many, thread_sensitive=False)(data, timeout)
@@ -0,0 +1,229 @@
+"""
+Append-only changelog of the catalog memberships, for incremental synchronization.
+
+Every change of a catalog membership is recorded as a `MembershipEvent` in
+the transaction of the change, with a monotonic sequence number, so consumers
+read the events after the last sequence number they applied instead of
+downloading whole catalogs again:
+
+- `course_added` and `course_removed` for fixed catalogs, catalog courses and
+  materialized dynamic catalogs, from the many-to-many signals, the bulk
+  client methods, the importer and the materialization.
+- `membership_changed` for the catalogs whose courses are not stored, the live
+  dynamic, composite and plain catalogs, when their membership version is
+  bumped. Their courses should be read again.
+- `catalog_created`, `catalog_renamed` and `catalog_deleted` when a catalog is saved or deleted.
+- `course_activated` and `course_deactivated` when an AvailableCourse changes its active flag.
+
+Sequence numbers are allocated when the events are written, so a transaction
+still in progress can commit events below the ones already visible. Readers
+stop before the first missing sequence number until the event after it is
+`CP_MEMBERSHIP_EVENTS_GAP_TIMEOUT` seconds old, so they never move past the
+events of such transactions while they can still commit. Gaps left by rolled
+back transactions are skipped once they time out.
+
+Events are kept for `CP_MEMBERSHIP_EVENTS_RETENTION` seconds, pruned by the
+readers on their first read in each process, then at most once every tenth
+of it, so short-lived workers prune too. Consumers whose last sequence number
+is older than the retained events must read the catalogs again, see
+`get_resync_seq`.
+
+Attributes:
+    DEFAULT_GAP_TIMEOUT (int): Seconds the readers wait for a missing sequence number when
+        `CP_MEMBERSHIP_EVENTS_GAP_TIMEOUT` is not defined.
+    DEFAULT_RETENTION (int): Seconds the events are kept when `CP_MEMBERSHIP_EVENTS_RETENTION`
+        is not defined.
+    EVENT_BATCH_SIZE (int): Number of events written by each INSERT.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from catalog_plugin.models import AvailableCourse, CatalogCourses, DynamicCatalog, FixedCatalog, MembershipEvent
+
+DEFAULT_GAP_TIMEOUT = 60
+DEFAULT_RETENTION = 7 * 24 * 60 * 60
+EVENT_BATCH_SIZE = 1000
+
+_pruned_at = None
+
+
+def stores_courses(catalog):
+    """Return whether the courses of a catalog are stored, so their changes are recorded one by one."""
+    if isinstance(catalog, DynamicCatalog):
+        return catalog.materialized
+    return isinstance(catalog, (FixedCatalog, CatalogCourses))
+
+
+def record_events(events):
+    """Write events in the current transaction, without any query when there is none."""
+    MembershipEvent.objects.bulk_create(list(events), batch_size=EVENT_BATCH_SIZE)
+
+
+def record_activation_events(course_states):
+    """
+    Record the activation or deactivation of courses.
+
+    Args:
+        course_states (Iterable[tuple]): `(course key, active)` pairs.
+    """
+    record_events(
+        MembershipEvent(
+            event=MembershipEvent.COURSE_ACTIVATED if active else MembershipEvent.COURSE_DEACTIVATED,
+            course_id=str(course_id),
+        )
+        for course_id, active in course_states
+    )
+
+
+def record_course_events(event, pairs):
+    """
+    Record an event for every pair of catalog id and course key.
+
+    Args:
+        event (str): `course_added` or `course_removed`.
+        pairs (Iterable[tuple]): `(catalog id, course key)` pairs.
+    """
+    record_events(
+        MembershipEvent(event=event, catalog_id=catalog_id, course_id=str(course_id)) for catalog_id, course_id in pairs
+    )
+
+
+def record_catalog_events(event, catalog_ids):
+    """Record an event for every given catalog."""
+    record_events(MembershipEvent(event=event, catalog_id=catalog_id) for catalog_id in catalog_ids)
+
+
+def record_membership_events(relation, event, pairs):
+    """
+    Record the courses added to or removed from the catalogs of a many-to-many relation.
+
+    The targets of `CatalogCourses.courses` are AvailableCourse objects, whose
+    course keys are read with one query.
+
+    Args:
+        relation (ManyToManyDescriptor): The catalog relation, e.g. `FixedCatalog.course_runs`.
+        event (str): `course_added` or `course_removed`.
+        pairs (Iterable[tuple]): `(catalog id, target id)` pairs.
+    """
+    pairs = list(pairs)
+
+    if pairs and relation.field.related_model is AvailableCourse:
+        course_ids = dict(
+            AvailableCourse.objects.filter(pk__in={target_id for _, target_id in pairs}).values_list('pk', 'course_id'),
+        )
+        pairs = [(catalog_id, course_ids[target_id]) for catalog_id, target_id in pairs if target_id in course_ids]
+
+    if pairs:
+        record_course_events(event, pairs)
+
+
+def get_membership_pairs(relation, catalog_ids=None, target_ids=None):
+    """
+    Return the stored `(catalog id, target id)` pairs of a many-to-many relation.
+
+    Args:
+        relation (ManyToManyDescriptor): The catalog relation, e.g. `FixedCatalog.course_runs`.
+        catalog_ids (Iterable or None): Restrict the pairs to these catalogs.
+        target_ids (Iterable or None): Restrict the pairs to these related objects.
+
+    Returns:
+        list[tuple]: The pairs, read with one query.
+    """
+    through = relation.through
+    catalog_attname = through._meta.get_field(relation.field.m2m_field_name()).attname
+    target_attname = through._meta.get_field(relation.field.m2m_reverse_field_name()).attname
+    rows = through.objects.all()
+
+    if catalog_ids is not None:
+        rows = rows.filter(**{f'{catalog_attname}__in': catalog_ids})
+    if target_ids is not None:
+        rows = rows.filter(**{f'{target_attname}__in': target_ids})
+
+    return list(rows.values_list(catalog_attname, target_attname))
+
+
+def get_events(since, limit):
+    """
+    Return the committed events recorded after a sequence number, in order.
+
+    The events stop before the first missing sequence number while the event
+    after it is more recent than `CP_MEMBERSHIP_EVENTS_GAP_TIMEOUT` seconds,
+    since the missing event may belong to a transaction still in progress.
+
+    Args:
+        since (int): The last sequence number applied by the consumer.
+        limit (int): The maximum number of events.
+
+    Returns:
+        list[MembershipEvent]: The events that can be applied in order.
+    """
+    prune_if_due()
+    gap_timeout = getattr(settings, 'CP_MEMBERSHIP_EVENTS_GAP_TIMEOUT', DEFAULT_GAP_TIMEOUT)
+    timed_out = timezone.now() - timedelta(seconds=gap_timeout)
+    events = list(MembershipEvent.objects.filter(seq__gt=since).order_by('seq')[:limit])
+    expected_seq = since + 1
+
+    for index, event in enumerate(events):
+        if event.seq != expected_seq and event.created > timed_out:
+            return events[:index]
+        expected_seq = event.seq + 1
+
+    return events
+
+
+def get_resync_seq(since):
+    """
+    Return where a consumer resumes after reading the catalogs again, when the events after `since` were pruned.
+
+    Replaying the retained events over the new copy is safe, since the last
+    event of every catalog and course reflects its current state.
+
+    Args:
+        since (int): The last sequence number applied by the consumer.
+
+    Returns:
+        int or None: The sequence number to read the events after, None when no event after `since` was pruned.
+    """
+    oldest_seq = MembershipEvent.objects.order_by('seq').values_list('seq', flat=True).first()
+
+    if oldest_seq is None or since >= oldest_seq - 1:
+        return None
+
+    return oldest_seq - 1
+
+
+def prune_events():
+    """
+    Delete the events older than `CP_MEMBERSHIP_EVENTS_RETENTION` seconds.
+
+    The last event is always kept, so `get_resync_seq` can tell the pruned
+    events apart from the ones not recorded yet.
+
+    Returns:
+        int: The number of deleted events.
+    """
+    retention = getattr(settings, 'CP_MEMBERSHIP_EVENTS_RETENTION', DEFAULT_RETENTION)
+    last_seq = MembershipEvent.objects.order_by('-seq').values_list('seq', flat=True).first()
+
+    if last_seq is None:
+        return 0
+
+    deleted, _ = MembershipEvent.objects.filter(
+        seq__lt=last_seq,
+        created__lt=timezone.now() - timedelta(seconds=retention),
+    ).delete()
+    return deleted
+
+
+def prune_if_due():
+    """Prune the events on the first read of each process, then at most once every tenth of the retention."""
+    global _pruned_at  # pylint: disable=global-statement
+
+    retention = getattr(settings, 'CP_MEMBERSHIP_EVENTS_RETENTION', DEFAULT_RETENTION)
+
+    if _pruned_at is None or time.monotonic() - _pruned_at >= retention / 10:
+        _pruned_at = time.monotonic()
+        prune_events()
@@ -0,0 +1,86 @@
+"""
+Request-scoped identity map of the catalogs fetched by the API clients.
+
+While a request is being served, the catalogs fetched by `FlexibleCatalogAPIClient`
+are kept by uuid, slug and lookup dict, so every client built for the same catalog
+during the request shares one instance and repeated lookups run no query. The map
+is created when the request starts, dropped when it finishes and cleared whenever
+a catalog is saved or deleted or its membership version is bumped.
+
+Outside of requests, e.g. in tasks or management commands, nothing is memoized
+unless the code runs inside `catalog_identity_map()`.
+
+Attributes:
+    MISSING (object): Returned by `get_cached_catalog` when a key is not in the map.
+"""
+from contextlib import contextmanager
+
+from asgiref.local import Local
+
+MISSING = object()
+
+_storage = Local()
+
+
+def activate_identity_map():
+    """Start an empty identity map for the current request or thread."""
+    _storage.catalogs = {}
+
+
+def deactivate_identity_map():
+    """Drop the identity map of the current request or thread."""
+    _storage.catalogs = None
+
+
+def clear_identity_map():
+    """Remove every catalog from the active identity map, if any."""
+    catalogs = getattr(_storage, 'catalogs', None)
+
+    if catalogs:
+        catalogs.clear()
+
+
+@contextmanager
+def catalog_identity_map():
+    """Memoize the catalog lookups of the enclosed block, reusing the active map if any."""
+    if getattr(_storage, 'catalogs', None) is not None:
+        yield
+        return
+
+    activate_identity_map()
+    try:
+        yield
+    finally:
+        deactivate_identity_map()
+
+
+def get_cached_catalog(key):
+    """
+    Return the catalog stored under a key of the active identity map.
+
+    Args:
+        key (tuple): The lookup key, e.g. `('slug', 'my-catalog')`.
+
+    Returns:
+        The stored result, or `MISSING` when the key is not stored or no map is active.
+    """
+    catalogs = getattr(_storage, 'catalogs', None)
+
+    if catalogs is None or key is None:
+        return MISSING
+
+    return catalogs.get(key, MISSING)
+
+
+def cache_catalog(key, catalog):
+    """
+    Store the result of a catalog lookup in the active identity map.
+
+    Args:
+        key (tuple): The lookup key. Nothing is stored when it is None.
+        catalog: The fetched catalog, queryset or empty queryset.
+    """
+    catalogs = getattr(_storage, 'catalogs', None)
+
+    if catalogs is not None and key is not None:
+        catalogs[key] = catalog
@@ -0,0 +1,384 @@
+"""
+Bulk import of catalog definitions from CSV or JSONL files.
+
+Every row defines one catalog with these fields:
+
+- `type`: `fixed`, `catalog_courses` or `dynamic`.
+- `name`: The human friendly name of the catalog.
+- `slug`: Optional, defaults to the slugified name.
+- `courses`: Course keys of fixed catalogs and catalog courses. A list in JSONL,
+  separated by spaces or semicolons in CSV. Inactive available courses are
+  skipped and reported.
+- `query_string`: Query of dynamic catalogs. A JSON string, or an object in JSONL.
+- `materialized`: Optional, whether a dynamic catalog is materialized.
+
+The rows are processed in batches. The course keys of a batch are parsed once,
+the course overviews and available courses are resolved with chunked `id__in`
+queries and the memberships are written with `bulk_create`, and recorded in
+the membership changelog, so the number of queries per row does not depend on
+the number of courses.
+
+Attributes:
+    IMPORT_CATALOG_TYPES (dict): Catalog model of every `type` value.
+    IMPORT_BATCH_SIZE (int): Default number of rows processed together.
+    LOOKUP_CHUNK_SIZE (int): Maximum number of values of an `IN` clause.
+"""
+import csv
+import json
+import re
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_slug
+from django.db import IntegrityError, transaction
+from django.utils.text import slugify
+from opaque_keys import InvalidKeyError
+from opaque_keys.edx.keys import CourseKey
+
+from catalog_plugin.api.catalog_api_client import BULK_BATCH_SIZE, get_through_attnames
+from catalog_plugin.changelog import record_membership_events
+from catalog_plugin.edxapp_wrapper.course_module import course_overview
+from catalog_plugin.membership import bump_membership_versions
+from catalog_plugin.models import (
+    AvailableCourse,
+    CatalogCourses,
+    DynamicCatalog,
+    FixedCatalog,
+    FlexibleCatalogModel,
+    MembershipEvent,
+)
+from catalog_plugin.query import compile_query_string
+
+IMPORT_CATALOG_TYPES = {
+    'fixed': FixedCatalog,
+    'catalog_courses': CatalogCourses,
+    'dynamic': DynamicCatalog,
+}
+IMPORT_FORMATS = ('csv', 'jsonl')
+IMPORT_BATCH_SIZE = 500
+LOOKUP_CHUNK_SIZE = 500
+COURSE_KEYS_SEPARATOR = re.compile(r'[\s;]+')
+TRUE_VALUES = ('1', 'true', 'yes', 'y')
+
+
+def read_rows(file, file_format):
+    """
+    Yield the rows of a CSV or JSONL file without reading it whole.
+
+    Args:
+        file (file): The open file.
+        file_format (str): `csv` or `jsonl`.
+
+    Yields:
+        tuple[int, dict or None]: The line number and the row, None when the line is not a JSON object.
+    """
+    if file_format == 'csv':
+        reader = csv.DictReader(file)
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    for line_number, line in enumerate(file, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield line_number, row if isinstance(row, dict) else None
+
+
+def chunked(values, size=LOOKUP_CHUNK_SIZE):
+    """Yield lists of at most `size` values."""
+    iterator = iter(values)
+    chunk = list(islice(iterator, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(iterator, size))
+
+
+def parse_course_keys(key_strings):
+    """
+    Parse course key strings with `CourseKey.from_string`.
+
+    Args:
+        key_strings (Iterable[str]): The course keys to parse.
+
+    Returns:
+        dict: The normalized course key, or None when invalid, indexed by the given string.
+    """
+    course_keys = {}
+
+    for key_string in key_strings:
+        try:
+            course_keys[key_string] = str(CourseKey.from_string(key_string))
+        except InvalidKeyError:
+            course_keys[key_string] = None
+
+    return course_keys
+
+
+def resolve_course_overviews(course_keys):
+    """Return the subset of course keys with a course overview, in chunked queries."""
+    overview_model = course_overview()
+    found = set()
+
+    for chunk in chunked(course_keys):
+        found.update(str(pk) for pk in overview_model.objects.filter(id__in=chunk).values_list('pk', flat=True))
+
+    return found
+
+
+def resolve_available_courses(course_keys):
+    """
+    Resolve the AvailableCourses of the course keys that have one, in chunked queries.
+
+    Returns:
+        dict: The AvailableCourse id and active flag, indexed by course key.
+    """
+    found = {}
+
+    for chunk in chunked(course_keys):
+        found.update(
+            (str(course_id), (pk, active))
+            for course_id, pk, active in AvailableCourse.objects.filter(
+                course_id__in=chunk,
+            ).values_list('course_id', 'pk', 'active')
+        )
+
+    return found
+
+
+def resolve_existing_slugs(slugs):
+    """Return the subset of slugs already used by a catalog, in chunked queries."""
+    found = set()
+
+    for chunk in chunked(slugs):
+        found.update(FlexibleCatalogModel.objects.filter(slug__in=chunk).values_list('slug', flat=True))
+
+    return found
+
+
+class CatalogImporter:
+    """
+    Import catalog definitions in batches, reporting a result per row.
+
+    Every result is a dict with the `line` of the row, its `type` and `slug`,
+    the `status` (`created`, `valid` in dry runs, or `error`), the `id` of the
+    created catalog, the number of `courses`, the list of `errors` and the
+    `skipped` course keys of inactive available courses, which are not attached
+    to catalog courses, like `add_courses_to_catalog` does.
+
+    Args:
+        dry_run (bool): Validate and resolve the rows without writing anything.
+        batch_size (int): Number of rows processed together.
+    """
+
+    def __init__(self, dry_run=False, batch_size=IMPORT_BATCH_SIZE):
+        self.dry_run = dry_run
+        self.batch_size = batch_size
+        self.seen_slugs = set()
+
+    def import_rows(self, rows):
+        """
+        Import rows read by `read_rows`.
+
+        Yields:
+            dict: The result of every row, in the order of the rows.
+        """
+        for batch in chunked(rows, self.batch_size):
+            yield from self.import_batch(batch)
+
+    def import_batch(self, rows):
+        """Validate, resolve and create the catalogs of a batch of rows."""
+        definitions = [self.parse_row(line, row) for line, row in rows]
+        self.validate_course_keys(definitions)
+        self.resolve_references(definitions)
+
+        if self.dry_run:
+            for definition in definitions:
+                definition['result']['status'] = 'valid' if not definition['result']['errors'] else 'error'
+        else:
+            self.create_catalogs(definitions)
+
+        return [definition['result'] for definition in definitions]
+
+    def parse_row(self, line, row):
+        """Normalize a row into a catalog definition, recording the errors that need no query."""
+        result = {
+            'line': line,
+            'type': None,
+            'slug': None,
+            'status': 'error',
+            'id': None,
+            'courses': 0,
+            'errors': [],
+            'skipped': [],
+        }
+        definition = {'result': result, 'course_keys': [], 'query_string': None, 'materialized': False}
+
+        if row is None:
+            result['errors'].append('The line is not a JSON object.')
+            return definition
+
+        catalog_type = (row.get('type') or '').strip()
+        name = row.get('name')
+        name = name.strip() if isinstance(name, str) else ''
+        slug = (row.get('slug') or '').strip() or slugify(name)
+        result.update(type=catalog_type, slug=slug)
+        definition['name'] = name
+
+        if catalog_type not in IMPORT_CATALOG_TYPES:
+            result['errors'].append(f'type must be one of: {", ".join(IMPORT_CATALOG_TYPES)}.')
+        if not name:
+            result['errors'].append('name is required.')
+        elif len(name) > 255:
+            result['errors'].append('name must have at most 255 characters.')
+        try:
+            validate_slug(slug)
+        except ValidationError:
+            result['errors'].append(f'slug "{slug}" is not a valid slug.')
+        if slug in self.seen_slugs:
+            result['errors'].append(f'slug "{slug}" is repeated in the file.')
+        self.seen_slugs.add(slug)
+
+        courses = row.get('courses') or []
+        if isinstance(courses, str):
+            courses = COURSE_KEYS_SEPARATOR.split(courses.strip())
+        definition['course_keys'] = list(dict.fromkeys(key for key in courses if key))
+
+        query_string = row.get('query_string') or None
+        if isinstance(query_string, dict):
+            query_string = json.dumps(query_string)
+        definition['query_string'] = query_string
+        materialized = row.get('materialized')
+        definition['materialized'] = (
+            materialized if isinstance(materialized, bool) else str(materialized or '').lower() in TRUE_VALUES
+        )
+
+        if catalog_type == 'dynamic':
+            if definition['course_keys']:
+                result['errors'].append('Dynamic catalogs do not accept courses.')
+            if query_string:
+                try:
+                    compile_query_string(query_string)
+                except ValidationError as error:
+                    result['errors'].extend(error.messages)
+        elif query_string:
+            result['errors'].append('Only dynamic catalogs accept a query_string.')
+
+        return definition
+
+    def validate_course_keys(self, definitions):
+        """Parse the course keys of a batch once, replacing them by their normalized form."""
+        course_keys = parse_course_keys(
+            {key for definition in definitions for key in definition['course_keys']},
+        )
+
+        for definition in definitions:
+            invalid_keys = [key for key in definition['course_keys'] if course_keys[key] is None]
+            if invalid_keys:
+                definition['result']['errors'].append(f'Invalid course keys: {", ".join(invalid_keys)}.')
+            definition['course_keys'] = list(
+                dict.fromkeys(course_keys[key] for key in definition['course_keys'] if course_keys[key]),
+            )
+            definition['result']['courses'] = len(definition['course_keys'])
+
+    def resolve_references(self, definitions):
+        """Check the slugs and resolve the course keys of a batch against the database."""
+        existing_slugs = resolve_existing_slugs({definition['result']['slug'] for definition in definitions})
+        keys_by_type = {'fixed': set(), 'catalog_courses': set()}
+
+        for definition in definitions:
+            if definition['result']['type'] in keys_by_type:
+                keys_by_type[definition['result']['type']].update(definition['course_keys'])
+
+        overview_keys = resolve_course_overviews(keys_by_type['fixed'])
+        available_course_ids = resolve_available_courses(keys_by_type['catalog_courses'])
+
+        for definition in definitions:
+            result = definition['result']
+            if result['slug'] in existing_slugs:
+                result['errors'].append(f'A catalog with the slug "{result["slug"]}" already exists.')
+
+            if result['type'] == 'fixed':
+                missing_keys = [key for key in definition['course_keys'] if key not in overview_keys]
+                definition['target_ids'] = definition['course_keys']
+            elif result['type'] == 'catalog_courses':
+                missing_keys = [key for key in definition['course_keys'] if key not in available_course_ids]
+                result['skipped'] = [
+                    key for key in definition['course_keys']
+                    if key in available_course_ids and not available_course_ids[key][1]
+                ]
+                definition['target_ids'] = [
+                    available_course_ids[key][0] for key in definition['course_keys']
+                    if available_course_ids.get(key, (None, False))[1]
+                ]
+                result['courses'] = len(definition['target_ids'])
+            else:
+                missing_keys = []
+
+            if missing_keys:
+                result['errors'].append(f'Unknown course keys: {", ".join(missing_keys)}.')
+
+    def create_catalogs(self, definitions):
+        """
+        Create the valid catalogs of a batch and their memberships in one transaction.
+
+        Multi-table inherited models cannot be created with `bulk_create`, so
+        every catalog is created with its own INSERTs, in a savepoint, while the
+        memberships of the batch are written with one `bulk_create` per relation.
+        The rows are only marked as created once their memberships are written.
+        """
+        rows_by_relation = {FixedCatalog.course_runs: [], CatalogCourses.courses: []}
+        catalog_ids = []
+        created = []
+
+        with transaction.atomic():
+            for definition in definitions:
+                result = definition['result']
+                if result['errors']:
+                    continue
+
+                catalog_model = IMPORT_CATALOG_TYPES[result['type']]
+                fields = {'name': definition['name'], 'slug': result['slug']}
+                if catalog_model is DynamicCatalog:
+                    fields.update(query_string=definition['query_string'], materialized=definition['materialized'])
+
+                try:
+                    with transaction.atomic():
+                        catalog = catalog_model.objects.create(**fields)
+                except (IntegrityError, ValidationError) as error:
+                    result['errors'].append(f'The catalog could not be created: {error}')
+                    continue
+
+                created.append((result, catalog))
+                if catalog_model is FixedCatalog:
+                    relation = FixedCatalog.course_runs
+                elif catalog_model is CatalogCourses:
+                    relation = CatalogCourses.courses
+                else:
+                    continue
+
+                through = relation.through
+                catalog_attname, target_attname = get_through_attnames(relation)
+                rows_by_relation[relation].extend(
+                    through(**{catalog_attname: catalog.pk, target_attname: target_id})
+                    for target_id in definition['target_ids']
+                )
+                if definition['target_ids']:
+                    catalog_ids.append(catalog.pk)
+
+            for relation, rows in rows_by_relation.items():
+                relation.through.objects.bulk_create(rows, batch_size=BULK_BATCH_SIZE)
+                catalog_attname, target_attname = get_through_attnames(relation)
+                record_membership_events(
+                    relation,
+                    MembershipEvent.COURSE_ADDED,
+                    [(getattr(row, catalog_attname), getattr(row, target_attname)) for row in rows],
+                )
+
+            bump_membership_versions(catalog_ids)
+
+        for result, catalog in created:
+            result.update(status='created', id=str(catalog.pk))
@@ -0,0 +1,354 @@
+"""
+Wall time, query count and row count instrumentation of the plugin hot paths.
+
+The API clients, `get_course_keys()` on every catalog type and the v0 viewsets
+are instrumented. The catalog methods returning lazy querysets, such as
+`get_courses()`, are not: their queries run after the call, where the client
+methods and viewsets evaluating them are measured. Nothing is measured unless
+the `CP_INSTRUMENTATION_ENABLED` setting is true; when disabled, an
+instrumented call only costs a global lookup and a function call.
+
+Every measurement is sent to the sinks listed in the `CP_INSTRUMENTATION_SINKS`
+setting, as dotted paths of classes implementing `record(name, seconds, queries, rows)`:
+
+- `LoggingSink` logs every measurement.
+- `StatsdSink` sends timers and counters to statsd. It requires the `statsd`
+  package and reads its host, port and prefix from `CP_INSTRUMENTATION_STATSD`.
+- `AggregatorSink` accumulates the measurements in-process and periodically
+  adds them to the cache, where the `show_catalog_metrics` command reads them.
+
+Attributes:
+    DEFAULT_SINKS (list): Sinks used when `CP_INSTRUMENTATION_SINKS` is not defined.
+    DEFAULT_FLUSH_INTERVAL (int): Seconds between two flushes of the aggregator to the cache.
+"""
+import functools
+import inspect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.db import connection
+from django.db.models import Model, QuerySet
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SINKS = ['catalog_plugin.instrumentation.LoggingSink']
+DEFAULT_FLUSH_INTERVAL = 60
+CACHE_KEY_PREFIX = 'catalog_plugin.metrics'
+METRIC_FIELDS = ('calls', 'microseconds', 'queries', 'rows')
+NAMES_CACHE_KEY = f'{CACHE_KEY_PREFIX}.names'
+
+_sinks = None
+
+
+def get_sinks():
+    """
+    Return the configured sink instances, or an empty tuple when instrumentation is disabled.
+
+    The sinks are built once and rebuilt when an instrumentation setting changes.
+    """
+    global _sinks  # pylint: disable=global-statement
+
+    if _sinks is None:
+        if getattr(settings, 'CP_INSTRUMENTATION_ENABLED', False):
+            _sinks = tuple(
+                import_string(path)() for path in getattr(settings, 'CP_INSTRUMENTATION_SINKS', DEFAULT_SINKS)
+            )
+        else:
+            _sinks = ()
+
+    return _sinks
+
+
+@receiver(setting_changed)
+def reset_sinks(setting, **kwargs):  # pylint: disable=unused-argument
+    """Rebuild the sinks when an instrumentation setting changes."""
+    global _sinks  # pylint: disable=global-statement
+
+    if setting.startswith('CP_INSTRUMENTATION'):
+        _sinks = None
+
+
+class Measurement:
+    """
+    A measurement in progress.
+
+    Attributes:
+        name (str): The name of the instrumented call. It can be changed before the measurement ends.
+        queries (int): Number of database queries executed so far.
+        rows (int or None): Number of rows returned, when known.
+    """
+
+    __slots__ = ('name', 'queries', 'rows')
+
+    def __init__(self, name):
+        self.name = name
+        self.queries = 0
+        self.rows = None
+
+    def __call__(self, execute, sql, params, many, context):
+        """Count the queries executed through the database connection."""
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+
+@contextmanager
+def measure(name):
+    """
+    Measure the enclosed block and send the measurement to the sinks.
+
+    Yields:
+        Measurement or None: The measurement in progress, None when instrumentation is disabled.
+    """
+    sinks = get_sinks()
+
+    if not sinks:
+        yield None
+        return
+
+    measurement = Measurement(name)
+    start = time.perf_counter()
+    try:
+        with connection.execute_wrapper(measurement):
+            yield measurement
+    finally:
+        seconds = time.perf_counter() - start
+        for sink in sinks:
+            try:
+                sink.record(measurement.name, seconds, measurement.queries, measurement.rows)
+            except Exception:  # pylint: disable=broad-except
+                logger.exception('Instrumentation sink %s failed.', type(sink).__name__)
+
+
+def count_rows(result):
+    """Return the number of rows of a result when it is known without running a query, None otherwise."""
+    if isinstance(result, QuerySet):
+        return None if result._result_cache is None else len(result._result_cache)  # pylint: disable=protected-access
+    if isinstance(result, Model):
+        return 1
+    if isinstance(result, (list, tuple, set, frozenset, dict)):
+        return len(result)
+    return None
+
+
+def instrument(name):
+    """
+    Decorate a function so every call is measured when instrumentation is enabled.
+
+    Lazy querysets are reported without rows, since they run their query after the call.
+    Coroutine functions are measured until they return, but the queries they run
+    through `sync_to_async` happen in another thread and are not counted.
+
+    Args:
+        name (str): The name the measurements are reported under. A `{class_name}`
+            placeholder is replaced by the class name of the first argument, so
+            inherited methods are reported per subclass.
+    """
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if not get_sinks():
+                    return await func(*args, **kwargs)
+
+                with measure(name.format(class_name=type(args[0]).__name__) if args else name) as measurement:
+                    result = await func(*args, **kwargs)
+                    if measurement is not None:
+                        measurement.rows = count_rows(result)
+                return result
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not get_sinks():
+                return func(*args, **kwargs)
+
+            with measure(name.format(class_name=type(args[0]).__name__) if args else name) as measurement:
+                result = func(*args, **kwargs)
+                if measurement is not None:
+                    measurement.rows = count_rows(result)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def instrument_methods(prefix):
+    """
+    Decorate a class so all its public methods, including class methods, are instrumented.
+
+    The measurements are reported as `<prefix>.<method name>`.
+    """
+    def decorator(cls):
+        for attribute, value in list(vars(cls).items()):
+            if attribute.startswith('_'):
+                continue
+            if isinstance(value, (classmethod, staticmethod)):
+                setattr(cls, attribute, type(value)(instrument(f'{prefix}.{attribute}')(value.__func__)))
+            elif callable(value):
+                setattr(cls, attribute, instrument(f'{prefix}.{attribute}')(value))
+        return cls
+
+    return decorator
+
+
+class LoggingSink:
+    """Log every measurement at the INFO level."""
+
+    def record(self, name, seconds, queries, rows):
+        """Log a measurement."""
+        logger.info('%s took %.2f ms, %s queries, %s rows.', name, seconds * 1000, queries, rows)
+
+
+class StatsdSink:
+    """
+    Send every measurement to statsd as a timer and counters.
+
+    The client is configured by the `CP_INSTRUMENTATION_STATSD` setting, a dict
+    with the optional `host`, `port` and `prefix` keys.
+    """
+
+    def __init__(self):
+        try:
+            import statsd  # pylint: disable=import-outside-toplevel
+        except ImportError as error:
+            raise ImproperlyConfigured('StatsdSink requires the statsd package.') from error
+
+        options = getattr(settings, 'CP_INSTRUMENTATION_STATSD', {})
+        self.client = statsd.StatsClient(
+            host=options.get('host', 'localhost'),
+            port=options.get('port', 8125),
+            prefix=options.get('prefix', 'catalog_plugin'),
+        )
+
+    def record(self, name, seconds, queries, rows):
+        """Send a measurement."""
+        with self.client.pipeline() as pipeline:
+            pipeline.timing(name, seconds * 1000)
+            pipeline.incr(f'{name}.queries', queries)
+            if rows is not None:
+                pipeline.incr(f'{name}.rows', rows)
+
+
+class MetricsAggregator:
+    """Thread-safe in-process totals of the measurements, indexed by name."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.totals = {}
+
+    def record(self, name, seconds, queries, rows):
+        """Add a measurement to the totals."""
+        with self.lock:
+            totals = self.totals.setdefault(name, dict.fromkeys(METRIC_FIELDS, 0))
+            totals['calls'] += 1
+            totals['microseconds'] += int(seconds * 1000000)
+            totals['queries'] += queries
+            totals['rows'] += rows or 0
+
+    def pop(self):
+        """Return the totals and start new ones."""
+        with self.lock:
+            totals, self.totals = self.totals, {}
+        return totals
+
+
+aggregator = MetricsAggregator()
+
+
+def get_metrics_cache():
+    """Return the cache shared by the processes to aggregate the measurements."""
+    return caches[getattr(settings, 'CP_INSTRUMENTATION_CACHE_ALIAS', 'default')]
+
+
+def metric_cache_key(name, field):
+    """Return the cache key of a metric total."""
+    return f'{CACHE_KEY_PREFIX}.{name}.{field}'
+
+
+def flush_aggregator():
+    """
+    Add the in-process totals to the shared totals in the cache.
+
+    The totals are increased atomically. The index of the reported names is
+    updated with a plain read and write, which is enough since flushes are rare
+    and the names of a process are sent again on its next flush.
+    """
+    cache = get_metrics_cache()
+    totals_by_name = aggregator.pop()
+
+    if not totals_by_name:
+        return
+
+    for name, totals in totals_by_name.items():
+        for field, value in totals.items():
+            key = metric_cache_key(name, field)
+            cache.add(key, 0, timeout=None)
+            cache.incr(key, value)
+
+    names = cache.get(NAMES_CACHE_KEY, set())
+    if not names.issuperset(totals_by_name):
+        cache.set(NAMES_CACHE_KEY, names | set(totals_by_name), timeout=None)
+
+
+def read_metrics():
+    """
+    Return the shared totals of every reported name.
+
+    Returns:
+        dict: Totals of calls, microseconds, queries and rows indexed by name.
+    """
+    cache = get_metrics_cache()
+    keys = {
+        metric_cache_key(name, field): (name, field)
+        for name in sorted(cache.get(NAMES_CACHE_KEY, set()))
+        for field in METRIC_FIELDS
+    }
+    metrics = {}
+
+    for key, value in cache.get_many(list(keys)).items():
+        name, field = keys[key]
+        metrics.setdefault(name, dict.fromkeys(METRIC_FIELDS, 0))[field] = value
+
+    return metrics
+
+
+def reset_metrics():
+    """Remove the shared and in-process totals."""
+    cache = get_metrics_cache()
+    names = cache.get(NAMES_CACHE_KEY, set())
+
+    aggregator.pop()
+    cache.delete_many([metric_cache_key(name, field) for name in names for field in METRIC_FIELDS])
+    cache.delete(NAMES_CACHE_KEY)
+
+
+class AggregatorSink:
+    """
+    Accumulate the measurements in-process and add them to the cache periodically.
+
+    The totals are flushed at most every `CP_INSTRUMENTATION_FLUSH_INTERVAL`
+    seconds, so the sink does not touch the cache on every call.
+    """
+
+    def __init__(self):
+        self.flush_interval = getattr(settings, 'CP_INSTRUMENTATION_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL)
+        self.last_flush = time.monotonic()
+
+    def record(self, name, seconds, queries, rows):
+        """Accumulate a measurement, flushing the totals when the interval has elapsed."""
+        aggregator.record(name, seconds, queries, rows)
+
+        now = time.monotonic()
+        if now - self.last_flush >= self.flush_interval:
+            self.last_flush = now
+            flush_aggregator()
@@ -0,0 +1,254 @@
+"""
+Broadcast of the catalog changes to the in-process caches of every worker.
+
+Every membership version bump, catalog save and catalog delete publishes
+`(catalog id, membership version)` events through the transport configured by
+the `CP_INVALIDATION_TRANSPORT` setting, a dotted path or None to disable the
+broadcast. The broadcast is off by default, unless `CP_INVALIDATION_REDIS_URL`
+is defined, in which case `RedisTransport` is used:
+
+- `DatabaseTransport` writes the events to the CatalogInvalidation table in the
+  transaction of the change, so they are only seen once committed. It costs an
+  insert per catalog write and a poll query per worker at most once every poll
+  interval, for every request, including those unrelated to catalogs.
+- `RedisTransport` publishes them on a Redis pub/sub channel once the transaction
+  commits. It requires the `redis` package and reads `CP_INVALIDATION_REDIS_URL`
+  and `CP_INVALIDATION_REDIS_CHANNEL`. Polling only reads the messages already
+  received by the subscription, without a round trip.
+
+Without a transport, the other processes catch up with the membership version
+checks of their own caches, e.g. every `CP_MEMBERSHIP_INDEX_REFRESH_INTERVAL`
+seconds for the membership index.
+
+Every process polls the transport when a request starts, at most once every
+`CP_INVALIDATION_POLL_INTERVAL` seconds, and sends `catalogs_invalidated` with
+the received events, so the worker-local caches drop the affected entries
+within that delay on busy workers. Tasks and commands can call
+`poll_invalidations` directly.
+
+Attributes:
+    catalogs_invalidated (Signal): Sent with the `catalog_ids` and the `events`
+        received from the transport.
+    REDIS_TRANSPORT (str): Transport used when `CP_INVALIDATION_TRANSPORT` is not
+        defined but `CP_INVALIDATION_REDIS_URL` is.
+    DEFAULT_POLL_INTERVAL (int): Seconds between two polls when `CP_INVALIDATION_POLL_INTERVAL`
+        is not defined.
+    DEFAULT_RETENTION (int): Seconds the database events are kept when `CP_INVALIDATION_RETENTION`
+        is not defined.
+    GAP_TIMEOUT (int): Seconds the database transport waits for the rows of transactions still in progress.
+"""
+import json
+import logging
+import threading
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import request_started, setting_changed
+from django.db import transaction
+from django.db.models import Max, Q
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from catalog_plugin.models import CatalogInvalidation
+
+logger = logging.getLogger(__name__)
+
+REDIS_TRANSPORT = 'catalog_plugin.invalidation.RedisTransport'
+DEFAULT_POLL_INTERVAL = 5
+DEFAULT_RETENTION = 60 * 60
+GAP_TIMEOUT = 60
+POLL_BATCH_SIZE = 1000
+
+catalogs_invalidated = Signal()
+
+_transport = None
+_polled_at = 0
+_poll_lock = threading.Lock()
+
+
+class DatabaseTransport:
+    """
+    Publish the events to the CatalogInvalidation table, which every process polls.
+
+    Each process reads the rows after the last id it has seen. Ids skipped by
+    transactions still in progress are read again for `GAP_TIMEOUT` seconds, so
+    rows committed out of order are not missed.
+    """
+
+    def __init__(self):
+        self.cursor = None
+        self.gaps = {}
+        self.pruned_at = None
+
+    def publish(self, events):
+        """Write the events in the current transaction."""
+        CatalogInvalidation.objects.bulk_create(
+            CatalogInvalidation(catalog_id=catalog_id, membership_version=version) for catalog_id, version in events
+        )
+
+    def poll(self):
+        """
+        Return the events committed since the last poll.
+
+        The first poll only starts from the latest event, since the caches of a
+        new process hold nothing older.
+        """
+        if self.cursor is None:
+            self.cursor = CatalogInvalidation.objects.aggregate(last=Max('id'))['last'] or 0
+            return []
+
+        events = []
+        while True:
+            rows = list(CatalogInvalidation.objects.filter(
+                Q(id__gt=self.cursor) | Q(id__in=list(self.gaps)),
+            ).order_by('id').values_list('id', 'catalog_id', 'membership_version')[:POLL_BATCH_SIZE])
+            self.track_gaps([row[0] for row in rows])
+            events.extend((catalog_id, version) for _, catalog_id, version in rows)
+            if len(rows) < POLL_BATCH_SIZE:
+                break
+
+        self.prune_if_due()
+        return events
+
+    def track_gaps(self, ids):
+        """Move the cursor past the read ids, remembering the skipped ones until they time out."""
+        now = time.monotonic()
+
+        for row_id in ids:
+            if row_id > self.cursor:
+                self.gaps.update((gap_id, now) for gap_id in range(self.cursor + 1, row_id))
+                self.cursor = row_id
+            self.gaps.pop(row_id, None)
+
+        self.gaps = {gap_id: since for gap_id, since in self.gaps.items() if now - since < GAP_TIMEOUT}
+
+    def prune_if_due(self):
+        """Delete the events older than the retention on the first read, then at most once every tenth of it."""
+        retention = getattr(settings, 'CP_INVALIDATION_RETENTION', DEFAULT_RETENTION)
+
+        if self.pruned_at is None or time.monotonic() - self.pruned_at >= retention / 10:
+            self.pruned_at = time.monotonic()
+            CatalogInvalidation.objects.filter(created__lt=timezone.now() - timedelta(seconds=retention)).delete()
+
+
+class RedisTransport:
+    """Publish the events on a Redis pub/sub channel once the transaction commits."""
+
+    def __init__(self):
+        try:
+            import redis  # pylint: disable=import-outside-toplevel
+        except ImportError as error:
+            raise ImproperlyConfigured('RedisTransport requires the redis package.') from error
+
+        self.client = redis.Redis.from_url(getattr(settings, 'CP_INVALIDATION_REDIS_URL', 'redis://localhost:6379/0'))
+        self.channel = getattr(settings, 'CP_INVALIDATION_REDIS_CHANNEL', 'catalog_plugin.invalidation')
+        self.pubsub = None
+
+    def publish(self, events):
+        """Publish the events as one JSON message after the commit of the current transaction."""
+        message = json.dumps([[str(catalog_id), version] for catalog_id, version in events])
+        transaction.on_commit(lambda: self.client.publish(self.channel, message))
+
+    def poll(self):
+        """Return the events received since the last poll, subscribing to the channel on the first one."""
+        if self.pubsub is None:
+            self.pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+            self.pubsub.subscribe(self.channel)
+            return []
+
+        events = []
+        message = self.pubsub.get_message()
+        while message is not None:
+            events.extend((uuid.UUID(catalog_id), version) for catalog_id, version in json.loads(message['data']))
+            message = self.pubsub.get_message()
+
+        return events
+
+
+def get_transport():
+    """
+    Return the configured transport instance, or None when the broadcast is disabled.
+
+    The transport is built once and rebuilt when an invalidation setting changes.
+    """
+    global _transport  # pylint: disable=global-statement
+
+    if _transport is None:
+        default_path = REDIS_TRANSPORT if getattr(settings, 'CP_INVALIDATION_REDIS_URL', None) else None
+        path = getattr(settings, 'CP_INVALIDATION_TRANSPORT', default_path)
+        _transport = import_string(path)() if path else False
+
+    return _transport or None
+
+
+@receiver(setting_changed)
+def reset_transport(setting, **kwargs):  # pylint: disable=unused-argument
+    """Rebuild the transport when an invalidation setting changes."""
+    global _transport, _polled_at  # pylint: disable=global-statement
+
+    if setting.startswith('CP_INVALIDATION'):
+        _transport, _polled_at = None, 0
+
+
+def publish_invalidations(events):
+    """
+    Publish catalog changes to every process.
+
+    Args:
+        events (Iterable[tuple]): `(catalog id, membership version)` pairs, the
+            version being None for deleted catalogs.
+    """
+    transport = get_transport()
+    events = list(events)
+
+    if transport is not None and events:
+        transport.publish(events)
+
+
+def poll_invalidations(force=False):
+    """
+    Receive the changes published by every process and send `catalogs_invalidated`.
+
+    Args:
+        force (bool): Poll even if the last poll is more recent than the poll interval.
+
+    Returns:
+        list[tuple]: The received `(catalog id, membership version)` pairs.
+    """
+    global _polled_at  # pylint: disable=global-statement
+
+    transport = get_transport()
+    interval = getattr(settings, 'CP_INVALIDATION_POLL_INTERVAL', DEFAULT_POLL_INTERVAL)
+
+    if transport is None or (not force and time.monotonic() - _polled_at < interval):
+        return []
+    if not _poll_lock.acquire(blocking=force):  # pylint: disable=consider-using-with
+        return []
+
+    try:
+        _polled_at = time.monotonic()
+        events = transport.poll()
+    except Exception:  # pylint: disable=broad-except
+        logger.exception('Polling the catalog invalidations with %s failed.', type(transport).__name__)
+        return []
+    finally:
+        _poll_lock.release()
+
+    if events:
+        catalogs_invalidated.send(
+            sender=type(transport),
+            catalog_ids={catalog_id for catalog_id, _ in events},
+            events=events,
+        )
+
+    return events
+
+
+@receiver(request_started)
+def poll_on_request_started(sender, **kwargs):  # pylint: disable=unused-argument
+    """Poll the transport when a request starts, if the poll interval has elapsed."""
+    poll_invalidations()
@@ -0,0 +1 @@
+"""Management module for the catalog plugin."""
@@ -0,0 +1,79 @@
+"""Management command to create catalogs in bulk from a CSV or JSONL file."""
+import json
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from catalog_plugin.importer import IMPORT_BATCH_SIZE, IMPORT_FORMATS, CatalogImporter, read_rows
+
+
+class Command(BaseCommand):
+    """
+    Create catalogs in bulk from a CSV or JSONL file of catalog definitions.
+
+    See `catalog_plugin.importer` for the fields of every row.
+
+    Examples:
+        ./manage.py lms import_catalogs catalogs.csv --dry-run
+        ./manage.py lms import_catalogs catalogs.jsonl --json > results.jsonl
+    """
+
+    help = 'Create fixed catalogs, catalog courses and dynamic catalogs from a CSV or JSONL file.'
+
+    def add_arguments(self, parser):
+        """Add the command arguments."""
+        parser.add_argument('path', help='The CSV or JSONL file with one catalog definition per row.')
+        parser.add_argument(
+            '--format',
+            choices=IMPORT_FORMATS,
+            help='Format of the file. Defaults to the file extension.',
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Validate the rows without creating anything.')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=IMPORT_BATCH_SIZE,
+            help='Number of rows validated and written together.',
+        )
+        parser.add_argument('--json', action='store_true', help='Print the result of every row as a JSON line.')
+
+    def handle(self, *args, **options):
+        """Import the file and report the result of every row."""
+        file_format = options['format'] or os.path.splitext(options['path'])[1].lstrip('.').lower()
+
+        if file_format not in IMPORT_FORMATS:
+            raise CommandError(f'Cannot guess the format of {options["path"]}, use --format.')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive.')
+
+        importer = CatalogImporter(dry_run=options['dry_run'], batch_size=options['batch_size'])
+        counts = {'created': 0, 'valid': 0, 'error': 0}
+        start = time.perf_counter()
+
+        try:
+            with open(options['path'], newline='', encoding='utf-8') as file:
+                for result in importer.import_rows(read_rows(file, file_format)):
+                    counts[result['status']] += 1
+                    self.write_result(result, options['json'])
+        except OSError as error:
+            raise CommandError(f'Cannot read {options["path"]}: {error}') from error
+
+        elapsed = time.perf_counter() - start
+        rows = sum(counts.values())
+        self.stderr.write(
+            f'{rows} rows: {counts["created"]} created, {counts["valid"]} valid, {counts["error"]} failed'
+            f' in {elapsed:.3f}s ({rows / elapsed if elapsed else 0:.1f} rows/s).',
+        )
+
+    def write_result(self, result, as_json):
+        """Print the result of a row."""
+        if as_json:
+            self.stdout.write(json.dumps(result, sort_keys=True))
+        elif result['errors']:
+            self.stdout.write(f'line {result["line"]}: error {result["slug"]}: {" ".join(result["errors"])}')
+        else:
+            skipped = f', skipped inactive: {" ".join(result["skipped"])}' if result['skipped'] else ''
+            self.stdout.write(
+                f'line {result["line"]}: {result["status"]} {result["slug"]} ({result["courses"]} courses{skipped})',
+            )
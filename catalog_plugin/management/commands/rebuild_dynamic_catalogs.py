@@ -0,0 +1,93 @@
+"""Management command to rebuild the membership table of materialized dynamic catalogs."""
+import time
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from catalog_plugin.materialization import get_materialized_catalogs, rebuild_catalog
+from catalog_plugin.models import DynamicCatalog
+from catalog_plugin.query import compile_query_string
+
+
+class Command(BaseCommand):
+    """
+    Rebuild the membership table of materialized dynamic catalogs.
+
+    `--validate` lists the dynamic catalogs, materialized or not, whose stored
+    query string is rejected by the query allowlist, e.g. after upgrading from a
+    version that accepted related lookups or transforms such as `start__year`.
+    Reading the courses of these catalogs fails until their query is fixed.
+
+    Examples:
+        ./manage.py lms rebuild_dynamic_catalogs
+        ./manage.py lms rebuild_dynamic_catalogs --catalog <uuid> --compare
+        ./manage.py lms rebuild_dynamic_catalogs --validate
+    """
+
+    help = 'Rebuild the membership table of materialized dynamic catalogs.'
+
+    def add_arguments(self, parser):
+        """Add the command arguments."""
+        parser.add_argument(
+            '--catalog',
+            action='append',
+            dest='catalog_ids',
+            default=[],
+            help='Id of a materialized dynamic catalog to rebuild. Can be repeated. Defaults to every catalog.',
+        )
+        parser.add_argument(
+            '--compare',
+            action='store_true',
+            help='Time the live and the materialized reads of every rebuilt catalog.',
+        )
+        parser.add_argument(
+            '--validate',
+            action='store_true',
+            help='List the dynamic catalogs whose query string is not supported, without rebuilding any catalog.',
+        )
+
+    def handle(self, *args, **options):
+        """Rebuild the requested catalogs."""
+        if options['validate']:
+            self._validate()
+            return
+
+        catalogs = get_materialized_catalogs()
+
+        if options['catalog_ids']:
+            catalogs = catalogs.filter(pk__in=options['catalog_ids'])
+            if len(catalogs) != len(set(options['catalog_ids'])):
+                raise CommandError('Every --catalog must be a materialized dynamic catalog with a query string.')
+
+        for catalog in catalogs:
+            start = time.perf_counter()
+            added, removed = rebuild_catalog(catalog)
+            elapsed = time.perf_counter() - start
+            self.stdout.write(f'{catalog.pk}: {added} added, {removed} removed in {elapsed:.3f}s.')
+
+            if options['compare']:
+                self.stdout.write(f'    live read: {self._time_read(catalog.get_live_courses()):.4f}s')
+                self.stdout.write(f'    materialized read: {self._time_read(catalog.get_materialized_courses()):.4f}s')
+
+    def _validate(self):
+        """List the dynamic catalogs with an unsupported query string, failing when there is any."""
+        invalid = 0
+        catalogs = DynamicCatalog.objects.exclude(query_string__isnull=True).exclude(query_string='').order_by('slug')
+
+        for catalog in catalogs:
+            try:
+                compile_query_string(catalog.query_string)
+            except ValidationError as error:
+                invalid += 1
+                self.stdout.write(f'{catalog.pk} ({catalog.slug}): {" ".join(error.messages)}')
+
+        if invalid:
+            raise CommandError(f'{invalid} dynamic catalogs have an unsupported query string.')
+        self.stdout.write('Every dynamic catalog query string is supported.')
+
+    @staticmethod
+    def _time_read(courses):
+        """Return the seconds needed to fetch the course keys of a queryset."""
+        start = time.perf_counter()
+        list(courses.values_list('pk', flat=True))
+        return time.perf_counter() - start
@@ -0,0 +1,48 @@
+"""Management command to recompute the denormalized course counts of the catalogs."""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from catalog_plugin.importer import chunked
+from catalog_plugin.membership import refresh_course_counts
+from catalog_plugin.models import FlexibleCatalogModel
+
+BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    """
+    Recompute the course counts of the catalogs.
+
+    The counts are kept up to date by the membership write paths, so this is
+    only needed for rows written before the counts existed or by raw SQL.
+
+    Examples:
+        ./manage.py lms refresh_catalog_counts
+        ./manage.py lms refresh_catalog_counts --catalog <uuid>
+    """
+
+    help = 'Recompute the course_count and active_course_count of the catalogs.'
+
+    def add_arguments(self, parser):
+        """Add the command arguments."""
+        parser.add_argument(
+            '--catalog',
+            action='append',
+            dest='catalog_ids',
+            default=[],
+            help='Id of a catalog to refresh. Can be repeated. Defaults to every catalog.',
+        )
+
+    def handle(self, *args, **options):
+        """Refresh the requested catalogs in batches."""
+        catalogs = FlexibleCatalogModel.objects.select_subclasses().order_by('pk')
+
+        if options['catalog_ids']:
+            catalogs = catalogs.filter(pk__in=options['catalog_ids'])
+            if catalogs.count() != len(set(options['catalog_ids'])):
+                raise CommandError('Every --catalog must be the id of an existing catalog.')
+
+        start = time.perf_counter()
+        refreshed = sum(refresh_course_counts(batch) for batch in chunked(catalogs.iterator(), BATCH_SIZE))
+        self.stdout.write(f'Refreshed the course counts of {refreshed} catalogs in {time.perf_counter() - start:.3f}s.')
@@ -0,0 +1,44 @@
+"""Management command to show the measurements aggregated by the instrumentation AggregatorSink."""
+import json
+
+from django.core.management.base import BaseCommand
+
+from catalog_plugin.instrumentation import read_metrics, reset_metrics
+
+
+class Command(BaseCommand):
+    """
+    Show the measurements aggregated by the instrumentation AggregatorSink.
+
+    Examples:
+        ./manage.py lms show_catalog_metrics
+        ./manage.py lms show_catalog_metrics --json --reset
+    """
+
+    help = 'Show the call count, mean time, queries and rows of every instrumented catalog_plugin call.'
+
+    def add_arguments(self, parser):
+        """Add the command arguments."""
+        parser.add_argument('--json', action='store_true', help='Print the raw totals as JSON.')
+        parser.add_argument('--reset', action='store_true', help='Remove the totals after printing them.')
+
+    def handle(self, *args, **options):
+        """Print the aggregated measurements."""
+        metrics = read_metrics()
+
+        if options['json']:
+            self.stdout.write(json.dumps(metrics, indent=2, sort_keys=True))
+        elif not metrics:
+            self.stdout.write('No measurements. Is the AggregatorSink enabled?')
+        else:
+            width = max(len(name) for name in metrics)
+            self.stdout.write(f'{"name":<{width}}  {"calls":>8}  {"mean ms":>10}  {"queries":>8}  {"rows":>8}')
+            for name, totals in sorted(metrics.items()):
+                calls = totals['calls'] or 1
+                self.stdout.write(
+                    f'{name:<{width}}  {totals["calls"]:>8}  {totals["microseconds"] / calls / 1000:>10.2f}'
+                    f'  {totals["queries"] / calls:>8.1f}  {totals["rows"] / calls:>8.1f}',
+                )
+
+        if options['reset']:
+            reset_metrics()
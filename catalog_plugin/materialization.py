@@ -0,0 +1,136 @@
+"""
+Maintenance of the membership table of materialized dynamic catalogs.
+
+A materialized `DynamicCatalog` stores the course overviews that match its
+query in `DynamicCatalogMembership`. The table is fully rebuilt when the
+catalog query changes and incrementally refreshed when a single course
+overview is saved, by evaluating only that row against every materialized
+query in one statement. The added and removed courses are recorded in the
+membership changelog.
+
+Both paths lock the rows of the catalogs they write before evaluating their
+queries, in the same transaction, so a rebuild and a concurrent refresh of a
+course cannot overwrite each other with stale matches.
+"""
+import logging
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Count
+
+from catalog_plugin.changelog import record_course_events
+from catalog_plugin.edxapp_wrapper.course_module import course_overview
+from catalog_plugin.membership import bump_membership_versions
+from catalog_plugin.models import DynamicCatalog, DynamicCatalogMembership, MembershipEvent
+
+logger = logging.getLogger(__name__)
+
+
+def get_materialized_catalogs():
+    """Return the materialized dynamic catalogs that define a query string."""
+    return DynamicCatalog.objects.filter(materialized=True).exclude(query_string__isnull=True).exclude(
+        query_string='',
+    )
+
+
+def rebuild_catalog(catalog):
+    """
+    Synchronize the membership table of a dynamic catalog with its query.
+
+    Catalogs that are not materialized get their membership rows removed. The
+    membership version is only bumped when courses are added or removed.
+
+    Args:
+        catalog (DynamicCatalog): The dynamic catalog to rebuild.
+
+    Returns:
+        tuple[int, int]: Number of memberships added and removed.
+    """
+    with transaction.atomic():
+        list(DynamicCatalog.objects.select_for_update().filter(pk=catalog.pk).values_list('pk', flat=True))
+        matching_ids = set()
+        if catalog.materialized:
+            matching_ids = set(catalog.get_live_courses().values_list('pk', flat=True).iterator())
+        current_ids = set(catalog.memberships.values_list('course_id', flat=True))
+        ids_to_add = matching_ids - current_ids
+        ids_to_remove = current_ids - matching_ids
+
+        DynamicCatalogMembership.objects.bulk_create(
+            [DynamicCatalogMembership(catalog=catalog, course_id=course_id) for course_id in ids_to_add],
+            ignore_conflicts=True,
+        )
+        if ids_to_remove:
+            catalog.memberships.filter(course_id__in=ids_to_remove).delete()
+        if catalog.materialized:
+            record_course_events(
+                MembershipEvent.COURSE_ADDED,
+                [(catalog.pk, course_id) for course_id in ids_to_add],
+            )
+            record_course_events(
+                MembershipEvent.COURSE_REMOVED,
+                [(catalog.pk, course_id) for course_id in ids_to_remove],
+            )
+        if ids_to_add or ids_to_remove:
+            bump_membership_versions([catalog.pk])
+
+    logger.info(
+        'Rebuilt dynamic catalog memberships. Catalog: %s, Added: %s, Removed: %s',
+        catalog.pk,
+        len(ids_to_add),
+        len(ids_to_remove),
+    )
+    return len(ids_to_add), len(ids_to_remove)
+
+
+def refresh_course(course_id):
+    """
+    Re-evaluate a single course overview against every materialized dynamic catalog.
+
+    The row is matched against all the compiled queries with one conditional
+    aggregation, so the cost does not depend on the size of the course table.
+
+    Args:
+        course_id (CourseKey or str): Primary key of the saved course overview.
+
+    Returns:
+        set: Ids of the catalogs whose membership changed.
+    """
+    compiled_queries = {}
+
+    with transaction.atomic():
+        for catalog in get_materialized_catalogs().select_for_update().order_by('pk'):
+            try:
+                compiled_queries[catalog.pk] = catalog.get_compiled_query()
+            except ValidationError:
+                logger.exception('Skipping materialized dynamic catalog with an invalid query. Catalog: %s', catalog.pk)
+
+        if not compiled_queries:
+            return set()
+
+        catalog_ids = list(compiled_queries)
+        aggregates = {
+            f'catalog_{index}': Count('pk', filter=compiled_queries[catalog_id].q)
+            for index, catalog_id in enumerate(catalog_ids)
+        }
+        matches = course_overview().objects.filter(pk=course_id).aggregate(**aggregates)
+        matching_ids = {catalog_id for index, catalog_id in enumerate(catalog_ids) if matches[f'catalog_{index}']}
+        current_ids = set(
+            DynamicCatalogMembership.objects.filter(
+                course_id=course_id,
+                catalog_id__in=catalog_ids,
+            ).values_list('catalog_id', flat=True),
+        )
+        ids_to_add = matching_ids - current_ids
+        ids_to_remove = current_ids - matching_ids
+
+        DynamicCatalogMembership.objects.bulk_create(
+            [DynamicCatalogMembership(catalog_id=catalog_id, course_id=course_id) for catalog_id in ids_to_add],
+            ignore_conflicts=True,
+        )
+        if ids_to_remove:
+            DynamicCatalogMembership.objects.filter(course_id=course_id, catalog_id__in=ids_to_remove).delete()
+        record_course_events(MembershipEvent.COURSE_ADDED, [(catalog_id, course_id) for catalog_id in ids_to_add])
+        record_course_events(MembershipEvent.COURSE_REMOVED, [(catalog_id, course_id) for catalog_id in ids_to_remove])
+        bump_membership_versions(ids_to_add | ids_to_remove)
+
+    return ids_to_add | ids_to_remove
@@ -0,0 +1,781 @@
+"""
+Cache of the course keys resolved by each catalog.
+
+Every catalog stores a `membership_version` counter. The resolved course keys
+of a catalog are cached under a key that includes that counter, so bumping the
+version is enough to invalidate the cached membership: readers holding the new
+version miss the cache and resolve the catalog again, while the stale entry
+simply expires.
+
+Attributes:
+    CACHE_KEY_PREFIX (str): Prefix of every membership cache key.
+    MEMBERSHIP_FIELDS (list): Catalog fields written when the membership version is bumped,
+        including the denormalized course counts refreshed after the commit.
+    PENDING_COUNTS_ATTR (str): Connection attribute holding the ids of the
+        catalogs whose course counts are refreshed after the commit.
+    DEFAULT_CACHE_TIMEOUT (int): Seconds a membership entry is kept when the
+        `CP_MEMBERSHIP_CACHE_TIMEOUT` setting is not defined.
+    membership_changed (Signal): Sent after the commit of every membership
+        version bump, with the `catalog_ids` of the bumped catalogs.
+"""
+import logging
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import BooleanField, Case, Count, F, Q, Value, When
+from django.db.models.functions import Now
+from django.dispatch import Signal
+
+from catalog_plugin.async_compat import acache_get, acache_get_many, acache_set, acache_set_many
+from catalog_plugin.changelog import record_catalog_events, stores_courses
+from catalog_plugin.edxapp_wrapper.course_module import course_overview
+from catalog_plugin.identity_map import clear_identity_map
+from catalog_plugin.invalidation import publish_invalidations
+from catalog_plugin.models import (
+    COMPOSITE_MAX_DEPTH,
+    AvailableCourse,
+    CatalogCourses,
+    CompositeCatalog,
+    CompositeCatalogChild,
+    DynamicCatalog,
+    DynamicCatalogMembership,
+    FixedCatalog,
+    FlexibleCatalogModel,
+    MembershipEvent,
+)
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY_PREFIX = 'catalog_plugin.membership'
+MEMBERSHIP_FIELDS = ['membership_version', 'membership_modified', 'course_count', 'active_course_count']
+DEFAULT_CACHE_TIMEOUT = 60 * 60
+PENDING_COUNTS_ATTR = '_catalog_plugin_pending_course_counts'
+
+membership_changed = Signal()
+
+
+def get_membership_cache():
+    """Return the cache backend configured to store catalog memberships."""
+    return caches[getattr(settings, 'CP_MEMBERSHIP_CACHE_ALIAS', 'default')]
+
+
+def get_membership_cache_timeout():
+    """Return the number of seconds a membership entry is kept in the cache."""
+    return getattr(settings, 'CP_MEMBERSHIP_CACHE_TIMEOUT', DEFAULT_CACHE_TIMEOUT)
+
+
+def membership_cache_key(catalog):
+    """
+    Build the cache key of the membership of a catalog.
+
+    Args:
+        catalog (FlexibleCatalogModel): The catalog instance.
+
+    Returns:
+        str: A key that changes whenever the catalog membership version changes.
+    """
+    return f'{CACHE_KEY_PREFIX}.{catalog.pk}.{catalog.membership_version}'
+
+
+def resolve_course_keys(catalog):
+    """
+    Resolve the course keys of a catalog against the database, with `get_course_keys()`.
+
+    Args:
+        catalog (FlexibleCatalogModel): The catalog instance.
+
+    Returns:
+        list[str]: The sorted course keys of the catalog.
+    """
+    return sorted(catalog.get_course_keys())
+
+
+def get_cached_course_keys(catalog):
+    """
+    Return the course keys of a catalog, resolving them only on a cache miss.
+
+    The cache entry is looked up with the `membership_version` loaded in the
+    given instance, so callers should use a recently fetched catalog.
+
+    Args:
+        catalog (FlexibleCatalogModel): The catalog instance.
+
+    Returns:
+        list[str]: The sorted course keys of the catalog.
+    """
+    cache = get_membership_cache()
+    cache_key = membership_cache_key(catalog)
+    course_keys = cache.get(cache_key)
+
+    if course_keys is None:
+        course_keys = resolve_course_keys(catalog)
+        cache.set(cache_key, course_keys, get_membership_cache_timeout())
+
+    return course_keys
+
+
+def get_many_cached_course_keys(catalogs):
+    """
+    Return the course keys of many catalogs, resolving the cache misses in groups.
+
+    Catalogs should be resolved to their subclasses, e.g. with `select_subclasses()`.
+    The cache misses are resolved with at most one query per catalog type: one
+    for the fixed catalogs, one for the catalog courses, one for the materialized
+    dynamic catalogs, one for all the live dynamic catalogs and one for the plain
+    catalogs, regardless of the number of catalogs. Composite catalogs are
+    evaluated together in one more query, after loading the children of each one.
+
+    Args:
+        catalogs (Iterable[FlexibleCatalogModel]): The catalog instances.
+
+    Returns:
+        dict: Sorted lists of course keys indexed by catalog id.
+    """
+    catalogs = list(catalogs)
+    cache = get_membership_cache()
+    cache_keys = {catalog.pk: membership_cache_key(catalog) for catalog in catalogs}
+    cached_entries = cache.get_many(list(cache_keys.values()))
+    course_keys = {
+        catalog_id: cached_entries[cache_key]
+        for catalog_id, cache_key in cache_keys.items()
+        if cache_key in cached_entries
+    }
+    missing_catalogs = [catalog for catalog in catalogs if catalog.pk not in course_keys]
+
+    if missing_catalogs:
+        resolved = _resolve_many_course_keys(missing_catalogs)
+        cache.set_many(
+            {cache_keys[catalog_id]: keys for catalog_id, keys in resolved.items()},
+            get_membership_cache_timeout(),
+        )
+        course_keys.update(resolved)
+
+    return course_keys
+
+
+async def aget_cached_course_keys(catalog):
+    """
+    Async counterpart of `get_cached_course_keys`.
+
+    Cache hits need no database hop. A miss is resolved in a single
+    `sync_to_async` call, since resolving a catalog may take several queries.
+
+    Args:
+        catalog (FlexibleCatalogModel): The catalog instance.
+
+    Returns:
+        list[str]: The sorted course keys of the catalog.
+    """
+    cache = get_membership_cache()
+    cache_key = membership_cache_key(catalog)
+    course_keys = await acache_get(cache, cache_key)
+
+    if course_keys is None:
+        course_keys = await sync_to_async(resolve_course_keys)(catalog)
+        await acache_set(cache, cache_key, course_keys, get_membership_cache_timeout())
+
+    return course_keys
+
+
+async def aget_many_cached_course_keys(catalogs):
+    """
+    Async counterpart of `get_many_cached_course_keys`.
+
+    The cache misses are resolved together in a single `sync_to_async` call.
+
+    Args:
+        catalogs (Iterable[FlexibleCatalogModel]): The catalog instances.
+
+    Returns:
+        dict: Sorted lists of course keys indexed by catalog id.
+    """
+    catalogs = list(catalogs)
+    cache = get_membership_cache()
+    cache_keys = {catalog.pk: membership_cache_key(catalog) for catalog in catalogs}
+    cached_entries = await acache_get_many(cache, list(cache_keys.values()))
+    course_keys = {
+        catalog_id: cached_entries[cache_key]
+        for catalog_id, cache_key in cache_keys.items()
+        if cache_key in cached_entries
+    }
+    missing_catalogs = [catalog for catalog in catalogs if catalog.pk not in course_keys]
+
+    if missing_catalogs:
+        resolved = await sync_to_async(_resolve_many_course_keys)(missing_catalogs)
+        await acache_set_many(
+            cache,
+            {cache_keys[catalog_id]: keys for catalog_id, keys in resolved.items()},
+            get_membership_cache_timeout(),
+        )
+        course_keys.update(resolved)
+
+    return course_keys
+
+
+def _group_catalogs(catalogs):
+    """Group catalogs by type, splitting the materialized and the live dynamic catalogs."""
+    groups = defaultdict(list)
+    for catalog in catalogs:
+        if isinstance(catalog, DynamicCatalog):
+            groups['materialized' if catalog.materialized else 'live'].append(catalog)
+        else:
+            groups[type(catalog)].append(catalog)
+    return groups
+
+
+def _resolve_many_course_keys(catalogs):
+    """Resolve the course keys of many catalogs with one query per catalog type."""
+    groups = _group_catalogs(catalogs)
+    course_keys = defaultdict(set)
+
+    for relation in (FixedCatalog.course_runs, CatalogCourses.courses):
+        catalog_ids = [catalog.pk for catalog in groups[relation.field.model]]
+        for catalog_id, course_key in _relation_course_keys(relation, catalog_ids):
+            course_keys[catalog_id].add(str(course_key))
+
+    if groups['materialized']:
+        for catalog_id, course_key in DynamicCatalogMembership.objects.filter(
+            catalog_id__in=[catalog.pk for catalog in groups['materialized']],
+        ).values_list('catalog_id', 'course_id'):
+            course_keys[catalog_id].add(str(course_key))
+
+    for catalog_id, keys in _live_dynamic_course_keys(groups['live']).items():
+        course_keys[catalog_id].update(keys)
+
+    composite_conditions = {catalog.pk: catalog.get_course_filter() for catalog in groups[CompositeCatalog]}
+    for catalog_id, keys in _matching_course_keys(composite_conditions).items():
+        course_keys[catalog_id].update(keys)
+
+    if groups[FlexibleCatalogModel]:
+        all_keys = {str(course_key) for course_key in AvailableCourse.objects.values_list('course_id', flat=True)}
+        for catalog in groups[FlexibleCatalogModel]:
+            course_keys[catalog.pk] = all_keys
+
+    return {catalog.pk: sorted(course_keys[catalog.pk]) for catalog in catalogs}
+
+
+def _relation_course_keys(relation, catalog_ids):
+    """Return the (catalog id, course key) pairs of a catalog many-to-many relation."""
+    if not catalog_ids:
+        return []
+
+    through = relation.through
+    catalog_attname = through._meta.get_field(relation.field.m2m_field_name()).attname
+    target_name = relation.field.m2m_reverse_field_name()
+    course_key_path = f'{target_name}__course_id' if relation.field.related_model is AvailableCourse else target_name
+
+    return through.objects.filter(**{f'{catalog_attname}__in': catalog_ids}).values_list(
+        catalog_attname,
+        course_key_path,
+    )
+
+
+def _live_dynamic_course_keys(catalogs, course_keys=None):
+    """
+    Evaluate many live dynamic catalogs with a single query over CourseOverview.
+
+    When `course_keys` is given, only those course overviews are evaluated.
+    """
+    return _matching_course_keys(_live_dynamic_conditions(catalogs), course_keys)
+
+
+def _live_dynamic_conditions(catalogs):
+    """Return the compiled conditions of live dynamic catalogs, skipping the invalid ones."""
+    compiled_queries = {}
+
+    for catalog in catalogs:
+        try:
+            compiled_query = catalog.get_compiled_query()
+        except ValidationError:
+            logger.exception('Skipping dynamic catalog with an invalid query. Catalog: %s', catalog.pk)
+            continue
+        if compiled_query:
+            compiled_queries[catalog.pk] = compiled_query.q
+
+    return compiled_queries
+
+
+def _matching_course_keys(conditions, course_keys=None):
+    """
+    Evaluate many conditions over CourseOverview with a single query.
+
+    Args:
+        conditions (dict): Conditions over CourseOverview indexed by catalog id.
+            None conditions match no course.
+        course_keys (Iterable, optional): When given, only those course overviews are evaluated.
+
+    Returns:
+        dict: Sets of matching course keys indexed by catalog id.
+    """
+    conditions = {catalog_id: condition for catalog_id, condition in conditions.items() if condition is not None}
+
+    if not conditions:
+        return {}
+
+    catalog_ids = list(conditions)
+    any_match = Q()
+    for condition in conditions.values():
+        any_match |= condition
+    annotations = {
+        f'catalog_{index}': Case(
+            When(conditions[catalog_id], then=Value(True)),
+            default=Value(False),
+            output_field=BooleanField(),
+        )
+        for index, catalog_id in enumerate(catalog_ids)
+    }
+    courses = course_overview().objects.filter(any_match)
+    if course_keys is not None:
+        courses = courses.filter(pk__in=course_keys)
+    matched_keys = defaultdict(set)
+
+    for row in courses.annotate(**annotations).values_list('pk', *annotations):
+        for catalog_id, matches in zip(catalog_ids, row[1:]):
+            if matches:
+                matched_keys[catalog_id].add(str(row[0]))
+
+    return matched_keys
+
+
+def get_live_catalog_ids_for_course(course_id, conditions=None):
+    """
+    Return the ids of the live dynamic catalogs that match a course overview, with one query.
+
+    Args:
+        course_id (CourseKey or str): Primary key of the course overview.
+        conditions (dict, optional): Conditions of the live dynamic catalogs to
+            evaluate, indexed by catalog id. Defaults to every live dynamic catalog.
+
+    Returns:
+        set: The ids of the matching catalogs.
+    """
+    if conditions is None:
+        conditions = _live_dynamic_conditions(DynamicCatalog.objects.filter(materialized=False))
+
+    return set(_matching_course_keys(conditions, [course_id]))
+
+
+def get_query_changes(course, update_fields=None):
+    """
+    Find the dynamic catalogs whose queries use a field of a course overview about to be saved with a new value.
+
+    The stored values of the fields used by any dynamic catalog query are read
+    with one query and compared with the values being saved. Only the live
+    dynamic catalogs whose queries use a changed field are evaluated against
+    the stored row, with one more query, so that `get_live_catalog_ids_for_course`
+    can tell after the save which of them gained or lost the course.
+
+    Args:
+        course (CourseOverview): The course overview about to be saved.
+        update_fields (Iterable or None): The names of the fields being saved, None for every field.
+
+    Returns:
+        tuple: The conditions of the live dynamic catalogs to evaluate again after
+        the save, indexed by catalog id, the ids of those matching the stored row,
+        and whether the query of any materialized dynamic catalog uses a changed field.
+    """
+    compiled_queries = {}
+    for catalog in DynamicCatalog.objects.exclude(query_string__isnull=True).exclude(query_string=''):
+        try:
+            compiled_queries[catalog.pk] = (catalog.materialized, catalog.get_compiled_query())
+        except ValidationError:
+            logger.exception('Skipping dynamic catalog with an invalid query. Catalog: %s', catalog.pk)
+
+    fields = {field for _, compiled_query in compiled_queries.values() for field in compiled_query.fields}
+    if update_fields is not None:
+        fields &= set(update_fields)
+    attnames = {field: course._meta.get_field(field).attname for field in fields}
+    stored_values = None
+    if fields and not course._state.adding:
+        stored_values = course_overview().objects.filter(pk=course.pk).values(*attnames.values()).first()
+
+    if stored_values is None:
+        changed_fields = fields
+    else:
+        changed_fields = {
+            field for field, attname in attnames.items() if stored_values[attname] != getattr(course, attname)
+        }
+
+    conditions = {
+        catalog_id: compiled_query.q
+        for catalog_id, (materialized, compiled_query) in compiled_queries.items()
+        if not materialized and compiled_query.fields & changed_fields
+    }
+    matched_ids = get_live_catalog_ids_for_course(course.pk, conditions) if stored_values is not None else set()
+    materialized_changed = any(
+        materialized and compiled_query.fields & changed_fields
+        for materialized, compiled_query in compiled_queries.values()
+    )
+
+    return conditions, matched_ids, materialized_changed
+
+
+def get_catalog_ids_for_courses(course_keys):
+    """
+    Return the ids of the catalogs that contain each of the given courses.
+
+    This is the reverse of `get_cached_course_keys`. Fixed catalogs, catalog
+    courses and materialized dynamic catalogs are looked up through the indexed
+    course columns of their membership tables, the live dynamic catalogs are
+    evaluated together in a single query restricted to the given courses and the
+    plain catalogs contain every course with an AvailableCourse. The composite
+    catalogs are also evaluated together in a single query, after loading the
+    children of each one. Apart from those loads, the number of queries depends
+    neither on the number of courses nor on the number of catalogs.
+
+    Args:
+        course_keys (Iterable): Course keys, as strings or CourseKey instances.
+
+    Returns:
+        dict: Sorted lists of catalog ids indexed by every given course key, as a string.
+    """
+    course_keys = {str(course_key) for course_key in course_keys}
+    catalog_ids = defaultdict(set)
+
+    if not course_keys:
+        return {}
+
+    for relation in (FixedCatalog.course_runs, CatalogCourses.courses):
+        through = relation.through
+        catalog_attname = through._meta.get_field(relation.field.m2m_field_name()).attname
+        target_name = relation.field.m2m_reverse_field_name()
+        if relation.field.related_model is AvailableCourse:
+            target_name = f'{target_name}__course_id'
+        for catalog_id, course_key in through.objects.filter(**{f'{target_name}__in': course_keys}).values_list(
+            catalog_attname,
+            target_name,
+        ):
+            catalog_ids[str(course_key)].add(catalog_id)
+
+    for catalog_id, course_key in DynamicCatalogMembership.objects.filter(
+        course_id__in=course_keys,
+    ).values_list('catalog_id', 'course_id'):
+        catalog_ids[str(course_key)].add(catalog_id)
+
+    live_catalogs = DynamicCatalog.objects.filter(materialized=False)
+    for catalog_id, keys in _live_dynamic_course_keys(live_catalogs, course_keys).items():
+        for course_key in keys:
+            catalog_ids[course_key].add(catalog_id)
+
+    composite_conditions = {}
+    for catalog in CompositeCatalog.objects.all():
+        try:
+            composite_conditions[catalog.pk] = catalog.get_course_filter()
+        except ValidationError:
+            logger.exception('Skipping composite catalog that contains itself. Catalog: %s', catalog.pk)
+    for catalog_id, keys in _matching_course_keys(composite_conditions, course_keys).items():
+        for course_key in keys:
+            catalog_ids[course_key].add(catalog_id)
+
+    available_keys = {
+        str(course_key)
+        for course_key in AvailableCourse.objects.filter(course_id__in=course_keys).values_list('course_id', flat=True)
+    }
+    if available_keys:
+        plain_catalog_ids = set(get_plain_catalog_ids())
+        for course_key in available_keys:
+            catalog_ids[course_key].update(plain_catalog_ids)
+
+    return {course_key: sorted(catalog_ids[course_key], key=str) for course_key in course_keys}
+
+
+async def aget_catalog_ids_for_courses(course_keys):
+    """
+    Async counterpart of `get_catalog_ids_for_courses`.
+
+    Its queries run together in a single `sync_to_async` call.
+
+    Args:
+        course_keys (Iterable): Course keys, as strings or CourseKey instances.
+
+    Returns:
+        dict: Sorted lists of catalog ids indexed by every given course key, as a string.
+    """
+    return await sync_to_async(get_catalog_ids_for_courses)(list(course_keys))
+
+
+def get_course_counts(catalogs):
+    """
+    Count the courses and the active courses of many catalogs.
+
+    Catalogs should be resolved to their subclasses. The fixed catalogs, the
+    catalog courses, the materialized dynamic catalogs and the plain catalogs
+    are counted with one grouped query per type. The live dynamic and the
+    composite catalogs are counted together with one aggregation over CourseOverview.
+    A course is active when it has an active AvailableCourse.
+
+    Args:
+        catalogs (Iterable[FlexibleCatalogModel]): The catalog instances.
+
+    Returns:
+        dict: Pairs of course count and active course count indexed by catalog id.
+    """
+    catalogs = list(catalogs)
+    groups = _group_catalogs(catalogs)
+    counts = {catalog.pk: (0, 0) for catalog in catalogs}
+
+    for relation in (FixedCatalog.course_runs, CatalogCourses.courses):
+        catalog_ids = [catalog.pk for catalog in groups[relation.field.model]]
+        if not catalog_ids:
+            continue
+        through = relation.through
+        catalog_attname = through._meta.get_field(relation.field.m2m_field_name()).attname
+        target_name = relation.field.m2m_reverse_field_name()
+        active_path = f'{target_name}__active' if relation.field.related_model is AvailableCourse else (
+            f'{target_name}__availablecourse__active'
+        )
+        counts.update(
+            (catalog_id, (total, active))
+            for catalog_id, total, active in through.objects.filter(
+                **{f'{catalog_attname}__in': catalog_ids},
+            ).values(catalog_attname).annotate(
+                total=Count('pk'),
+                active=Count('pk', filter=Q(**{active_path: True})),
+            ).values_list(catalog_attname, 'total', 'active')
+        )
+
+    if groups['materialized']:
+        counts.update(
+            (catalog_id, (total, active))
+            for catalog_id, total, active in DynamicCatalogMembership.objects.filter(
+                catalog_id__in=[catalog.pk for catalog in groups['materialized']],
+            ).values('catalog_id').annotate(
+                total=Count('pk'),
+                active=Count('pk', filter=Q(course__availablecourse__active=True)),
+            ).values_list('catalog_id', 'total', 'active')
+        )
+
+    conditions = _live_dynamic_conditions(groups['live'])
+    conditions.update((catalog.pk, catalog.get_course_filter()) for catalog in groups[CompositeCatalog])
+    conditions = {catalog_id: condition for catalog_id, condition in conditions.items() if condition is not None}
+    if conditions:
+        aggregates = {}
+        for index, condition in enumerate(conditions.values()):
+            aggregates[f'total_{index}'] = Count('pk', filter=condition)
+            aggregates[f'active_{index}'] = Count('pk', filter=condition & Q(availablecourse__active=True))
+        totals = course_overview().objects.aggregate(**aggregates)
+        counts.update(
+            (catalog_id, (totals[f'total_{index}'], totals[f'active_{index}']))
+            for index, catalog_id in enumerate(conditions)
+        )
+
+    if groups[FlexibleCatalogModel]:
+        totals = AvailableCourse.objects.aggregate(total=Count('pk'), active=Count('pk', filter=Q(active=True)))
+        counts.update((catalog.pk, (totals['total'], totals['active'])) for catalog in groups[FlexibleCatalogModel])
+
+    return counts
+
+
+def _write_course_counts(catalogs):
+    """
+    Write the course counts of catalogs that changed, with one `bulk_update`.
+
+    The `membership_modified` timestamp of the rewritten catalogs is moved too,
+    since the counts are part of their serialized representation.
+    """
+    counts = get_course_counts(catalogs)
+    rows = [
+        FlexibleCatalogModel(
+            pk=catalog.pk,
+            course_count=counts[catalog.pk][0],
+            active_course_count=counts[catalog.pk][1],
+            membership_modified=Now(),
+        )
+        for catalog in catalogs
+        if counts[catalog.pk] != (catalog.course_count, catalog.active_course_count)
+    ]
+
+    FlexibleCatalogModel.objects.bulk_update(rows, ['course_count', 'active_course_count', 'membership_modified'])
+    return len(rows)
+
+
+def _with_composite_parents(catalog_ids):
+    """Return the condition matching the catalogs and the composite catalogs up to `COMPOSITE_MAX_DEPTH` above them."""
+    condition = Q(pk__in=catalog_ids)
+    parent_ids = catalog_ids
+    for _ in range(COMPOSITE_MAX_DEPTH):
+        parent_ids = CompositeCatalogChild.objects.filter(child_id__in=parent_ids).values('composite_id')
+        condition |= Q(pk__in=parent_ids)
+    return condition
+
+
+def schedule_course_counts(catalog_ids):
+    """
+    Refresh the course counts of catalogs once the current transaction commits.
+
+    The ids scheduled by every write of the transaction are refreshed together,
+    with the composite catalogs above them, by a single `refresh_course_counts`
+    call, so counting never runs inside the write transaction. Outside of a
+    transaction, the counts are refreshed right away.
+
+    Args:
+        catalog_ids (Iterable[uuid.UUID]): Primary keys of the catalogs whose course counts may have changed.
+    """
+    catalog_ids = set(catalog_ids)
+
+    if not catalog_ids:
+        return
+
+    connection = transaction.get_connection()
+    pending_ids = getattr(connection, PENDING_COUNTS_ATTR, None)
+    if pending_ids is None:
+        pending_ids = set()
+        setattr(connection, PENDING_COUNTS_ATTR, pending_ids)
+    pending_ids.update(catalog_ids)
+    transaction.on_commit(_refresh_pending_course_counts)
+
+
+def _refresh_pending_course_counts():
+    """
+    Refresh the course counts of the catalogs scheduled on this connection.
+
+    Every write of a transaction registers this callback, the first one to run
+    takes every scheduled id. Ids left by a rolled back transaction are refreshed
+    with the next ones, which is harmless. Failures are logged, the counts can
+    be repaired with the `refresh_catalog_counts` management command.
+    """
+    pending_ids = getattr(transaction.get_connection(), PENDING_COUNTS_ATTR, None)
+
+    if not pending_ids:
+        return
+
+    catalog_ids = set(pending_ids)
+    pending_ids.clear()
+    catalogs = FlexibleCatalogModel.objects.filter(_with_composite_parents(catalog_ids)).select_subclasses()
+    try:
+        refresh_course_counts(catalogs)
+    except Exception:  # pylint: disable=broad-except
+        logger.exception('Refreshing the course counts of %s catalogs failed.', len(catalog_ids))
+
+
+def bump_membership_versions(catalog_ids):
+    """
+    Increase the membership version of the given catalogs.
+
+    The composite catalogs that contain the given catalogs, up to
+    `COMPOSITE_MAX_DEPTH` levels above them, are bumped too. The catalogs are
+    loaded and bumped with a single update that also sets `membership_modified`,
+    in the current transaction, so readers only see the new version once the
+    change that caused it has been committed. Their course counts are refreshed
+    with `schedule_course_counts` after the commit. `membership_changed` is sent
+    with the ids of every bumped catalog once the transaction commits, and the
+    new versions are published to the other processes with `publish_invalidations`.
+    The bumped catalogs whose courses are not stored get a `membership_changed`
+    event in the changelog.
+
+    Args:
+        catalog_ids (Iterable[uuid.UUID]): Primary keys of the catalogs whose membership changed.
+
+    Returns:
+        int: The number of catalogs updated.
+    """
+    catalog_ids = set(catalog_ids)
+
+    if not catalog_ids:
+        return 0
+
+    with transaction.atomic(savepoint=False):
+        catalogs = list(FlexibleCatalogModel.objects.filter(_with_composite_parents(catalog_ids)).select_subclasses())
+        bumped_ids = [catalog.pk for catalog in catalogs]
+        publish_invalidations((catalog.pk, catalog.membership_version + 1) for catalog in catalogs)
+        record_catalog_events(
+            MembershipEvent.MEMBERSHIP_CHANGED,
+            [catalog.pk for catalog in catalogs if not stores_courses(catalog)],
+        )
+        updated = FlexibleCatalogModel.objects.filter(pk__in=bumped_ids).update(
+            membership_version=F('membership_version') + 1,
+            membership_modified=Now(),
+        )
+        transaction.on_commit(lambda: membership_changed.send(sender=FlexibleCatalogModel, catalog_ids=bumped_ids))
+        schedule_course_counts(bumped_ids)
+    clear_identity_map()
+    logger.debug('Bumped membership version of %s catalogs.', updated)
+
+    return updated
+
+
+def refresh_course_counts(catalogs):
+    """
+    Recompute the course counts of catalogs without bumping their membership versions.
+
+    Only the catalogs whose counts changed are written, with a new `membership_modified`.
+
+    Args:
+        catalogs (Iterable[FlexibleCatalogModel]): The catalogs, resolved to their subclasses.
+
+    Returns:
+        int: The number of catalogs whose counts changed.
+    """
+    updated = _write_course_counts(list(catalogs))
+    clear_identity_map()
+    return updated
+
+
+def get_plain_catalog_ids():
+    """Return the ids of the catalogs that are not specialized by any subclass, which contain every course."""
+    return FlexibleCatalogModel.objects.filter(
+        fixedcatalog__isnull=True,
+        catalogcourses__isnull=True,
+        dynamiccatalog__isnull=True,
+        compositecatalog__isnull=True,
+    ).values_list('pk', flat=True)
+
+
+def get_course_catalog_ids(course_ids):
+    """
+    Return the ids of the catalogs whose course counts depend on the given course overviews.
+
+    These are the fixed catalogs, catalog courses and materialized dynamic
+    catalogs that contain any of the courses, the live dynamic catalogs that
+    match any of them, evaluated together in one query, and every plain catalog.
+
+    Args:
+        course_ids (Iterable or QuerySet): Primary keys of the course overviews.
+
+    Returns:
+        set: The catalog ids.
+    """
+    conditions = Q(pk__in=DynamicCatalogMembership.objects.filter(course_id__in=course_ids).values('catalog_id'))
+    conditions |= Q(pk__in=get_plain_catalog_ids())
+
+    for relation in (FixedCatalog.course_runs, CatalogCourses.courses):
+        through = relation.through
+        catalog_attname = through._meta.get_field(relation.field.m2m_field_name()).attname
+        target_name = relation.field.m2m_reverse_field_name()
+        if relation.field.related_model is AvailableCourse:
+            target_name = f'{target_name}__course_id'
+        conditions |= Q(pk__in=through.objects.filter(**{f'{target_name}__in': course_ids}).values(catalog_attname))
+
+    live_catalogs = DynamicCatalog.objects.filter(materialized=False)
+    return {
+        *FlexibleCatalogModel.objects.filter(conditions).values_list('pk', flat=True),
+        *_live_dynamic_course_keys(live_catalogs, course_ids),
+    }
+
+
+def update_course_catalogs(course_ids, changed_catalog_ids=()):
+    """
+    Update the catalogs whose course counts depend on the given course overviews.
+
+    Used when AvailableCourse objects are created, deleted or change their
+    active flag. Only the catalogs whose course keys changed, e.g. the plain
+    catalogs when an AvailableCourse is created, get their membership versions
+    bumped. The other catalogs, and the composite catalogs above them, keep
+    their cached memberships and only get their course counts refreshed once
+    the transaction commits, see `schedule_course_counts`.
+
+    Args:
+        course_ids (Iterable or QuerySet): Primary keys of the course overviews.
+        changed_catalog_ids (Iterable[uuid.UUID]): Ids of the catalogs whose course keys changed.
+
+    Returns:
+        int: The number of catalogs whose membership version was bumped.
+    """
+    changed_catalog_ids = set(changed_catalog_ids)
+    schedule_course_counts(get_course_catalog_ids(course_ids) - changed_catalog_ids)
+
+    return bump_membership_versions(changed_catalog_ids)
@@ -0,0 +1,311 @@
+"""
+In-process index of the catalog memberships, to check courses without queries.
+
+Every course key seen by the index gets a dense integer id. The members of a
+catalog are stored as a sorted `array('I')` of those ids when the catalog is
+sparse, or as a bitset in a Python int when it holds at least one course out
+of `BITSET_DENSITY`, whichever is smaller. Checking a course is then a bisect
+or a bit test, and intersections only walk the smallest catalog.
+
+The members are read with `get_many_cached_course_keys`, so the index agrees
+with the membership cache and with `get_courses()`. Entries are kept current in
+three ways:
+
+- In this process, `membership_changed` drops the bumped catalogs when their
+  transaction commits.
+- In the other processes, `catalogs_invalidated` drops them once the change
+  is polled from the invalidation transport, when one is configured.
+- Every `CP_MEMBERSHIP_INDEX_REFRESH_INTERVAL` seconds, the next read loads
+  the membership versions of all the catalogs in one query and drops the
+  entries that changed, e.g. in other processes without a transport.
+
+Usage:
+    index = get_membership_index()
+    index.contains(catalog_id, 'course-v1:edX+DemoX+Demo_Course')
+
+Attributes:
+    BITSET_DENSITY (int): Catalogs with at least one course out of this many
+        known courses are stored as bitsets.
+    DEFAULT_REFRESH_INTERVAL (int): Seconds between two version checks when the
+        `CP_MEMBERSHIP_INDEX_REFRESH_INTERVAL` setting is not defined.
+"""
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.dispatch import receiver
+
+from catalog_plugin.invalidation import catalogs_invalidated
+from catalog_plugin.membership import get_many_cached_course_keys, membership_changed
+from catalog_plugin.models import FlexibleCatalogModel
+
+BITSET_DENSITY = 32
+DEFAULT_REFRESH_INTERVAL = 30
+
+_index = None
+_index_lock = threading.Lock()
+
+
+class CatalogMembers:
+    """
+    The members of a catalog, as a sorted array of dense course ids or as a bitset.
+
+    Attributes:
+        version (int or None): The membership version the members were read at,
+            None when the catalog does not exist.
+        ids (array or None): The sorted dense ids, when the catalog is sparse.
+        bits (int or None): The bitset of dense ids, when the catalog is dense.
+        size (int): The number of courses of the catalog.
+    """
+
+    __slots__ = ('version', 'ids', 'bits', 'size')
+
+    def __init__(self, version, dense_ids, universe_size):
+        self.version = version
+        self.size = len(dense_ids)
+        if self.size * BITSET_DENSITY >= universe_size:
+            bitmap = bytearray((max(dense_ids, default=0) >> 3) + 1)
+            for dense_id in dense_ids:
+                bitmap[dense_id >> 3] |= 1 << (dense_id & 7)
+            self.ids, self.bits = None, int.from_bytes(bitmap, 'little')
+        else:
+            self.ids, self.bits = array('I', sorted(dense_ids)), None
+
+    def __contains__(self, dense_id):
+        """Return whether the dense course id is a member."""
+        if self.bits is not None:
+            return (self.bits >> dense_id) & 1 == 1
+        position = bisect_left(self.ids, dense_id)
+        return position < len(self.ids) and self.ids[position] == dense_id
+
+    def __iter__(self):
+        """Yield the dense course ids of the members."""
+        if self.bits is None:
+            yield from self.ids
+            return
+        bitmap = self.bits.to_bytes((self.bits.bit_length() + 7) >> 3, 'little')
+        for byte_index, byte in enumerate(bitmap):
+            if byte:
+                yield from ((byte_index << 3) + bit for bit in range(8) if byte >> bit & 1)
+
+    def __len__(self):
+        """Return the number of members."""
+        return self.size
+
+    @property
+    def nbytes(self):
+        """Return the memory used by the members, in bytes."""
+        return sys.getsizeof(self.bits) if self.bits is not None else sys.getsizeof(self.ids)
+
+
+class MembershipIndex:
+    """
+    Answer membership checks from in-process compiled catalog memberships.
+
+    Catalogs are loaded on their first check, together with the other catalogs
+    of the same call. All the methods are thread safe.
+
+    Args:
+        refresh_interval (int or None): Seconds between two version checks.
+            Defaults to the `CP_MEMBERSHIP_INDEX_REFRESH_INTERVAL` setting.
+    """
+
+    def __init__(self, refresh_interval=None):
+        self.refresh_interval = refresh_interval
+        self.course_ids = {}
+        self.course_keys = []
+        self.catalogs = {}
+        self.checked_at = time.monotonic()
+        self.lock = threading.RLock()
+
+    def get_refresh_interval(self):
+        """Return the number of seconds between two version checks."""
+        if self.refresh_interval is not None:
+            return self.refresh_interval
+        return getattr(settings, 'CP_MEMBERSHIP_INDEX_REFRESH_INTERVAL', DEFAULT_REFRESH_INTERVAL)
+
+    def contains(self, catalog_id, course_key):
+        """
+        Return whether a catalog contains a course.
+
+        Args:
+            catalog_id (uuid.UUID or str): The catalog id.
+            course_key (CourseKey or str): The course key.
+
+        Returns:
+            bool: True if the course is a member of the catalog.
+        """
+        members = self.get_members([catalog_id])[0]
+        dense_id = self.course_ids.get(str(course_key))
+        return dense_id is not None and dense_id in members
+
+    def contains_many(self, catalog_ids, course_keys):
+        """
+        Check many courses against many catalogs.
+
+        Args:
+            catalog_ids (Iterable): The catalog ids.
+            course_keys (Iterable): The course keys, as strings or CourseKey instances.
+
+        Returns:
+            dict: The frozenset of the given course keys each catalog contains, indexed by catalog id.
+        """
+        catalog_ids = list(catalog_ids)
+        members_list = self.get_members(catalog_ids)
+        course_keys = {str(course_key) for course_key in course_keys}
+        dense_ids = {
+            course_key: self.course_ids[course_key] for course_key in course_keys if course_key in self.course_ids
+        }
+        results = {}
+
+        for catalog_id, members in zip(catalog_ids, members_list):
+            results[catalog_id] = frozenset(
+                course_key for course_key, dense_id in dense_ids.items() if dense_id in members
+            )
+
+        return results
+
+    def intersect(self, catalog_ids):
+        """
+        Return the course keys contained in every given catalog.
+
+        Only the members of the smallest catalog are walked, each checked against the others.
+
+        Args:
+            catalog_ids (Iterable): The catalog ids.
+
+        Returns:
+            frozenset[str]: The common course keys, empty when no catalog is given.
+        """
+        members = sorted(self.get_members(list(catalog_ids)), key=len)
+
+        if not members:
+            return frozenset()
+
+        smallest, others = members[0], members[1:]
+        return frozenset(
+            self.course_keys[dense_id]
+            for dense_id in smallest
+            if all(dense_id in other for other in others)
+        )
+
+    def get_members(self, catalog_ids):
+        """
+        Return the members of catalogs, loading the missing ones together.
+
+        Args:
+            catalog_ids (list): The catalog ids.
+
+        Returns:
+            list[CatalogMembers]: The members of every catalog, in the given order.
+        """
+        self.refresh_if_due()
+        catalog_ids = [
+            FlexibleCatalogModel._meta.pk.to_python(catalog_id)  # pylint: disable=protected-access
+            for catalog_id in catalog_ids
+        ]
+        members = {catalog_id: self.catalogs.get(catalog_id) for catalog_id in catalog_ids}
+        missing_ids = [catalog_id for catalog_id, catalog_members in members.items() if catalog_members is None]
+
+        if missing_ids:
+            members.update(self.load(missing_ids))
+
+        return [members[catalog_id] for catalog_id in catalog_ids]
+
+    def load(self, catalog_ids):
+        """
+        Read and compile the members of catalogs, storing empty members for the missing ones.
+
+        Returns:
+            dict: The loaded members indexed by catalog id.
+        """
+        catalogs = list(FlexibleCatalogModel.objects.filter(pk__in=catalog_ids).select_subclasses())
+        course_keys = get_many_cached_course_keys(catalogs)
+        loaded = {}
+
+        with self.lock:
+            for course_key in {course_key for keys in course_keys.values() for course_key in keys}:
+                if course_key not in self.course_ids:
+                    self.course_ids[course_key] = len(self.course_keys)
+                    self.course_keys.append(course_key)
+
+            for catalog in catalogs:
+                dense_ids = [self.course_ids[course_key] for course_key in course_keys[catalog.pk]]
+                loaded[catalog.pk] = CatalogMembers(catalog.membership_version, dense_ids, len(self.course_keys))
+            for catalog_id in set(catalog_ids) - set(loaded):
+                loaded[catalog_id] = CatalogMembers(None, [], len(self.course_keys))
+            self.catalogs.update(loaded)
+
+        return loaded
+
+    def refresh_if_due(self):
+        """Drop the catalogs whose membership version changed, once every refresh interval."""
+        if time.monotonic() - self.checked_at >= self.get_refresh_interval():
+            self.refresh()
+
+    def refresh(self):
+        """Drop the catalogs whose membership version changed, reading every version in one query."""
+        versions = dict(FlexibleCatalogModel.objects.values_list('pk', 'membership_version'))
+
+        with self.lock:
+            for catalog_id, members in list(self.catalogs.items()):
+                if versions.get(catalog_id) != members.version:
+                    del self.catalogs[catalog_id]
+            self.checked_at = time.monotonic()
+
+    def invalidate(self, catalog_ids):
+        """Drop the given catalogs, so their next check reads them again."""
+        with self.lock:
+            for catalog_id in catalog_ids:
+                self.catalogs.pop(catalog_id, None)
+
+    def clear(self):
+        """Drop every catalog and course id."""
+        with self.lock:
+            self.course_ids, self.course_keys, self.catalogs = {}, [], {}
+
+    def memory_usage(self):
+        """
+        Report the size of the index.
+
+        Returns:
+            dict: The number of `catalogs`, of `courses` and of `bitsets`, and the
+                bytes used by the members (`membership_bytes`) and by the course
+                ids (`course_bytes`).
+        """
+        with self.lock:
+            members = list(self.catalogs.values())
+            course_bytes = sys.getsizeof(self.course_ids) + sys.getsizeof(self.course_keys) + sum(
+                sys.getsizeof(course_key) for course_key in self.course_keys
+            )
+
+        return {
+            'catalogs': len(members),
+            'courses': len(self.course_keys),
+            'bitsets': sum(member.bits is not None for member in members),
+            'membership_bytes': sum(member.nbytes for member in members),
+            'course_bytes': course_bytes,
+        }
+
+
+def get_membership_index():
+    """Return the membership index of the process, creating it on first use."""
+    global _index  # pylint: disable=global-statement
+
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = MembershipIndex()
+
+    return _index
+
+
+@receiver(membership_changed)
+@receiver(catalogs_invalidated)
+def invalidate_membership_index(sender, catalog_ids, **kwargs):  # pylint: disable=unused-argument
+    """Drop the bumped or invalidated catalogs from the membership index of the process, if it was created."""
+    if _index is not None:
+        _index.invalidate(catalog_ids)
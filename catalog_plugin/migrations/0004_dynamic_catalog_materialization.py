@@ -0,0 +1,31 @@
+# Generated by Django 3.2.17 on 2026-10-18 10:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('course_overviews', '0026_courseoverview_entrance_exam'),
+        ('catalog_plugin', '0003_flexiblecatalogmodel_membership_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dynamiccatalog',
+            name='materialized',
+            field=models.BooleanField(default=False, help_text='Store the matching courses in a table refreshed when course overviews change.'),
+        ),
+        migrations.CreateModel(
+            name='DynamicCatalogMembership',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('catalog', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='memberships', to='catalog_plugin.dynamiccatalog')),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dynamic_catalog_memberships', to='course_overviews.courseoverview')),
+            ],
+            options={
+                'unique_together': {('catalog', 'course')},
+            },
+        ),
+    ]
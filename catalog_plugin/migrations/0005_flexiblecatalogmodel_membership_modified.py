@@ -0,0 +1,18 @@
+# Generated by Django 3.2.17 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog_plugin', '0004_dynamic_catalog_materialization'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flexiblecatalogmodel',
+            name='membership_modified',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 3.2.17 on 2026-10-18 10:00
+
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def remove_duplicate_available_courses(apps, schema_editor):
+    """
+    Keep a single AvailableCourse per course overview.
+
+    The oldest row of every course is kept. It is marked as active when any of
+    its duplicates was, and it takes over the catalog memberships of the
+    duplicates before they are deleted.
+    """
+    AvailableCourse = apps.get_model('catalog_plugin', 'AvailableCourse')
+    CatalogCourses = apps.get_model('catalog_plugin', 'CatalogCourses')
+    through = CatalogCourses.courses.through
+    duplicated_courses = AvailableCourse.objects.values('course_id').annotate(
+        count=Count('id'),
+        kept_id=Min('id'),
+    ).filter(count__gt=1)
+
+    for row in duplicated_courses:
+        rows = AvailableCourse.objects.filter(course_id=row['course_id'])
+        duplicate_ids = list(rows.exclude(pk=row['kept_id']).values_list('pk', flat=True))
+        catalog_ids = set(
+            through.objects.filter(availablecourse_id__in=duplicate_ids).values_list('catalogcourses_id', flat=True),
+        )
+        catalog_ids -= set(
+            through.objects.filter(availablecourse_id=row['kept_id']).values_list('catalogcourses_id', flat=True),
+        )
+
+        through.objects.bulk_create([
+            through(catalogcourses_id=catalog_id, availablecourse_id=row['kept_id']) for catalog_id in catalog_ids
+        ])
+        if rows.filter(active=True).exists():
+            rows.filter(pk=row['kept_id']).update(active=True)
+        AvailableCourse.objects.filter(pk__in=duplicate_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog_plugin', '0005_flexiblecatalogmodel_membership_modified'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_available_courses, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 3.2.17 on 2026-10-18 10:00
+
+import logging
+
+from django.db import migrations, models
+
+logger = logging.getLogger(__name__)
+
+TRIGRAM_INDEXES = {
+    'cp_catalog_name_trgm_idx': 'name',
+    'cp_catalog_slug_trgm_idx': 'slug',
+}
+
+
+def create_trigram_indexes(apps, schema_editor):
+    """
+    Create trigram indexes for the `icontains` searches on PostgreSQL. Other databases are skipped.
+
+    Installing the pg_trgm extension needs privileges the application role
+    should not have, so it is a prerequisite left to the database administrator.
+    The indexes are skipped when the extension is not installed.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            logger.warning('The pg_trgm extension is not installed, skipping the catalog trigram indexes.')
+            return
+
+    FlexibleCatalogModel = apps.get_model('catalog_plugin', 'FlexibleCatalogModel')
+    table = schema_editor.quote_name(FlexibleCatalogModel._meta.db_table)
+    for index_name, column in TRIGRAM_INDEXES.items():
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {index_name} ON {table} '
+            f'USING gin (UPPER({schema_editor.quote_name(column)}) gin_trgm_ops)',
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    """Drop the trigram indexes on PostgreSQL."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    for index_name in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {index_name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog_plugin', '0006_remove_duplicate_available_courses'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='availablecourse',
+            constraint=models.UniqueConstraint(fields=('course',), name='cp_unique_available_course'),
+        ),
+        migrations.AddIndex(
+            model_name='availablecourse',
+            index=models.Index(fields=['course', 'active'], name='cp_avcourse_course_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='flexiblecatalogmodel',
+            index=models.Index(fields=['created', 'id'], name='cp_catalog_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='flexiblecatalogmodel',
+            index=models.Index(fields=['modified'], name='cp_catalog_modified_idx'),
+        ),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 3.2.17 on 2026-10-18 10:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog_plugin', '0007_catalog_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompositeCatalog',
+            fields=[
+                ('flexiblecatalogmodel_ptr', models.OneToOneField(auto_created=True, on_delete=django.db.models.deletion.CASCADE, parent_link=True, primary_key=True, serialize=False, to='catalog_plugin.flexiblecatalogmodel')),
+                ('operation', models.CharField(choices=[('union', 'Union'), ('intersection', 'Intersection'), ('difference', 'Difference')], default='union', max_length=16)),
+            ],
+            bases=('catalog_plugin.flexiblecatalogmodel',),
+        ),
+        migrations.CreateModel(
+            name='CompositeCatalogChild',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField(default=0)),
+                ('child', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='parent_links', to='catalog_plugin.flexiblecatalogmodel')),
+                ('composite', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='child_links', to='catalog_plugin.compositecatalog')),
+            ],
+            options={
+                'ordering': ['position', 'pk'],
+                'unique_together': {('composite', 'child')},
+            },
+        ),
+        migrations.AddField(
+            model_name='compositecatalog',
+            name='children',
+            field=models.ManyToManyField(blank=True, related_name='composite_parents', through='catalog_plugin.CompositeCatalogChild', through_fields=('composite', 'child'), to='catalog_plugin.FlexibleCatalogModel'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 3.2.17 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('catalog_plugin', '0008_compositecatalog'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flexiblecatalogmodel',
+            name='course_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='flexiblecatalogmodel',
+            name='active_course_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
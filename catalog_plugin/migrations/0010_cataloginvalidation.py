@@ -0,0 +1,22 @@
+# Generated by Django 3.2.17 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog_plugin', '0009_flexiblecatalogmodel_course_counts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogInvalidation',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('catalog_id', models.UUIDField()),
+                ('membership_version', models.PositiveIntegerField(null=True)),
+                ('created', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.2.17 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog_plugin', '0010_cataloginvalidation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MembershipEvent',
+            fields=[
+                ('seq', models.BigAutoField(primary_key=True, serialize=False)),
+                ('event', models.CharField(choices=[('course_added', 'Course added'), ('course_removed', 'Course removed'), ('catalog_created', 'Catalog created'), ('catalog_deleted', 'Catalog deleted'), ('catalog_renamed', 'Catalog renamed'), ('course_activated', 'Course activated'), ('course_deactivated', 'Course deactivated'), ('membership_changed', 'Membership changed')], max_length=32)),
+                ('catalog_id', models.UUIDField(null=True)),
+                ('course_id', models.CharField(max_length=255, null=True)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
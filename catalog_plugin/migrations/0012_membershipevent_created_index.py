@@ -0,0 +1,18 @@
+# Generated by Django 3.2.17 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog_plugin', '0011_membershipevent'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='membershipevent',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.17 on 2026-10-18 10:00
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog_plugin', '0012_membershipevent_created_index'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='availablecourse',
+            name='cp_avcourse_course_active_idx',
+        ),
+    ]
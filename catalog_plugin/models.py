@@ -1,13 +1,20 @@
 """Database ORM models managed by this plugin."""
-import json
+import operator
 import uuid
+from functools import reduce
 
 from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models import Exists, OuterRef
+from model_utils import FieldTracker
 from model_utils.managers import InheritanceManager
 from model_utils.models import TimeStampedModel
 
 from catalog_plugin.edxapp_wrapper.course_module import course_overview
+from catalog_plugin.instrumentation import instrument
+from catalog_plugin.query import cache_compiled_query, compile_query_string, get_compiled_query
+
+COMPOSITE_MAX_DEPTH = 4
 
 
 class AvailableCourse(models.Model):
@@ -22,6 +29,13 @@ class AvailableCourse(models.Model):
     course = models.ForeignKey(course_overview(), on_delete=models.CASCADE)
     active = models.BooleanField(default=True)
 
+    tracker = FieldTracker(fields=['active'])
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['course'], name='cp_unique_available_course'),
+        ]
+
     def __str__(self):
         """Available Courses object is represented according to the course and status.
 
@@ -45,18 +59,59 @@ class FlexibleCatalogModel(TimeStampedModel):
             (optional, blank=True)
         name (CharField): Human-readable name for the catalog entry.
             (max_length=255)
+        membership_version (PositiveIntegerField): Counter increased every time
+            the set of courses resolved by the catalog changes. Used to version
+            the cached membership of the catalog.
+        membership_modified (DateTimeField): When the membership version was
+            last increased. (null=True)
+        course_count (PositiveIntegerField): Number of courses resolved by the
+            catalog, updated with the membership version.
+        active_course_count (PositiveIntegerField): Number of those courses with
+            an active AvailableCourse, updated with the membership version.
     """
 
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)  # type: ignore
     slug = models.SlugField(unique=True, blank=True, max_length=255)  # type: ignore
     name = models.CharField(max_length=255, help_text='Human friendly')  # type: ignore
+    membership_version = models.PositiveIntegerField(default=0, editable=False)  # type: ignore
+    membership_modified = models.DateTimeField(null=True, editable=False)  # type: ignore
+    course_count = models.PositiveIntegerField(default=0, editable=False)  # type: ignore
+    active_course_count = models.PositiveIntegerField(default=0, editable=False)  # type: ignore
 
     objects = InheritanceManager()
+    name_tracker = FieldTracker(fields=['name'])
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created', 'id'], name='cp_catalog_created_id_idx'),
+            models.Index(fields=['modified'], name='cp_catalog_modified_idx'),
+        ]
 
     def get_courses(self):
         """Catalog class returns every AvailableCourse."""
         return AvailableCourse.objects.all()
 
+    def get_course_overviews(self):
+        """Return the course overviews of every AvailableCourse."""
+        return course_overview().objects.filter(availablecourse__isnull=False)
+
+    def get_course_key_values(self):
+        """Return a flat `values_list` of the course keys of every AvailableCourse."""
+        return AvailableCourse.objects.values_list('course_id', flat=True)
+
+    @instrument('models.{class_name}.get_course_keys')
+    def get_course_keys(self):
+        """
+        Return the course keys of the catalog in one query.
+
+        Only the course key column is read, without building model instances,
+        so this is much cheaper than `get_courses()` for membership checks.
+
+        Returns:
+            frozenset[str]: The course keys of the catalog.
+        """
+        return frozenset(str(course_key) for course_key in self.get_course_key_values())
+
     def __str__(self):
         """Get a string representation of this model instance."""
         return f'<FlexibleCatalogModel, ID: {self.id}>'
@@ -73,6 +128,17 @@ class FixedCatalog(FlexibleCatalogModel):
         """
         return self.course_runs.all()
 
+    def get_course_overviews(self):
+        """Return the associated course runs."""
+        return self.course_runs.all()
+
+    def get_course_key_values(self):
+        """Return a flat `values_list` of the associated course keys, read from the relation table alone."""
+        field = self._meta.get_field('course_runs')
+        return field.remote_field.through.objects.filter(
+            **{field.m2m_field_name(): self},
+        ).values_list(field.m2m_reverse_field_name(), flat=True)
+
     def __str__(self):
         return f'FixedCatalog: {self.id}'
 
@@ -103,6 +169,14 @@ class CatalogCourses(FlexibleCatalogModel):
         """Return the associated courses."""
         return self.courses.all()
 
+    def get_course_overviews(self):
+        """Return the course overviews of the associated courses."""
+        return course_overview().objects.filter(availablecourse__catalogcourses=self)
+
+    def get_course_key_values(self):
+        """Return a flat `values_list` of the course keys of the associated courses."""
+        return AvailableCourse.objects.filter(catalogcourses=self).values_list('course_id', flat=True)
+
     def __str__(self):
         """Get a string representation of this model instance."""
         return f'CatalogCourses: {self.id} - {self.name}'
@@ -118,6 +192,9 @@ class DynamicCatalog(FlexibleCatalogModel):
     Attributes:
         query_string (TextField): A JSON-formatted string containing filters
             for retrieving courses. (optional, blank=True, null=True)
+        materialized (BooleanField): Whether the matching courses are stored in
+            the `DynamicCatalogMembership` table instead of being filtered on
+            every read. (default=False)
     """
 
     query_string = models.TextField(  # type: ignore
@@ -125,20 +202,345 @@ class DynamicCatalog(FlexibleCatalogModel):
         blank=True,
         null=True,
     )
+    materialized = models.BooleanField(  # type: ignore
+        default=False,
+        help_text='Store the matching courses in a table refreshed when course overviews change.',
+    )
 
-    def get_courses(self):
-        """Filter courses dynamically based on the query_string."""
+    tracker = FieldTracker(fields=['query_string', 'materialized'])
+
+    def clean(self):
+        """Validate the query string, so invalid queries are reported in forms."""
+        super().clean()
+        if self.query_string:
+            try:
+                compile_query_string(self.query_string)
+            except ValidationError as error:
+                raise ValidationError({'query_string': error.messages}) from error
+
+    def save(self, *args, **kwargs):
+        """
+        Compile the query string before saving the catalog.
+
+        Raises:
+            ValidationError: If the query string is not valid.
+        """
+        compiled_query = compile_query_string(self.query_string) if self.query_string else None
+        super().save(*args, **kwargs)
+        if compiled_query:
+            cache_compiled_query(self, compiled_query)
+
+    def get_compiled_query(self):
+        """
+        Return the compiled query of the catalog.
+
+        Returns:
+            CompiledQuery or None: The compiled query, or None when no query string is defined.
+        """
+        return get_compiled_query(self) if self.query_string else None
+
+    def get_live_courses(self):
+        """Filter courses dynamically based on the compiled query_string."""
         if self.query_string:
             try:
-                # Dynamically filter CourseOverview using the query string as json
-                filter_params = json.loads(self.query_string)
-                if not isinstance(filter_params, dict):
-                    raise ValidationError('Query string must be a JSON object.')
-                return course_overview().objects.filter(**filter_params)
-            except Exception as e:
+                compiled_query = self.get_compiled_query()
+            except ValidationError as e:
                 raise ValueError(f'Invalid query_string: {e}') from e
+            return course_overview().objects.filter(compiled_query.q)
         return course_overview().objects.none()
 
+    def get_materialized_courses(self):
+        """Return the courses stored in the materialized membership table."""
+        return course_overview().objects.filter(dynamic_catalog_memberships__catalog=self)
+
+    def get_courses(self):
+        """Return the matching courses, from the membership table when the catalog is materialized."""
+        if self.materialized:
+            return self.get_materialized_courses()
+        return self.get_live_courses()
+
+    def get_course_overviews(self):
+        """Return the matching course overviews."""
+        return self.get_courses()
+
+    def get_course_key_values(self):
+        """Return a flat `values_list` of the matching course keys, from the membership table when materialized."""
+        if self.materialized:
+            return DynamicCatalogMembership.objects.filter(catalog=self).values_list('course_id', flat=True)
+        return self.get_live_courses().values_list('pk', flat=True)
+
     def __str__(self):
         """Get a string representation of this model instance."""
         return f'DynamicCatalog: {self.id}'
+
+
+class DynamicCatalogMembership(models.Model):
+    """
+    Represent a course matched by a materialized dynamic catalog.
+
+    Attributes:
+        catalog (ForeignKey): The materialized dynamic catalog.
+        course (ForeignKey): The course overview matched by the catalog query.
+    """
+
+    catalog = models.ForeignKey(DynamicCatalog, on_delete=models.CASCADE, related_name='memberships')
+    course = models.ForeignKey(
+        course_overview(),
+        on_delete=models.CASCADE,
+        related_name='dynamic_catalog_memberships',
+    )
+
+    class Meta:
+        unique_together = ('catalog', 'course')
+
+    def __str__(self):
+        """Get a string representation of this model instance."""
+        return f'{self.catalog_id} - {self.course_id}'
+
+
+class CompositeCatalog(FlexibleCatalogModel):
+    """
+    Represent a catalog built from other catalogs with a set operation.
+
+    The courses of the children are combined into a single condition over
+    CourseOverview, with one `EXISTS` subquery per child that is not itself a
+    composite, so the catalog is evaluated by the database in a single query.
+    Children are ordered by position: the difference keeps the courses of the
+    first child that are in none of the others.
+
+    Composite catalogs cannot contain themselves, directly or not, and can be
+    nested at most `COMPOSITE_MAX_DEPTH` levels deep. The membership version of a
+    composite catalog is bumped with the versions of its descendants.
+
+    Attributes:
+        operation (CharField): `union`, `intersection` or `difference`.
+        children (ManyToManyField): The combined catalogs, through `CompositeCatalogChild`.
+    """
+
+    UNION = 'union'
+    INTERSECTION = 'intersection'
+    DIFFERENCE = 'difference'
+    OPERATION_CHOICES = (
+        (UNION, 'Union'),
+        (INTERSECTION, 'Intersection'),
+        (DIFFERENCE, 'Difference'),
+    )
+
+    operation = models.CharField(max_length=16, choices=OPERATION_CHOICES, default=UNION)  # type: ignore
+    children = models.ManyToManyField(  # type: ignore
+        FlexibleCatalogModel,
+        through='CompositeCatalogChild',
+        through_fields=('composite', 'child'),
+        related_name='composite_parents',
+        blank=True,
+    )
+
+    tracker = FieldTracker(fields=['operation'])
+
+    def get_children(self):
+        """Return the child catalogs resolved to their subclasses, in position order."""
+        return FlexibleCatalogModel.objects.filter(parent_links__composite=self).order_by(
+            'parent_links__position',
+            'parent_links__pk',
+        ).select_subclasses()
+
+    def get_course_filter(self, ancestor_ids=frozenset()):
+        """
+        Return the condition over CourseOverview matching the courses of the catalog.
+
+        Args:
+            ancestor_ids (frozenset): Ids of the composite catalogs being evaluated
+                above this one, used to stop on cycles.
+
+        Returns:
+            Q or Exists or None: The condition, None when the catalog matches no course.
+
+        Raises:
+            ValidationError: If the catalog contains itself.
+        """
+        if self.pk in ancestor_ids:
+            raise ValidationError(f'Composite catalog {self.pk} contains itself.')
+
+        ancestor_ids = ancestor_ids | {self.pk}
+        conditions = [
+            child.get_course_filter(ancestor_ids) if isinstance(child, CompositeCatalog)
+            else Exists(child.get_course_overviews().filter(pk=OuterRef('pk')))
+            for child in self.get_children()
+        ]
+
+        if self.operation == self.INTERSECTION:
+            return reduce(operator.and_, conditions) if conditions and None not in conditions else None
+        if self.operation == self.DIFFERENCE:
+            if not conditions or conditions[0] is None:
+                return None
+            return reduce(lambda condition, other: condition & ~other, [
+                condition for condition in conditions if condition is not None
+            ])
+
+        conditions = [condition for condition in conditions if condition is not None]
+        return reduce(operator.or_, conditions) if conditions else None
+
+    def validate_children(self, child_ids):
+        """
+        Check that the given catalogs can be added as children.
+
+        Args:
+            child_ids (Iterable[uuid.UUID]): Ids of the catalogs to add.
+
+        Raises:
+            ValidationError: If a child contains this catalog, or the nesting
+                would be deeper than `COMPOSITE_MAX_DEPTH`.
+        """
+        level = set(CompositeCatalog.objects.filter(pk__in=set(child_ids)).values_list('pk', flat=True))
+        height = 0
+
+        while level and height <= COMPOSITE_MAX_DEPTH:
+            if self.pk in level:
+                raise ValidationError('A composite catalog cannot contain itself.')
+            height += 1
+            level = set(CompositeCatalogChild.objects.filter(
+                composite_id__in=level,
+                child__compositecatalog__isnull=False,
+            ).values_list('child_id', flat=True))
+
+        level, depth = {self.pk}, 1
+        while depth + height <= COMPOSITE_MAX_DEPTH:
+            level = set(CompositeCatalogChild.objects.filter(child_id__in=level).values_list('composite_id', flat=True))
+            if not level:
+                break
+            depth += 1
+
+        if depth + height > COMPOSITE_MAX_DEPTH:
+            raise ValidationError(f'Composite catalogs can be nested at most {COMPOSITE_MAX_DEPTH} levels deep.')
+
+    def get_courses(self):
+        """Return the course overviews matching the set operation over the children."""
+        course_filter = self.get_course_filter()
+        if course_filter is None:
+            return course_overview().objects.none()
+        return course_overview().objects.filter(course_filter)
+
+    def get_course_overviews(self):
+        """Return the matching course overviews."""
+        return self.get_courses()
+
+    def get_course_key_values(self):
+        """Return a flat `values_list` of the matching course keys."""
+        return self.get_courses().values_list('pk', flat=True)
+
+    def __str__(self):
+        """Get a string representation of this model instance."""
+        return f'CompositeCatalog: {self.id} - {self.operation}'
+
+
+class CompositeCatalogChild(models.Model):
+    """
+    Represent a catalog combined by a composite catalog.
+
+    Attributes:
+        composite (ForeignKey): The composite catalog.
+        child (ForeignKey): The combined catalog, of any type.
+        position (PositiveIntegerField): Order of the child in the composite catalog.
+    """
+
+    composite = models.ForeignKey(CompositeCatalog, on_delete=models.CASCADE, related_name='child_links')
+    child = models.ForeignKey(FlexibleCatalogModel, on_delete=models.CASCADE, related_name='parent_links')
+    position = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['position', 'pk']
+        unique_together = ('composite', 'child')
+
+    def clean(self):
+        """Reject children that would create a cycle or a too deep nesting."""
+        super().clean()
+        if self._state.adding and self.composite_id and self.child_id:
+            self.composite.validate_children([self.child_id])
+
+    def save(self, *args, **kwargs):
+        """
+        Check the new child before saving it.
+
+        Raises:
+            ValidationError: If the child would create a cycle or a too deep nesting.
+        """
+        if self._state.adding:
+            self.composite.validate_children([self.child_id])
+        super().save(*args, **kwargs)
+
+
+class CatalogInvalidation(models.Model):
+    """
+    Represent a catalog change published to every process by the database invalidation transport.
+
+    Rows are written in the transaction of the change, polled by every process
+    and deleted once they are older than `CP_INVALIDATION_RETENTION` seconds.
+
+    Attributes:
+        id (BigAutoField): Sequence number of the change.
+        catalog_id (UUIDField): Id of the changed catalog, kept once it is deleted.
+        membership_version (PositiveIntegerField): Membership version after the change,
+            null when the catalog was deleted.
+        created (DateTimeField): When the change was published.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    catalog_id = models.UUIDField()
+    membership_version = models.PositiveIntegerField(null=True)
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        """Get a string representation of this model instance."""
+        return f'{self.id} - {self.catalog_id} - {self.membership_version}'
+
+
+class MembershipEvent(models.Model):
+    """
+    Represent an entry of the append-only changelog of the catalog memberships.
+
+    Events are written in the transaction of the change and never updated, so
+    consumers can synchronize their copies by reading the events after the last
+    sequence number they applied. They are deleted once they are older than
+    `CP_MEMBERSHIP_EVENTS_RETENTION` seconds.
+
+    Catalogs whose courses are not stored, the live dynamic, composite and plain
+    catalogs, get a `membership_changed` event instead of one event per course,
+    after which their courses should be read again.
+
+    Attributes:
+        seq (BigAutoField): Monotonic sequence number of the event.
+        event (CharField): The kind of change, one of `EVENT_CHOICES`.
+        catalog_id (UUIDField): Id of the changed catalog, kept once it is deleted.
+            Null for course activation events.
+        course_id (CharField): Key of the added, removed, activated or deactivated course.
+        created (DateTimeField): When the event was recorded.
+    """
+
+    COURSE_ADDED = 'course_added'
+    COURSE_REMOVED = 'course_removed'
+    CATALOG_CREATED = 'catalog_created'
+    CATALOG_DELETED = 'catalog_deleted'
+    CATALOG_RENAMED = 'catalog_renamed'
+    COURSE_ACTIVATED = 'course_activated'
+    COURSE_DEACTIVATED = 'course_deactivated'
+    MEMBERSHIP_CHANGED = 'membership_changed'
+    EVENT_CHOICES = (
+        (COURSE_ADDED, 'Course added'),
+        (COURSE_REMOVED, 'Course removed'),
+        (CATALOG_CREATED, 'Catalog created'),
+        (CATALOG_DELETED, 'Catalog deleted'),
+        (CATALOG_RENAMED, 'Catalog renamed'),
+        (COURSE_ACTIVATED, 'Course activated'),
+        (COURSE_DEACTIVATED, 'Course deactivated'),
+        (MEMBERSHIP_CHANGED, 'Membership changed'),
+    )
+
+    seq = models.BigAutoField(primary_key=True)
+    event = models.CharField(max_length=32, choices=EVENT_CHOICES)  # type: ignore
+    catalog_id = models.UUIDField(null=True)  # type: ignore
+    course_id = models.CharField(max_length=255, null=True)  # type: ignore
+    created = models.DateTimeField(auto_now_add=True, db_index=True)  # type: ignore
+
+    def __str__(self):
+        """Get a string representation of this model instance."""
+        return f'{self.seq} - {self.event} - {self.catalog_id} - {self.course_id}'
@@ -0,0 +1,300 @@
+"""
+Compilation of the JSON query strings of dynamic catalogs.
+
+A query string is a JSON object. Each key is either a CourseOverview lookup,
+such as `org` or `start__gte`, or one of the `and`, `or` and `not` groups:
+
+    {
+        "org": "edX",
+        "or": [{"start__gte": "2024-01-01"}, {"display_name__icontains": "python"}],
+        "not": {"id__in": ["course-v1:edX+Retired+2020"]}
+    }
+
+Keys of the same object are combined with AND. The query is parsed once,
+validated against an allowlist of fields and lookups, normalized into a plan
+and compiled into a `Q` object, so reads never parse JSON again.
+
+Attributes:
+    ALLOWED_LOOKUPS (frozenset): Lookups a query can use on a field.
+    DEFAULT_PLAN_CACHE_SIZE (int): Compiled plans kept in memory when the
+        `CP_DYNAMIC_CATALOG_PLAN_CACHE_SIZE` setting is not defined.
+"""
+import json
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+from catalog_plugin.edxapp_wrapper.course_module import course_overview
+
+ALLOWED_LOOKUPS = frozenset([
+    'exact',
+    'iexact',
+    'in',
+    'contains',
+    'icontains',
+    'startswith',
+    'istartswith',
+    'endswith',
+    'iendswith',
+    'gt',
+    'gte',
+    'lt',
+    'lte',
+    'range',
+    'isnull',
+])
+TEXT_LOOKUPS = frozenset(['contains', 'icontains', 'startswith', 'istartswith', 'endswith', 'iendswith'])
+DEFAULT_PLAN_CACHE_SIZE = 1024
+
+_plan_cache = OrderedDict()  # type: ignore
+_plan_cache_lock = threading.Lock()
+
+
+class CompiledQuery:
+    """
+    Validated and normalized representation of a dynamic catalog query.
+
+    Attributes:
+        plan (tuple): Normalized plan. Nodes are `('lookup', field, lookup, value)`,
+            `('and', children)`, `('or', children)` or `('not', child)`.
+        q (Q): The plan compiled into a Q object over CourseOverview.
+        fields (frozenset): Names of the CourseOverview fields used by the query.
+    """
+
+    def __init__(self, plan):
+        """Compile the given normalized plan."""
+        self.plan = plan
+        self.q = _compile_node(plan)
+        self.fields = frozenset(_plan_fields(plan))
+
+    def __repr__(self):
+        """Get a string representation of this compiled query."""
+        return f'<CompiledQuery: {self.plan}>'
+
+
+def get_allowed_fields():
+    """
+    Return the CourseOverview fields a dynamic catalog query can filter on.
+
+    Defaults to every concrete, non-relational field of CourseOverview and can be
+    restricted with the `CP_DYNAMIC_CATALOG_ALLOWED_FIELDS` setting.
+
+    Returns:
+        dict: Field instances indexed by field name.
+    """
+    model_fields = {
+        field.name: field
+        for field in course_overview()._meta.get_fields()
+        if field.concrete and not field.is_relation
+    }
+    allowed_names = getattr(settings, 'CP_DYNAMIC_CATALOG_ALLOWED_FIELDS', None)
+
+    if allowed_names is None:
+        return model_fields
+
+    return {name: field for name, field in model_fields.items() if name in allowed_names}
+
+
+def parse_query_string(query_string):
+    """
+    Parse and validate a query string into a normalized plan.
+
+    Args:
+        query_string (str): A JSON object with the filters of the dynamic catalog.
+
+    Returns:
+        tuple: The normalized plan.
+
+    Raises:
+        ValidationError: If the query string is not valid JSON or uses a field,
+            a lookup or a value that is not allowed.
+    """
+    try:
+        query = json.loads(query_string)
+    except (TypeError, ValueError) as error:
+        raise ValidationError(f'Query string is not valid JSON: {error}') from error
+
+    if not isinstance(query, dict):
+        raise ValidationError('Query string must be a JSON object.')
+
+    return _parse_node(query, get_allowed_fields())
+
+
+def compile_query_string(query_string):
+    """
+    Parse, validate and compile a query string.
+
+    Args:
+        query_string (str): A JSON object with the filters of the dynamic catalog.
+
+    Returns:
+        CompiledQuery: The compiled query.
+
+    Raises:
+        ValidationError: If the query string is not valid.
+    """
+    return CompiledQuery(parse_query_string(query_string))
+
+
+def get_compiled_query(catalog):
+    """
+    Return the compiled query of a dynamic catalog, compiling it only once.
+
+    Compiled queries are kept in a bounded in-memory cache keyed by the catalog
+    id and its `modified` timestamp, which changes every time the catalog is saved.
+
+    Args:
+        catalog (DynamicCatalog): The dynamic catalog.
+
+    Returns:
+        CompiledQuery: The compiled query of the catalog.
+
+    Raises:
+        ValidationError: If the query string of the catalog is not valid.
+    """
+    cache_key = (catalog.pk, catalog.modified)
+
+    with _plan_cache_lock:
+        compiled_query = _plan_cache.get(cache_key)
+        if compiled_query is not None:
+            _plan_cache.move_to_end(cache_key)
+            return compiled_query
+
+    compiled_query = compile_query_string(catalog.query_string)
+    cache_compiled_query(catalog, compiled_query)
+
+    return compiled_query
+
+
+def cache_compiled_query(catalog, compiled_query):
+    """
+    Store the compiled query of a dynamic catalog in the in-memory cache.
+
+    Args:
+        catalog (DynamicCatalog): The dynamic catalog.
+        compiled_query (CompiledQuery): Its compiled query.
+    """
+    max_size = getattr(settings, 'CP_DYNAMIC_CATALOG_PLAN_CACHE_SIZE', DEFAULT_PLAN_CACHE_SIZE)
+
+    with _plan_cache_lock:
+        _plan_cache[(catalog.pk, catalog.modified)] = compiled_query
+        _plan_cache.move_to_end((catalog.pk, catalog.modified))
+        while len(_plan_cache) > max_size:
+            _plan_cache.popitem(last=False)
+
+
+def clear_compiled_queries():
+    """Drop every compiled query from the in-memory cache."""
+    with _plan_cache_lock:
+        _plan_cache.clear()
+
+
+def _parse_node(query, allowed_fields):
+    """Normalize a JSON object into an AND node of lookups and groups."""
+    children = []
+
+    for key, value in sorted(query.items()):
+        if key == 'and':
+            children.append(('and', _parse_group(key, value, allowed_fields)))
+        elif key == 'or':
+            children.append(('or', _parse_group(key, value, allowed_fields)))
+        elif key == 'not':
+            if not isinstance(value, dict) or not value:
+                raise ValidationError('"not" must contain a non-empty JSON object.')
+            children.append(('not', _parse_node(value, allowed_fields)))
+        else:
+            children.append(_parse_lookup(key, value, allowed_fields))
+
+    if len(children) == 1:
+        return children[0]
+
+    return ('and', tuple(children))
+
+
+def _parse_group(operator, value, allowed_fields):
+    """Normalize the list of JSON objects of an `and`/`or` group."""
+    if not isinstance(value, list) or not value or not all(isinstance(item, dict) for item in value):
+        raise ValidationError(f'"{operator}" must contain a non-empty list of JSON objects.')
+
+    return tuple(_parse_node(item, allowed_fields) for item in value)
+
+
+def _parse_lookup(key, value, allowed_fields):
+    """Validate a `field__lookup` key and clean its value."""
+    field_name, _, lookup = key.partition('__')
+    lookup = lookup or 'exact'
+
+    if field_name not in allowed_fields:
+        raise ValidationError(f'Filtering by "{field_name}" is not allowed.')
+
+    if lookup not in ALLOWED_LOOKUPS:
+        raise ValidationError(f'The lookup "{lookup}" is not allowed.')
+
+    field = allowed_fields[field_name]
+
+    if lookup == 'isnull':
+        if not isinstance(value, bool):
+            raise ValidationError(f'"{key}" must be a boolean.')
+        return ('lookup', field_name, lookup, value)
+
+    if lookup in ('in', 'range'):
+        if not isinstance(value, list):
+            raise ValidationError(f'"{key}" must be a list.')
+        if lookup == 'range' and len(value) != 2:
+            raise ValidationError(f'"{key}" must be a list of two values.')
+        return ('lookup', field_name, lookup, tuple(_clean_value(field, key, item) for item in value))
+
+    if lookup in TEXT_LOOKUPS:
+        if not isinstance(value, str):
+            raise ValidationError(f'"{key}" must be a string.')
+        return ('lookup', field_name, lookup, value)
+
+    return ('lookup', field_name, lookup, _clean_value(field, key, value))
+
+
+def _clean_value(field, key, value):
+    """Convert a JSON value into the python value expected by the field."""
+    if isinstance(value, (dict, list)):
+        raise ValidationError(f'"{key}" must be a scalar value.')
+
+    try:
+        return field.to_python(value)
+    except (ValidationError, TypeError, ValueError) as error:
+        raise ValidationError(f'Invalid value for "{key}": {value}.') from error
+
+
+def _compile_node(node):
+    """Compile a normalized plan node into a Q object."""
+    operator = node[0]
+
+    if operator == 'lookup':
+        _, field_name, lookup, value = node
+        return Q(**{f'{field_name}__{lookup}': value})
+
+    if operator == 'not':
+        return ~_compile_node(node[1])
+
+    compiled = Q()
+    for child in node[1]:
+        if operator == 'and':
+            compiled &= _compile_node(child)
+        else:
+            compiled |= _compile_node(child)
+
+    return compiled
+
+
+def _plan_fields(node):
+    """Yield the names of the fields used by a normalized plan node."""
+    operator = node[0]
+
+    if operator == 'lookup':
+        yield node[1]
+    elif operator == 'not':
+        yield from _plan_fields(node[1])
+    else:
+        for child in node[1]:
+            yield from _plan_fields(child)
@@ -28,3 +28,36 @@ def plugin_settings(settings: Any):  # pylint: disable=unused-argument
     """
     # Backends Settings
     settings.CP_COURSE_OLIVE_BACKEND = 'catalog_plugin.edxapp_wrapper.backends.course_module_o_v1'
+
+    # Membership cache settings
+    settings.CP_MEMBERSHIP_CACHE_ALIAS = 'default'
+    settings.CP_MEMBERSHIP_CACHE_TIMEOUT = 60 * 60
+    settings.CP_MEMBERSHIP_INDEX_REFRESH_INTERVAL = 30
+
+    # Invalidation broadcast settings. CP_INVALIDATION_TRANSPORT is left undefined, so the
+    # broadcast is off unless CP_INVALIDATION_REDIS_URL is defined, see catalog_plugin.invalidation.
+    settings.CP_INVALIDATION_POLL_INTERVAL = 5
+    settings.CP_INVALIDATION_RETENTION = 60 * 60
+
+    # Membership changelog settings
+    settings.CP_MEMBERSHIP_EVENTS_GAP_TIMEOUT = 60
+    settings.CP_MEMBERSHIP_EVENTS_RETENTION = 7 * 24 * 60 * 60
+
+    # Dynamic catalog settings
+    settings.CP_DYNAMIC_CATALOG_PLAN_CACHE_SIZE = 1024
+
+    # API settings
+    settings.CP_API_PAGE_SIZE = 100
+    settings.CP_API_MAX_PAGE_SIZE = 1000
+    settings.CP_EXPORT_COURSE_FIELDS = ['id', 'display_name', 'org', 'start', 'end']
+    settings.CP_EXPORT_CHUNK_SIZE = 2000
+
+    # Admin settings
+    settings.CP_ADMIN_MAX_COURSE_KEYS = 10
+
+    # Instrumentation settings
+    settings.CP_INSTRUMENTATION_ENABLED = False
+    settings.CP_INSTRUMENTATION_SINKS = ['catalog_plugin.instrumentation.LoggingSink']
+    settings.CP_INSTRUMENTATION_CACHE_ALIAS = 'default'
+    settings.CP_INSTRUMENTATION_FLUSH_INTERVAL = 60
+    settings.CP_INSTRUMENTATION_STATSD = {}
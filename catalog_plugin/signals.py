@@ -0,0 +1,279 @@
+"""Signal receivers that keep the catalog membership versions, changelog and identity map up to date."""
+from django.core.signals import request_finished, request_started
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from catalog_plugin.changelog import (
+    get_membership_pairs,
+    record_activation_events,
+    record_catalog_events,
+    record_course_events,
+    record_membership_events,
+)
+from catalog_plugin.edxapp_wrapper.course_module import course_overview
+from catalog_plugin.identity_map import activate_identity_map, clear_identity_map, deactivate_identity_map
+from catalog_plugin.invalidation import publish_invalidations
+from catalog_plugin.materialization import rebuild_catalog, refresh_course
+from catalog_plugin.membership import (
+    MEMBERSHIP_FIELDS,
+    bump_membership_versions,
+    get_live_catalog_ids_for_course,
+    get_plain_catalog_ids,
+    get_query_changes,
+    update_course_catalogs,
+)
+from catalog_plugin.models import (
+    AvailableCourse,
+    CatalogCourses,
+    CompositeCatalog,
+    CompositeCatalogChild,
+    DynamicCatalog,
+    FixedCatalog,
+    FlexibleCatalogModel,
+    MembershipEvent,
+)
+
+REMOVED_PAIRS_ATTR = '_catalog_plugin_removed_pairs'
+AFFECTED_CATALOG_IDS_ATTR = '_catalog_plugin_affected_catalog_ids'
+QUERY_CHANGES_ATTR = '_catalog_plugin_query_changes'
+
+
+def _handle_membership_change(instance, action, reverse, pk_set, catalog_model, field_name):
+    """
+    Bump the membership version of the catalogs affected by a m2m change and record it in the changelog.
+
+    The pairs about to be removed or cleared are read before the change, since
+    the `pk_set` of a removal also contains objects that were not related.
+
+    Args:
+        instance (Model): The instance whose relation was modified.
+        action (str): The m2m_changed action.
+        reverse (bool): Whether the relation was modified from the course side.
+        pk_set (set): Primary keys added or removed, None when clearing.
+        catalog_model (type): The catalog model that declares the relation.
+        field_name (str): The name of the many-to-many field in the catalog model.
+    """
+    relation = getattr(catalog_model, field_name)
+
+    if action in ('pre_remove', 'pre_clear'):
+        catalog_ids, target_ids = (pk_set, [instance.pk]) if reverse else ([instance.pk], pk_set)
+        setattr(instance, REMOVED_PAIRS_ATTR, get_membership_pairs(relation, catalog_ids, target_ids))
+        return
+
+    if action == 'post_add':
+        pairs = [(pk, instance.pk) if reverse else (instance.pk, pk) for pk in pk_set]
+        record_membership_events(relation, MembershipEvent.COURSE_ADDED, pairs)
+    elif action in ('post_remove', 'post_clear'):
+        pairs = getattr(instance, REMOVED_PAIRS_ATTR, [])
+        record_membership_events(relation, MembershipEvent.COURSE_REMOVED, pairs)
+    else:
+        return
+
+    if reverse:
+        bump_membership_versions(catalog_id for catalog_id, _ in pairs)
+    else:
+        bump_membership_versions([instance.pk])
+        instance.refresh_from_db(fields=MEMBERSHIP_FIELDS)
+
+
+@receiver(m2m_changed, sender=FixedCatalog.course_runs.through)
+def fixed_catalog_course_runs_changed(instance, action, reverse, pk_set, **kwargs):  # pylint: disable=unused-argument
+    """Invalidate the membership of the fixed catalogs whose course runs changed."""
+    _handle_membership_change(instance, action, reverse, pk_set, FixedCatalog, 'course_runs')
+
+
+@receiver(m2m_changed, sender=CatalogCourses.courses.through)
+def catalog_courses_courses_changed(instance, action, reverse, pk_set, **kwargs):  # pylint: disable=unused-argument
+    """Invalidate the membership of the catalog courses whose available courses changed."""
+    _handle_membership_change(instance, action, reverse, pk_set, CatalogCourses, 'courses')
+
+
+@receiver(post_save, sender=DynamicCatalog)
+def dynamic_catalog_saved(sender, instance, created, raw=False, **kwargs):  # pylint: disable=unused-argument
+    """
+    Invalidate a dynamic catalog whose query changed and rebuild its materialized membership.
+
+    Rebuilds bump the membership version themselves when courses are added or removed.
+    """
+    if created:
+        if raw:
+            return
+        if instance.materialized:
+            rebuild_catalog(instance)
+        elif instance.query_string:
+            bump_membership_versions([instance.pk])
+        instance.refresh_from_db(fields=MEMBERSHIP_FIELDS)
+        return
+
+    query_changed = instance.tracker.has_changed('query_string')
+    mode_changed = instance.tracker.has_changed('materialized')
+
+    if mode_changed or (query_changed and instance.materialized):
+        rebuild_catalog(instance)
+    elif query_changed:
+        bump_membership_versions([instance.pk])
+    if query_changed or mode_changed:
+        instance.refresh_from_db(fields=MEMBERSHIP_FIELDS)
+
+
+@receiver(m2m_changed, sender=CompositeCatalog.children.through)
+def composite_catalog_children_changed(instance, action, reverse, pk_set, **kwargs):  # pylint: disable=unused-argument
+    """
+    Validate the children added to composite catalogs and invalidate the composites.
+
+    Removals and clears delete the through rows one by one, so they are handled
+    by `composite_catalog_child_written`.
+    """
+    if action == 'pre_add':
+        if reverse:
+            for composite in CompositeCatalog.objects.filter(pk__in=pk_set):
+                composite.validate_children([instance.pk])
+        else:
+            instance.validate_children(pk_set)
+    elif action == 'post_add':
+        bump_membership_versions(pk_set if reverse else [instance.pk])
+        if not reverse:
+            instance.refresh_from_db(fields=MEMBERSHIP_FIELDS)
+
+
+@receiver(post_save, sender=CompositeCatalogChild)
+@receiver(post_delete, sender=CompositeCatalogChild)
+def composite_catalog_child_written(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Invalidate the composite catalog whose children changed."""
+    bump_membership_versions([instance.composite_id])
+
+
+@receiver(post_save, sender=CompositeCatalog)
+def composite_catalog_saved(sender, instance, created, **kwargs):  # pylint: disable=unused-argument
+    """Invalidate a composite catalog whose operation changed."""
+    if not created and instance.tracker.has_changed('operation'):
+        bump_membership_versions([instance.pk])
+        instance.refresh_from_db(fields=MEMBERSHIP_FIELDS)
+
+
+@receiver(post_save, sender=FlexibleCatalogModel)
+def plain_catalog_saved(sender, instance, created, raw=False, **kwargs):  # pylint: disable=unused-argument
+    """Count the courses of a new plain catalog, which contains every available course."""
+    if created and not raw:
+        bump_membership_versions([instance.pk])
+        instance.refresh_from_db(fields=MEMBERSHIP_FIELDS)
+
+
+@receiver(post_save, sender=AvailableCourse)
+def available_course_saved(sender, instance, created, **kwargs):  # pylint: disable=unused-argument
+    """
+    Update the catalogs affected by a new available course or by a change of its active flag.
+
+    Only the plain catalogs, which contain every available course, gain a course
+    when it is created. The other catalogs only get their course counts refreshed.
+    """
+    if created or instance.tracker.has_changed('active'):
+        update_course_catalogs([instance.course_id], get_plain_catalog_ids() if created else [])
+        if instance.active or not created:
+            record_activation_events([(instance.course_id, instance.active)])
+
+
+@receiver(pre_delete, sender=AvailableCourse)
+def available_course_deleting(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Remember the catalogs that lose an available course about to be deleted.
+
+    These are the plain catalogs and the catalog courses that contain it. The
+    course is recorded as removed from the catalog courses, and as deactivated
+    if it was active.
+    """
+    pairs = get_membership_pairs(CatalogCourses.courses, target_ids=[instance.pk])
+    setattr(instance, AFFECTED_CATALOG_IDS_ATTR, [*get_plain_catalog_ids(), *(catalog_id for catalog_id, _ in pairs)])
+    record_course_events(MembershipEvent.COURSE_REMOVED, [(catalog_id, instance.course_id) for catalog_id, _ in pairs])
+    if instance.active:
+        record_activation_events([(instance.course_id, False)])
+
+
+@receiver(post_delete, sender=AvailableCourse)
+def available_course_deleted(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Update the catalogs affected by a deleted available course, once it is gone from the counts."""
+    update_course_catalogs([instance.course_id], getattr(instance, AFFECTED_CATALOG_IDS_ATTR, []))
+
+
+@receiver(pre_save, sender=course_overview())
+def course_overview_saving(sender, instance, update_fields=None, **kwargs):  # pylint: disable=unused-argument
+    """Remember the dynamic catalogs whose queries use a field of the course overview that is about to change."""
+    setattr(instance, QUERY_CHANGES_ATTR, get_query_changes(instance, update_fields))
+
+
+@receiver(post_save, sender=course_overview())
+def course_overview_saved(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Update the dynamic catalogs that gained or lost the saved course.
+
+    Saves that change no field used by a dynamic catalog query touch no catalog.
+    Otherwise, only the live dynamic catalogs whose match of the course changed
+    are invalidated, and the materialized ones are refreshed for the course.
+    """
+    conditions, matched_ids, materialized_changed = getattr(instance, QUERY_CHANGES_ATTR, ({}, set(), True))
+
+    if conditions:
+        bump_membership_versions(matched_ids ^ get_live_catalog_ids_for_course(instance.pk, conditions))
+    if materialized_changed:
+        refresh_course(instance.pk)
+
+
+@receiver(pre_delete, sender=course_overview())
+def course_overview_deleting(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Remember the fixed and dynamic catalogs that contain a course about to be deleted.
+
+    The course is recorded as removed from the fixed and materialized dynamic catalogs that contain it.
+    """
+    catalog_ids = [
+        *instance.fixedcatalog_set.values_list('pk', flat=True),
+        *instance.dynamic_catalog_memberships.values_list('catalog_id', flat=True),
+    ]
+    record_course_events(MembershipEvent.COURSE_REMOVED, [(catalog_id, instance.pk) for catalog_id in catalog_ids])
+    setattr(instance, AFFECTED_CATALOG_IDS_ATTR, [*catalog_ids, *get_live_catalog_ids_for_course(instance.pk)])
+
+
+@receiver(post_delete, sender=course_overview())
+def course_overview_deleted(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Invalidate the catalogs that contained a deleted course, once it is gone from the counts."""
+    bump_membership_versions(getattr(instance, AFFECTED_CATALOG_IDS_ATTR, []))
+
+
+@receiver(request_started)
+def request_started_handler(sender, **kwargs):  # pylint: disable=unused-argument
+    """Start an empty catalog identity map for the request."""
+    activate_identity_map()
+
+
+@receiver(request_finished)
+def request_finished_handler(sender, **kwargs):  # pylint: disable=unused-argument
+    """Drop the catalog identity map of the request."""
+    deactivate_identity_map()
+
+
+@receiver([post_save, post_delete], sender=FlexibleCatalogModel)
+@receiver([post_save, post_delete], sender=FixedCatalog)
+@receiver([post_save, post_delete], sender=CatalogCourses)
+@receiver([post_save, post_delete], sender=DynamicCatalog)
+@receiver([post_save, post_delete], sender=CompositeCatalog)
+def catalog_written(sender, instance, created=False, raw=False, **kwargs):  # pylint: disable=unused-argument
+    """
+    Clear the catalog identity map when any catalog is saved or deleted.
+
+    The change is published to the other processes too, except for new catalogs
+    that no process can have cached yet. Creations, renames and deletions are
+    recorded in the changelog, deletions once for the parent FlexibleCatalogModel row.
+    """
+    clear_identity_map()
+    if raw:
+        return
+    if kwargs.get('signal') is post_delete:
+        publish_invalidations([(instance.pk, None)])
+        if sender is FlexibleCatalogModel:
+            record_catalog_events(MembershipEvent.CATALOG_DELETED, [instance.pk])
+    elif created:
+        record_catalog_events(MembershipEvent.CATALOG_CREATED, [instance.pk])
+    else:
+        publish_invalidations([(instance.pk, instance.membership_version)])
+        if instance.name_tracker.has_changed('name'):
+            record_catalog_events(MembershipEvent.CATALOG_RENAMED, [instance.pk])
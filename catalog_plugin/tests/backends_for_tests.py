@@ -1,15 +1,34 @@
 """This file contains all the necessary backends in a test scenario."""
+from django.contrib import admin
 from django.db import models
 
 
 class CourseOverviewTestModel(models.Model):
     """Test model to enable unit testing."""
 
+    id = models.CharField(max_length=255, primary_key=True)
+    display_name = models.TextField(null=True)
+    org = models.TextField(max_length=255, default='outdated_entry')
+    start = models.DateTimeField(null=True)
+    end = models.DateTimeField(null=True)
+
     class Meta:
         """Meta class."""
 
         app_label = 'catalog_plugin'
 
+    def __str__(self):
+        """Represent the course overview with its course key, as edx-platform does."""
+        return str(self.id)
+
+
+@admin.register(CourseOverviewTestModel)
+class CourseOverviewTestModelAdmin(admin.ModelAdmin):
+    """Stand-in for the edx-platform CourseOverview admin, with its `icontains` search."""
+
+    search_fields = ('id', 'display_name')
+    ordering = ('id',)
+
 
 def course_overview_backend():
     """Fake get_course_enrollment_model class."""
@@ -0,0 +1,7 @@
+"""
+Stand-in for the edx-platform `course_overviews` app, used to check the plugin migrations.
+
+The plugin migrations depend on `course_overviews.0026_courseoverview_entrance_exam`
+and point their foreign keys to `course_overviews.CourseOverview`, so this app
+provides both for `migration_settings` outside of an LMS.
+"""
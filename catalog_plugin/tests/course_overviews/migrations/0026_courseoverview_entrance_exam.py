@@ -0,0 +1,19 @@
+# Stand-in for the edx-platform migration the plugin migrations depend on.
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseOverview',
+            fields=[
+                ('id', models.CharField(max_length=255, primary_key=True, serialize=False)),
+            ],
+        ),
+    ]
@@ -0,0 +1,144 @@
+"""Tests for the `catalog_plugin` admin module."""
+import json
+
+from django.contrib import admin
+from django.contrib.admin.views.autocomplete import AutocompleteJsonView
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, override_settings
+
+from catalog_plugin.admin import CourseOverviewAutocompleteSelectMultiple, CourseOverviewAutocompleteView
+from catalog_plugin.models import AvailableCourse, CatalogCourses, DynamicCatalog, FixedCatalog, FlexibleCatalogModel
+from catalog_plugin.tests.backends_for_tests import CourseOverviewTestModel
+
+
+class TestCatalogChangelists(TestCase):
+    """Test the course keys column of the catalog changelists."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create(username='admin', is_staff=True, is_superuser=True)
+        self.courses = [
+            CourseOverviewTestModel.objects.create(id=f'course-v1:edX+C{index}+2024', org='edX')
+            for index in range(4)
+        ]
+        self.available_courses = AvailableCourse.objects.bulk_create(
+            AvailableCourse(course=course) for course in self.courses
+        )
+
+    def create_catalogs(self, count):
+        """Create catalogs of every type until there are `count` of each one."""
+        for index in range(FixedCatalog.objects.count(), count):
+            FixedCatalog.objects.create(name=f'Fixed {index}', slug=f'fixed-{index}').course_runs.add(*self.courses)
+            CatalogCourses.objects.create(name=f'Courses {index}', slug=f'courses-{index}').courses.add(
+                *self.available_courses[:2],
+            )
+            DynamicCatalog.objects.create(
+                name=f'Dynamic {index}',
+                slug=f'dynamic-{index}',
+                query_string=json.dumps({'org': 'edX'}),
+                materialized=bool(index % 2),
+            )
+
+    def render_course_keys(self, model):
+        """Build the changelist of a model and render the course keys column of every row."""
+        request = RequestFactory().get('/')
+        request.user = self.user
+        changelist = admin.site._registry[model].get_changelist_instance(request)  # pylint: disable=protected-access
+        return [changelist.model_admin.course_keys(catalog) for catalog in changelist.result_list]
+
+    def test_bounded_queries(self):
+        """The number of queries of a changelist does not depend on the number of catalogs."""
+        for count in (2, 10):
+            self.create_catalogs(count)
+            cache.clear()
+            with self.subTest(count=count), self.assertNumQueries(7):
+                rows = self.render_course_keys(FlexibleCatalogModel)
+
+            self.assertEqual(len(rows), count * 3)
+
+    @override_settings(CP_ADMIN_MAX_COURSE_KEYS=2)
+    def test_course_keys_are_capped(self):
+        """Only the first course keys are rendered, followed by the number of hidden ones."""
+        self.create_catalogs(1)
+        FixedCatalog.objects.create(name='Empty', slug='empty')
+
+        rows = self.render_course_keys(FixedCatalog)
+
+        self.assertEqual(
+            sorted(rows),
+            sorted([f'{self.courses[0].id}<br>{self.courses[1].id}<br>+2 more', 'No courses available']),
+        )
+
+
+class TestCourseAutocomplete(TestCase):
+    """Test the autocomplete of the courses of fixed catalogs and catalog courses."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create(username='admin', is_staff=True, is_superuser=True)
+        courses = CourseOverviewTestModel.objects.bulk_create(
+            CourseOverviewTestModel(id=f'course-v1:{org}+C{index}+2024', display_name=f'{org} {index}', org=org)
+            for org in ('edX', 'Other')
+            for index in range(30)
+        )
+        AvailableCourse.objects.bulk_create(AvailableCourse(course=course) for course in courses)
+
+    def autocomplete(self, model, field_name, term):
+        """Return the JSON results of the admin autocomplete of a catalog relation."""
+        request = RequestFactory().get('/', {
+            'app_label': 'catalog_plugin',
+            'model_name': model._meta.model_name,
+            'field_name': field_name,
+            'term': term,
+        })
+        request.user = self.user
+        if model is FixedCatalog:
+            view = CourseOverviewAutocompleteView.as_view(
+                admin_site=admin.site,
+                source_admin=admin.site._registry[FixedCatalog],  # pylint: disable=protected-access
+            )
+        else:
+            view = AutocompleteJsonView.as_view(admin_site=admin.site)
+        return json.loads(view(request).content)
+
+    def test_admin_checks(self):
+        """The catalog admins pass the checks of their autocomplete fields."""
+        for model in (FixedCatalog, CatalogCourses):
+            with self.subTest(model=model.__name__):
+                self.assertEqual(admin.site._registry[model].check(), [])  # pylint: disable=protected-access
+
+    def test_course_runs_widget(self):
+        """The course runs of the fixed catalogs use the plugin autocomplete, not the CourseOverview admin search."""
+        model_admin = admin.site._registry[FixedCatalog]  # pylint: disable=protected-access
+        request = RequestFactory().get('/')
+        request.user = self.user
+
+        field = model_admin.formfield_for_dbfield(FixedCatalog._meta.get_field('course_runs'), request)
+
+        self.assertIsInstance(field.widget.widget, CourseOverviewAutocompleteSelectMultiple)
+
+    def test_course_key_prefix_search(self):
+        """The course runs are searched by prefix of their course key, with or without `course-v1:`."""
+        for term in ('course-v1:Other+C1', 'Other+C1'):
+            with self.subTest(term=term), self.assertNumQueries(2):
+                results = self.autocomplete(FixedCatalog, 'course_runs', term)
+                self.assertEqual(len(results['results']), 11)
+                self.assertFalse(results['pagination']['more'])
+
+        results = self.autocomplete(FixedCatalog, 'course_runs', 'edx')
+        self.assertEqual(len(results['results']), 20)
+        self.assertTrue(results['pagination']['more'])
+        self.assertFalse(self.autocomplete(FixedCatalog, 'course_runs', 'C1')['results'])
+        self.assertFalse(self.autocomplete(FixedCatalog, 'course_runs', 'edX 1')['results'])
+
+    def test_available_course_prefix_search(self):
+        """The available courses are searched by prefix of their course key or name, one page at a time."""
+        with self.assertNumQueries(2):
+            by_key = self.autocomplete(CatalogCourses, 'courses', 'course-v1:Other+C1')
+        self.assertEqual(len(by_key['results']), 11)
+        self.assertFalse(by_key['pagination']['more'])
+
+        by_name = self.autocomplete(CatalogCourses, 'courses', 'edx')
+        self.assertEqual(len(by_name['results']), 20)
+        self.assertTrue(by_name['pagination']['more'])
+        self.assertFalse(self.autocomplete(CatalogCourses, 'courses', 'C1')['results'])
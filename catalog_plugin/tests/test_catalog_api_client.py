@@ -0,0 +1,379 @@
+"""Tests for the `catalog_plugin` API client module."""
+import asyncio
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.core.signals import request_finished, request_started
+from django.db import IntegrityError, transaction
+from django.test import TestCase
+from opaque_keys.edx.keys import CourseKey
+
+from catalog_plugin.api.catalog_api_client import (
+    AvailableCourseAPIClient,
+    CatalogCoursesAPIClient,
+    FixedCatalogAPIClient,
+    FlexibleCatalogAPIClient,
+)
+from catalog_plugin.identity_map import catalog_identity_map
+from catalog_plugin.models import AvailableCourse, CatalogCourses, FixedCatalog, FlexibleCatalogModel
+from catalog_plugin.tests.backends_for_tests import CourseOverviewTestModel
+
+COURSE_KEYS = [CourseKey.from_string(f'course-v1:edX+C{index}+2024') for index in range(4)]
+
+
+class TestAvailableCourseAPIClient(TestCase):
+    """Test the AvailableCourse API client."""
+
+    def setUp(self):
+        for course_key in COURSE_KEYS[:3]:
+            CourseOverviewTestModel.objects.create(id=str(course_key))
+        self.active_course = AvailableCourse.objects.create(course_id=str(COURSE_KEYS[0]), active=True)
+        self.inactive_course = AvailableCourse.objects.create(course_id=str(COURSE_KEYS[1]), active=False)
+
+    def test_bulk_upsert_reports_every_key(self):
+        """Every course ID is reported as created, updated, unchanged or missing."""
+        results = AvailableCourseAPIClient.bulk_upsert_available_courses([
+            (COURSE_KEYS[0], True),
+            (COURSE_KEYS[1], True),
+            (COURSE_KEYS[2], False),
+            (COURSE_KEYS[3], True),
+        ])
+
+        self.assertEqual(results, {
+            'created': [COURSE_KEYS[2]],
+            'updated': [COURSE_KEYS[1]],
+            'unchanged': [COURSE_KEYS[0]],
+            'missing': [COURSE_KEYS[3]],
+        })
+        self.inactive_course.refresh_from_db()
+        self.assertTrue(self.inactive_course.active)
+        self.assertFalse(AvailableCourse.objects.get(course_id=str(COURSE_KEYS[2])).active)
+
+    def test_bulk_upsert_concurrent_creation(self):
+        """A course created by a concurrent upsert before the insert is updated instead of failing."""
+        bulk_create = AvailableCourse.objects.bulk_create
+
+        def create_concurrently(objs, **kwargs):
+            AvailableCourse.objects.create(course_id=str(COURSE_KEYS[2]), active=True)
+            return bulk_create(objs, **kwargs)
+
+        with mock.patch.object(AvailableCourse.objects, 'bulk_create', side_effect=create_concurrently):
+            results = AvailableCourseAPIClient.bulk_upsert_available_courses([(COURSE_KEYS[2], False)])
+
+        self.assertEqual(results['updated'], [COURSE_KEYS[2]])
+        self.assertFalse(results['created'])
+        self.assertFalse(AvailableCourse.objects.get(course_id=str(COURSE_KEYS[2])).active)
+
+    def test_bulk_upsert_flips_both_ways_in_one_update(self):
+        """Activations and deactivations are applied by the same statement."""
+        # Overviews, available courses, savepoint, update, catalogs to count, live catalogs, changelog and release.
+        with self.assertNumQueries(8):
+            AvailableCourseAPIClient.bulk_upsert_available_courses([(COURSE_KEYS[0], False), (COURSE_KEYS[1], True)])
+
+        self.active_course.refresh_from_db()
+        self.inactive_course.refresh_from_db()
+        self.assertFalse(self.active_course.active)
+        self.assertTrue(self.inactive_course.active)
+
+    def test_bulk_upsert_counts_containing_catalogs(self):
+        """Catalogs containing an updated course get their counts refreshed, keeping their membership version."""
+        catalog = CatalogCourses.objects.create(name='Courses', slug='courses')
+        catalog.courses.add(self.active_course)
+        catalog.refresh_from_db()
+        version = catalog.membership_version
+
+        with self.captureOnCommitCallbacks(execute=True):
+            AvailableCourseAPIClient.bulk_upsert_available_courses([(COURSE_KEYS[0], False)])
+
+        catalog.refresh_from_db()
+        self.assertEqual(catalog.membership_version, version)
+        self.assertEqual((catalog.course_count, catalog.active_course_count), (1, 0))
+
+    def test_one_available_course_per_course(self):
+        """A course overview cannot have two available courses."""
+        self.assertEqual(AvailableCourseAPIClient(COURSE_KEYS[0]).create_available_course(), self.active_course)
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            AvailableCourse.objects.create(course_id=str(COURSE_KEYS[0]))
+
+    def test_bulk_upsert_validates_course_ids(self):
+        """Course IDs must be CourseKey instances."""
+        with self.assertRaises(TypeError):
+            AvailableCourseAPIClient.bulk_upsert_available_courses([(str(COURSE_KEYS[0]), True)])
+
+
+class TestFlexibleCatalogAPIClient(TestCase):
+    """Test the FlexibleCatalog API client."""
+
+    def test_get_catalog_ids_for_courses(self):
+        """The catalog ids are indexed by the requested course keys."""
+        CourseOverviewTestModel.objects.create(id=str(COURSE_KEYS[0]))
+        catalog = FixedCatalog.objects.create(name='Fixed', slug='fixed')
+        catalog.course_runs.add(str(COURSE_KEYS[0]))
+
+        self.assertEqual(
+            FlexibleCatalogAPIClient.get_catalog_ids_for_courses(COURSE_KEYS[:2]),
+            {COURSE_KEYS[0]: [catalog.pk], COURSE_KEYS[1]: []},
+        )
+
+    def test_get_catalog_ids_for_courses_validates_course_ids(self):
+        """Course IDs must be CourseKey instances."""
+        with self.assertRaises(TypeError):
+            FlexibleCatalogAPIClient.get_catalog_ids_for_courses([str(COURSE_KEYS[0])])
+
+    def test_get_course_keys_reads_the_membership_cache(self):
+        """The course keys are resolved once and read from the cache until the membership changes."""
+        cache.clear()
+        CourseOverviewTestModel.objects.create(id=str(COURSE_KEYS[0]))
+        CourseOverviewTestModel.objects.create(id=str(COURSE_KEYS[1]))
+        catalog = FixedCatalog.objects.create(name='Fixed', slug='fixed')
+        catalog.course_runs.add(str(COURSE_KEYS[0]))
+        client = FlexibleCatalogAPIClient(catalog_slug='fixed')
+
+        self.assertEqual(client.get_course_keys(), [str(COURSE_KEYS[0])])
+        with self.assertNumQueries(1):
+            self.assertEqual(client.get_course_keys(), [str(COURSE_KEYS[0])])
+
+        catalog.course_runs.add(str(COURSE_KEYS[1]))
+
+        self.assertEqual(client.get_course_keys(), [str(COURSE_KEYS[0]), str(COURSE_KEYS[1])])
+        self.assertEqual(FlexibleCatalogAPIClient(catalog_slug='missing').get_course_keys(), [])
+
+    def test_lookups_are_memoized_in_the_identity_map(self):
+        """Clients of the same catalog share one instance and every lookup runs at most once."""
+        catalog = FixedCatalog.objects.create(name='Fixed', slug='fixed')
+
+        with catalog_identity_map():
+            with self.assertNumQueries(2):
+                first = FlexibleCatalogAPIClient(catalog_slug='fixed').get_flexible_catalog()
+                second = FlexibleCatalogAPIClient(catalog_slug='fixed').get_flexible_catalog()
+                by_uuid = FlexibleCatalogAPIClient(catalog_uuid=catalog.pk).get_flexible_catalog()
+                missing = FlexibleCatalogAPIClient(catalog_slug='missing').get_flexible_catalog()
+                FlexibleCatalogAPIClient(catalog_slug='missing').get_flexible_catalog()
+
+        self.assertIsInstance(first, FixedCatalog)
+        self.assertIs(first, second)
+        self.assertIs(first, by_uuid)
+        self.assertFalse(missing)
+
+    def test_writes_clear_the_identity_map(self):
+        """Saving or deleting a catalog invalidates the memoized lookups."""
+        FlexibleCatalogModel.objects.create(name='Plain', slug='plain')
+        client = FlexibleCatalogAPIClient(catalog_slug='plain')
+
+        with catalog_identity_map():
+            client.update_flexible_catalog(name='Renamed')
+
+            with self.assertNumQueries(1):
+                self.assertEqual(client.get_flexible_catalog().name, 'Renamed')
+
+            client.delete_flexible_catalog()
+
+            self.assertFalse(client.get_flexible_catalog())
+
+    def test_identity_map_is_request_scoped(self):
+        """Lookups are only memoized between the start and the end of a request."""
+        FlexibleCatalogModel.objects.create(name='Plain', slug='plain')
+        client = FlexibleCatalogAPIClient(catalog_slug='plain')
+
+        with self.assertNumQueries(2):
+            client.get_flexible_catalog()
+            client.get_flexible_catalog()
+
+        request_started.send(sender=self.__class__)
+        try:
+            with self.assertNumQueries(1):
+                client.get_flexible_catalog()
+                client.get_flexible_catalog()
+        finally:
+            request_finished.send(sender=self.__class__)
+
+        with self.assertNumQueries(1):
+            client.get_flexible_catalog()
+
+
+class TestAsyncLookups(TestCase):
+    """Test the async counterparts of the API client lookups."""
+
+    def setUp(self):
+        cache.clear()
+        for course_key in COURSE_KEYS:
+            CourseOverviewTestModel.objects.create(id=str(course_key))
+        AvailableCourse.objects.create(course_id=str(COURSE_KEYS[0]))
+        self.catalogs = [
+            FixedCatalog.objects.create(name=f'Fixed {index}', slug=f'fixed-{index}') for index in range(5)
+        ]
+        self.catalogs[0].course_runs.add(str(COURSE_KEYS[0]), str(COURSE_KEYS[1]))
+
+    def test_gathered_lookups_share_one_query(self):
+        """Catalog lookups awaited together are fetched with a single query."""
+        async def lookup():
+            clients = [FlexibleCatalogAPIClient(catalog_uuid=catalog.pk) for catalog in self.catalogs]
+            clients += [FlexibleCatalogAPIClient(catalog_slug='fixed-1'), FlexibleCatalogAPIClient(catalog_slug='none')]
+            return await asyncio.gather(*(client.aget_flexible_catalog() for client in clients))
+
+        with self.assertNumQueries(1):
+            catalogs = async_to_sync(lookup)()
+
+        self.assertEqual(catalogs[:5], self.catalogs)
+        self.assertIsInstance(catalogs[0], FixedCatalog)
+        self.assertEqual(catalogs[5], self.catalogs[1])
+        self.assertFalse(catalogs[6])
+
+    def test_identity_map_hits_run_no_query(self):
+        """Catalogs already in the identity map are returned without a query."""
+        client = FlexibleCatalogAPIClient(catalog_slug='fixed-0')
+
+        with catalog_identity_map():
+            catalog = client.get_flexible_catalog()
+            with self.assertNumQueries(0):
+                self.assertIs(async_to_sync(client.aget_flexible_catalog)(), catalog)
+
+    def test_courses_and_membership_checks(self):
+        """The course keys, catalogs of courses and available courses match the sync lookups."""
+        client = FlexibleCatalogAPIClient(catalog_uuid=self.catalogs[0].pk)
+
+        self.assertEqual(async_to_sync(client.aget_course_keys)(), client.get_course_keys())
+        self.assertEqual(async_to_sync(client.aget_courses)(), [str(COURSE_KEYS[0]), str(COURSE_KEYS[1])])
+        self.assertEqual(
+            async_to_sync(FlexibleCatalogAPIClient.aget_catalog_ids_for_courses)(COURSE_KEYS[:2]),
+            FlexibleCatalogAPIClient.get_catalog_ids_for_courses(COURSE_KEYS[:2]),
+        )
+        self.assertEqual(
+            async_to_sync(AvailableCourseAPIClient(COURSE_KEYS[0]).aget_available_course)().course_id,
+            str(COURSE_KEYS[0]),
+        )
+        self.assertFalse(async_to_sync(AvailableCourseAPIClient(COURSE_KEYS[1]).aget_available_course)())
+
+
+class TestFixedCatalogAPIClient(TestCase):
+    """Test the FixedCatalog API client."""
+
+    def setUp(self):
+        self.courses = [CourseOverviewTestModel.objects.create(id=str(course_key)) for course_key in COURSE_KEYS]
+        self.catalogs = [
+            FixedCatalog.objects.create(name=f'Fixed {index}', slug=f'fixed-{index}') for index in range(3)
+        ]
+
+    def course_run_ids(self, catalog):
+        """Return the course run ids of a fixed catalog."""
+        return set(catalog.course_runs.values_list('id', flat=True))
+
+    def test_add_and_remove_courses(self):
+        """Course runs are added and removed from a single catalog."""
+        client = FixedCatalogAPIClient(self.catalogs[0].pk)
+
+        client.add_courses_to_fixed_catalog(COURSE_KEYS[:2])
+        self.assertEqual(self.course_run_ids(self.catalogs[0]), {str(key) for key in COURSE_KEYS[:2]})
+
+        client.remove_courses_from_fixed_catalog(COURSE_KEYS[:1])
+        self.assertEqual(self.course_run_ids(self.catalogs[0]), {str(COURSE_KEYS[1])})
+
+    def test_bulk_add(self):
+        """The same course runs are added to many catalogs, skipping existing memberships."""
+        self.catalogs[0].course_runs.add(self.courses[0])
+
+        results = FixedCatalogAPIClient.bulk_update_course_runs(
+            [catalog.pk for catalog in self.catalogs],
+            COURSE_KEYS[:2],
+        )
+
+        self.assertEqual(results[self.catalogs[0].pk], {'added': 1, 'removed': 0})
+        self.assertEqual(results[self.catalogs[1].pk], {'added': 2, 'removed': 0})
+        for catalog in self.catalogs:
+            self.assertEqual(self.course_run_ids(catalog), {str(key) for key in COURSE_KEYS[:2]})
+
+    def test_bulk_remove(self):
+        """The given course runs are removed from many catalogs."""
+        for catalog in self.catalogs[:2]:
+            catalog.course_runs.add(*self.courses)
+
+        results = FixedCatalogAPIClient.bulk_update_course_runs(
+            [str(catalog.pk) for catalog in self.catalogs],
+            COURSE_KEYS[:3],
+            action='remove',
+        )
+
+        self.assertEqual(results[self.catalogs[0].pk], {'added': 0, 'removed': 3})
+        self.assertEqual(results[self.catalogs[2].pk], {'added': 0, 'removed': 0})
+        self.assertEqual(self.course_run_ids(self.catalogs[1]), {str(COURSE_KEYS[3])})
+
+    def test_bulk_replace(self):
+        """The course runs of many catalogs are replaced by the given ones."""
+        self.catalogs[0].course_runs.add(self.courses[0], self.courses[1])
+
+        results = FixedCatalogAPIClient.bulk_update_course_runs(
+            [self.catalogs[0].pk, self.catalogs[1].pk],
+            COURSE_KEYS[1:3],
+            action='replace',
+        )
+
+        self.assertEqual(results[self.catalogs[0].pk], {'added': 1, 'removed': 1})
+        self.assertEqual(results[self.catalogs[1].pk], {'added': 2, 'removed': 0})
+        self.assertEqual(self.course_run_ids(self.catalogs[0]), {str(key) for key in COURSE_KEYS[1:3]})
+
+    def test_bulk_update_is_constant_in_queries(self):
+        """The number of queries does not depend on the number of catalogs or courses."""
+        catalog_ids = [catalog.pk for catalog in self.catalogs]
+
+        # Catalogs, courses, savepoint, existing pairs, insert, changelog, catalogs
+        # to bump, version bump and release. The course counts are refreshed after
+        # the commit.
+        with self.assertNumQueries(9):
+            FixedCatalogAPIClient.bulk_update_course_runs(catalog_ids, COURSE_KEYS)
+
+    def test_bulk_update_bumps_membership_version(self):
+        """Bulk writes invalidate the membership cache of the modified catalogs only."""
+        FixedCatalogAPIClient.bulk_update_course_runs([self.catalogs[0].pk], COURSE_KEYS[:1])
+
+        self.catalogs[0].refresh_from_db()
+        self.catalogs[1].refresh_from_db()
+        self.assertEqual(self.catalogs[0].membership_version, 1)
+        self.assertEqual(self.catalogs[1].membership_version, 0)
+
+    def test_bulk_update_invalid_action(self):
+        """Unknown actions are rejected."""
+        with self.assertRaises(ValueError):
+            FixedCatalogAPIClient.bulk_update_course_runs([self.catalogs[0].pk], COURSE_KEYS, action='merge')
+
+
+class TestCatalogCoursesAPIClient(TestCase):
+    """Test the CatalogCourses API client."""
+
+    def setUp(self):
+        self.available_courses = [
+            AvailableCourse.objects.create(course=CourseOverviewTestModel.objects.create(id=str(course_key)))
+            for course_key in COURSE_KEYS
+        ]
+        self.available_courses[3].active = False
+        self.available_courses[3].save()
+        self.catalogs = [
+            CatalogCourses.objects.create(name=f'Courses {index}', slug=f'courses-{index}') for index in range(2)
+        ]
+
+    def test_add_and_remove_courses(self):
+        """Active courses are added and removed from a single catalog."""
+        client = CatalogCoursesAPIClient(self.catalogs[0].pk)
+
+        client.add_courses_to_catalog(COURSE_KEYS)
+        self.assertEqual(set(self.catalogs[0].courses.all()), set(self.available_courses[:3]))
+
+        client.remove_courses_from_catalog(COURSE_KEYS[:2])
+        self.assertEqual(list(self.catalogs[0].courses.all()), [self.available_courses[2]])
+
+    def test_bulk_add_only_active_courses(self):
+        """Bulk additions skip inactive courses."""
+        results = CatalogCoursesAPIClient.bulk_update_courses([catalog.pk for catalog in self.catalogs], COURSE_KEYS)
+
+        for catalog in self.catalogs:
+            self.assertEqual(results[catalog.pk], {'added': 3, 'removed': 0})
+            self.assertEqual(set(catalog.courses.all()), set(self.available_courses[:3]))
+
+    def test_bulk_update_ignores_unknown_catalogs(self):
+        """Ids that do not match a catalog are left out of the results."""
+        fixed_catalog = FixedCatalog.objects.create(name='Fixed', slug='fixed')
+
+        results = CatalogCoursesAPIClient.bulk_update_courses([self.catalogs[0].pk, fixed_catalog.pk], COURSE_KEYS)
+
+        self.assertEqual(list(results), [self.catalogs[0].pk])
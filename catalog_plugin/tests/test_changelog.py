@@ -0,0 +1,184 @@
+"""Tests for the `catalog_plugin` changelog module."""
+import json
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from opaque_keys.edx.keys import CourseKey
+
+from catalog_plugin.api.catalog_api_client import (
+    AvailableCourseAPIClient,
+    CatalogCoursesAPIClient,
+    FixedCatalogAPIClient,
+    FlexibleCatalogAPIClient,
+)
+from catalog_plugin.changelog import get_events, get_resync_seq, prune_events
+from catalog_plugin.models import AvailableCourse, CatalogCourses, DynamicCatalog, FixedCatalog, MembershipEvent
+from catalog_plugin.tests.backends_for_tests import CourseOverviewTestModel
+
+
+class TestMembershipChangelog(TestCase):
+    """Test the events recorded for every membership change."""
+
+    def setUp(self):
+        self.courses = [
+            CourseOverviewTestModel.objects.create(id=f'course-v1:edX+C{index}+2024', org='edX')
+            for index in range(3)
+        ]
+        self.available_courses = AvailableCourse.objects.bulk_create(
+            AvailableCourse(course=course) for course in self.courses
+        )
+        self.fixed_catalog = FixedCatalog.objects.create(name='Fixed', slug='fixed')
+        self.catalog_courses = CatalogCourses.objects.create(name='Courses', slug='courses')
+        self.last_seq = self.get_last_seq()
+
+    @staticmethod
+    def get_last_seq():
+        """Return the sequence number of the last recorded event."""
+        last_event = MembershipEvent.objects.order_by('seq').last()
+        return last_event.seq if last_event else 0
+
+    def read_events(self):
+        """Return the events recorded since the last read as (event, catalog id, course key) tuples."""
+        events = get_events(self.last_seq, 1000)
+        self.last_seq = events[-1].seq if events else self.last_seq
+        return [(event.event, event.catalog_id, event.course_id) for event in events]
+
+    def test_many_to_many_changes(self):
+        """Additions, removals and clears are recorded from both sides of the relations, once per course."""
+        fixed_id, courses_id = self.fixed_catalog.pk, self.catalog_courses.pk
+        course_ids = [course.id for course in self.courses]
+
+        self.fixed_catalog.course_runs.add(*self.courses[:2])
+        self.fixed_catalog.course_runs.add(self.courses[0])
+        self.courses[2].fixedcatalog_set.add(self.fixed_catalog)
+        self.catalog_courses.courses.add(self.available_courses[1])
+        self.assertCountEqual(self.read_events(), [
+            (MembershipEvent.COURSE_ADDED, fixed_id, course_ids[0]),
+            (MembershipEvent.COURSE_ADDED, fixed_id, course_ids[1]),
+            (MembershipEvent.COURSE_ADDED, fixed_id, course_ids[2]),
+            (MembershipEvent.COURSE_ADDED, courses_id, course_ids[1]),
+        ])
+
+        self.fixed_catalog.course_runs.remove(self.courses[0])
+        self.fixed_catalog.course_runs.remove(self.courses[0])
+        self.courses[1].fixedcatalog_set.clear()
+        self.catalog_courses.courses.clear()
+        self.assertEqual(self.read_events(), [
+            (MembershipEvent.COURSE_REMOVED, fixed_id, course_ids[0]),
+            (MembershipEvent.COURSE_REMOVED, fixed_id, course_ids[1]),
+            (MembershipEvent.COURSE_REMOVED, courses_id, course_ids[1]),
+        ])
+
+    def test_bulk_client_methods(self):
+        """The bulk membership updates of the API clients record every changed pair."""
+        course_keys = [CourseKey.from_string(course.id) for course in self.courses]
+
+        FixedCatalogAPIClient.bulk_update_course_runs([self.fixed_catalog.pk], course_keys[:1])
+        CatalogCoursesAPIClient.bulk_update_courses(
+            [self.catalog_courses.pk],
+            course_keys[1:2],
+            action='replace',
+        )
+        CatalogCoursesAPIClient.bulk_update_courses([self.catalog_courses.pk], [], action='replace')
+
+        self.assertEqual(self.read_events(), [
+            (MembershipEvent.COURSE_ADDED, self.fixed_catalog.pk, self.courses[0].id),
+            (MembershipEvent.COURSE_ADDED, self.catalog_courses.pk, self.courses[1].id),
+            (MembershipEvent.COURSE_REMOVED, self.catalog_courses.pk, self.courses[1].id),
+        ])
+
+    def test_catalog_changes(self):
+        """Creations, renames and deletions are recorded, other saves are not."""
+        catalog = FixedCatalog.objects.create(name='Other', slug='other')
+        catalog.save()
+        FlexibleCatalogAPIClient(catalog_uuid=catalog.pk).update_flexible_catalog(name='Renamed')
+        catalog_id = catalog.pk
+        FlexibleCatalogAPIClient(catalog_uuid=catalog_id).delete_flexible_catalog()
+
+        self.assertEqual(self.read_events(), [
+            (MembershipEvent.CATALOG_CREATED, catalog_id, None),
+            (MembershipEvent.CATALOG_RENAMED, catalog_id, None),
+            (MembershipEvent.CATALOG_DELETED, catalog_id, None),
+        ])
+
+    def test_activation_changes(self):
+        """Activations and deactivations are recorded from the saves, the bulk upsert and the deletions."""
+        self.catalog_courses.courses.add(self.available_courses[0])
+        self.read_events()
+        course_keys = [CourseKey.from_string(course.id) for course in self.courses]
+
+        self.available_courses[0].active = False
+        self.available_courses[0].save()
+        AvailableCourseAPIClient.bulk_upsert_available_courses([(course_keys[0], True), (course_keys[1], False)])
+        AvailableCourseAPIClient(course_keys[0]).delete_available_course()
+
+        self.assertEqual(self.read_events(), [
+            (MembershipEvent.COURSE_DEACTIVATED, None, self.courses[0].id),
+            (MembershipEvent.COURSE_ACTIVATED, None, self.courses[0].id),
+            (MembershipEvent.COURSE_DEACTIVATED, None, self.courses[1].id),
+            (MembershipEvent.COURSE_REMOVED, self.catalog_courses.pk, self.courses[0].id),
+            (MembershipEvent.COURSE_DEACTIVATED, None, self.courses[0].id),
+        ])
+
+    def test_dynamic_catalogs(self):
+        """Materialized catalogs record their courses, live ones that their membership changed."""
+        query_string = json.dumps({'org': 'edX'})
+        materialized = DynamicCatalog.objects.create(name='M', slug='m', query_string=query_string, materialized=True)
+        live = DynamicCatalog.objects.create(name='Live', slug='live', query_string=query_string)
+        self.read_events()
+
+        course = CourseOverviewTestModel.objects.create(id='course-v1:edX+New+2024', org='edX')
+        course.org = 'Other'
+        course.save()
+
+        self.assertCountEqual(self.read_events(), [
+            (MembershipEvent.MEMBERSHIP_CHANGED, live.pk, None),
+            (MembershipEvent.COURSE_ADDED, materialized.pk, course.id),
+            (MembershipEvent.MEMBERSHIP_CHANGED, live.pk, None),
+            (MembershipEvent.COURSE_REMOVED, materialized.pk, course.id),
+        ])
+
+    def test_gaps_hold_the_following_events(self):
+        """Events after a missing sequence number are only read once it times out."""
+        self.fixed_catalog.course_runs.add(*self.courses)
+        events = list(MembershipEvent.objects.filter(seq__gt=self.last_seq).order_by('seq'))
+        events[1].delete()
+
+        self.assertEqual(
+            self.read_events(),
+            [(MembershipEvent.COURSE_ADDED, self.fixed_catalog.pk, events[0].course_id)],
+        )
+        self.assertEqual(self.read_events(), [])
+
+        with override_settings(CP_MEMBERSHIP_EVENTS_GAP_TIMEOUT=0):
+            self.assertEqual(
+                self.read_events(),
+                [(MembershipEvent.COURSE_ADDED, self.fixed_catalog.pk, events[2].course_id)],
+            )
+
+    @override_settings(CP_MEMBERSHIP_EVENTS_RETENTION=60)
+    def test_pruning(self):
+        """Events older than the retention are pruned, except the last one, and older consumers must resync."""
+        self.fixed_catalog.course_runs.add(*self.courses[:2])
+        MembershipEvent.objects.update(created=timezone.now() - timedelta(seconds=120))
+        last_seq = self.get_last_seq()
+        count = MembershipEvent.objects.count()
+
+        self.assertEqual(prune_events(), count - 1)
+        self.assertEqual(list(MembershipEvent.objects.values_list('seq', flat=True)), [last_seq])
+        self.assertEqual(get_resync_seq(self.last_seq), last_seq - 1)
+        self.assertIsNone(get_resync_seq(last_seq - 1))
+        self.assertIsNone(get_resync_seq(last_seq))
+
+    @override_settings(CP_MEMBERSHIP_EVENTS_RETENTION=60)
+    def test_first_read_prunes(self):
+        """The first read of a process prunes, whatever its uptime."""
+        self.fixed_catalog.course_runs.add(*self.courses[:2])
+        MembershipEvent.objects.update(created=timezone.now() - timedelta(seconds=120))
+
+        with mock.patch('catalog_plugin.changelog._pruned_at', None):
+            get_events(self.last_seq, 100)
+
+        self.assertEqual(MembershipEvent.objects.count(), 1)
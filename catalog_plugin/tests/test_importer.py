@@ -0,0 +1,135 @@
+"""Tests for the `catalog_plugin` importer module and the `import_catalogs` command."""
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.test import TestCase
+
+from catalog_plugin.importer import CatalogImporter, read_rows
+from catalog_plugin.models import AvailableCourse, CatalogCourses, DynamicCatalog, FixedCatalog, FlexibleCatalogModel
+from catalog_plugin.tests.backends_for_tests import CourseOverviewTestModel
+
+
+class TestImportCatalogs(TestCase):
+    """Test the bulk import of catalog definitions."""
+
+    def setUp(self):
+        self.courses = [
+            CourseOverviewTestModel.objects.create(id=f'course-v1:edX+C{index}+2024', org='edX')
+            for index in range(4)
+        ]
+        AvailableCourse.objects.bulk_create(AvailableCourse(course=course) for course in self.courses[:2])
+
+    def write_file(self, content, extension):
+        """Write a temporary import file and return its path."""
+        file = tempfile.NamedTemporaryFile('w', suffix=f'.{extension}', delete=False, encoding='utf-8')
+        with file:
+            file.write(content)
+        self.addCleanup(os.remove, file.name)
+        return file.name
+
+    def import_jsonl(self, rows, **kwargs):
+        """Import JSONL rows and return the results."""
+        lines = [row if isinstance(row, str) else json.dumps(row) for row in rows]
+        with open(self.write_file('\n'.join(lines), 'jsonl'), encoding='utf-8') as file:
+            return list(CatalogImporter(**kwargs).import_rows(read_rows(file, 'jsonl')))
+
+    def test_command_imports_csv(self):
+        """Every catalog type is created with its memberships from a CSV file."""
+        path = self.write_file(
+            'type,name,slug,courses,query_string,materialized\n'
+            f'fixed,Fixed,,{self.courses[0].id} {self.courses[1].id},,\n'
+            f'catalog_courses,Courses,courses,{self.courses[1].id},,\n'
+            'dynamic,Dynamic,dynamic,,"{""org"": ""edX""}",true\n',
+            'csv',
+        )
+        stdout, stderr = StringIO(), StringIO()
+
+        call_command('import_catalogs', path, stdout=stdout, stderr=stderr)
+
+        self.assertEqual(set(FixedCatalog.objects.get(slug='fixed').course_runs.all()), set(self.courses[:2]))
+        self.assertEqual(
+            [course.course_id for course in CatalogCourses.objects.get(slug='courses').courses.all()],
+            [self.courses[1].id],
+        )
+        dynamic_catalog = DynamicCatalog.objects.get(slug='dynamic')
+        self.assertTrue(dynamic_catalog.materialized)
+        self.assertEqual(dynamic_catalog.memberships.count(), 4)
+        self.assertIn('line 2: created fixed (2 courses)', stdout.getvalue())
+        self.assertIn('3 rows: 3 created, 0 valid, 0 failed', stderr.getvalue())
+        self.assertIn('rows/s', stderr.getvalue())
+
+    def test_invalid_rows(self):
+        """Invalid rows are reported and skipped while the valid ones are created."""
+        FixedCatalog.objects.create(name='Existing', slug='existing')
+
+        results = self.import_jsonl([
+            {'type': 'fixed', 'name': 'Valid', 'courses': [self.courses[0].id]},
+            'not json',
+            {'type': 'unknown', 'name': 'Unknown type'},
+            {'type': 'fixed', 'name': 'Valid'},
+            {'type': 'fixed', 'name': 'Existing'},
+            {'type': 'fixed', 'name': 'Invalid key', 'courses': ['invalid']},
+            {'type': 'catalog_courses', 'name': 'Unavailable', 'courses': [self.courses[3].id]},
+            {'type': 'dynamic', 'name': 'Invalid query', 'query_string': {'unknown_field': 1}},
+        ])
+
+        self.assertEqual([result['status'] for result in results], ['created'] + ['error'] * 7)
+        self.assertEqual(results[1]['errors'], ['The line is not a JSON object.'])
+        self.assertIn('repeated in the file', results[3]['errors'][0])
+        self.assertIn('already exists', results[4]['errors'][0])
+        self.assertEqual(results[5]['errors'], ['Invalid course keys: invalid.'])
+        self.assertEqual(results[6]['errors'], [f'Unknown course keys: {self.courses[3].id}.'])
+        self.assertEqual(FlexibleCatalogModel.objects.count(), 2)
+
+    def test_inactive_available_courses_are_skipped(self):
+        """Inactive available courses are reported as skipped instead of being attached."""
+        AvailableCourse.objects.filter(course=self.courses[1]).update(active=False)
+
+        results = self.import_jsonl([
+            {'type': 'catalog_courses', 'name': 'Courses', 'courses': [course.id for course in self.courses[:2]]},
+        ])
+
+        self.assertEqual(results[0]['status'], 'created')
+        self.assertEqual(results[0]['courses'], 1)
+        self.assertEqual(results[0]['skipped'], [self.courses[1].id])
+        self.assertEqual(
+            [course.course_id for course in CatalogCourses.objects.get(slug='courses').courses.all()],
+            [self.courses[0].id],
+        )
+
+    def test_failed_memberships_are_not_reported_as_created(self):
+        """A failure writing the memberships leaves no row marked as created."""
+        importer = CatalogImporter()
+        definitions = [importer.parse_row(1, {'type': 'fixed', 'name': 'Fixed', 'courses': [self.courses[0].id]})]
+        importer.validate_course_keys(definitions)
+        importer.resolve_references(definitions)
+
+        with mock.patch('catalog_plugin.importer.bump_membership_versions', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                importer.create_catalogs(definitions)
+
+        self.assertEqual(definitions[0]['result']['status'], 'error')
+        self.assertIsNone(definitions[0]['result']['id'])
+        self.assertFalse(FlexibleCatalogModel.objects.exists())
+
+    def test_dry_run(self):
+        """A dry run validates the rows without creating anything."""
+        results = self.import_jsonl(
+            [{'type': 'fixed', 'name': 'Fixed', 'courses': [course.id for course in self.courses]}],
+            dry_run=True,
+        )
+
+        self.assertEqual(results[0]['status'], 'valid')
+        self.assertEqual(results[0]['courses'], 4)
+        self.assertFalse(FlexibleCatalogModel.objects.exists())
+
+    def test_query_count(self):
+        """The number of queries of a batch does not depend on the number of courses."""
+        for slug, courses in (('one', self.courses[:1]), ('all', self.courses)):
+            with self.subTest(slug=slug), self.assertNumQueries(13):
+                self.import_jsonl([{'type': 'fixed', 'name': slug, 'courses': [course.id for course in courses]}])
@@ -0,0 +1,140 @@
+"""Tests for the `catalog_plugin` instrumentation module."""
+from io import StringIO
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from opaque_keys.edx.keys import CourseKey
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from catalog_plugin.api.catalog_api_client import FixedCatalogAPIClient, FlexibleCatalogAPIClient
+from catalog_plugin.api.v0.views import FixedCatalogViewSet
+from catalog_plugin.instrumentation import flush_aggregator, instrument, read_metrics
+from catalog_plugin.models import FixedCatalog
+from catalog_plugin.tests.backends_for_tests import CourseOverviewTestModel
+
+
+class RecordingSink:
+    """Sink keeping the measurements in a class attribute."""
+
+    measurements = []
+
+    def record(self, name, seconds, queries, rows):
+        """Keep a measurement."""
+        self.measurements.append((name, queries, rows))
+
+
+class FailingSink:
+    """Sink failing on every measurement."""
+
+    def record(self, name, seconds, queries, rows):
+        """Fail."""
+        raise RuntimeError('Sink unavailable.')
+
+
+RECORDING_SINK = 'catalog_plugin.tests.test_instrumentation.RecordingSink'
+FAILING_SINK = 'catalog_plugin.tests.test_instrumentation.FailingSink'
+AGGREGATOR_SINK = 'catalog_plugin.instrumentation.AggregatorSink'
+
+
+@override_settings(CP_INSTRUMENTATION_ENABLED=True, CP_INSTRUMENTATION_SINKS=[RECORDING_SINK])
+class TestInstrumentation(TestCase):
+    """Test the instrumentation of the plugin hot paths."""
+
+    def setUp(self):
+        RecordingSink.measurements.clear()
+        self.course = CourseOverviewTestModel.objects.create(id='course-v1:edX+A+2024')
+        self.catalog = FixedCatalog.objects.create(name='Fixed', slug='fixed')
+        RecordingSink.measurements.clear()
+
+    def test_disabled_by_default(self):
+        """Nothing is recorded unless the instrumentation is enabled."""
+        with override_settings(CP_INSTRUMENTATION_ENABLED=False):
+            self.catalog.get_course_keys()
+
+        self.assertEqual(RecordingSink.measurements, [])
+
+    def test_get_course_keys_is_reported_per_class(self):
+        """Inherited methods are reported under the name of the subclass with their query and rows."""
+        self.catalog.course_runs.add(self.course)
+        RecordingSink.measurements.clear()
+
+        self.catalog.get_course_keys()
+
+        self.assertEqual(RecordingSink.measurements, [('models.FixedCatalog.get_course_keys', 1, 1)])
+
+    def test_lazy_querysets_are_not_reported(self):
+        """The catalog methods returning lazy querysets are left to the call sites evaluating them."""
+        list(self.catalog.get_courses())
+
+        self.assertEqual(RecordingSink.measurements, [])
+
+    def test_api_client_queries_and_rows(self):
+        """API client methods report their queries and the rows they return."""
+        FixedCatalogAPIClient.bulk_update_course_runs([self.catalog.pk], [CourseKey.from_string(self.course.id)])
+
+        name, queries, rows = RecordingSink.measurements[-1]
+        self.assertEqual(name, 'api_client.FixedCatalogAPIClient.bulk_update_course_runs')
+        self.assertGreater(queries, 0)
+        self.assertEqual(rows, 1)
+
+    def test_viewset_requests(self):
+        """Viewset requests are reported with their action and the number of serialized objects."""
+        request = APIRequestFactory().get('/')
+        force_authenticate(request, user=get_user_model().objects.create(username='staff', is_staff=True))
+
+        FixedCatalogViewSet.as_view({'get': 'list'})(request)
+
+        self.assertEqual(RecordingSink.measurements[-1], ('api.v0.FixedCatalogViewSet.list', 3, 1))
+
+    def test_async_methods(self):
+        """Async API client methods are measured until their result is returned."""
+        catalog = async_to_sync(FlexibleCatalogAPIClient(catalog_slug='fixed').aget_flexible_catalog)()
+
+        self.assertEqual(catalog, self.catalog)
+        self.assertEqual(
+            RecordingSink.measurements[-1][::2],
+            ('api_client.FlexibleCatalogAPIClient.aget_flexible_catalog', 1),
+        )
+
+    @override_settings(CP_INSTRUMENTATION_SINKS=[FAILING_SINK, RECORDING_SINK])
+    def test_failing_sink_does_not_break_the_call(self):
+        """Errors raised by a sink are logged instead of propagated."""
+        @instrument('function')
+        def function():
+            return [1, 2]
+
+        with self.assertLogs('catalog_plugin.instrumentation', level='ERROR'):
+            self.assertEqual(function(), [1, 2])
+
+        self.assertEqual(RecordingSink.measurements, [('function', 0, 2)])
+
+
+@override_settings(
+    CP_INSTRUMENTATION_ENABLED=True,
+    CP_INSTRUMENTATION_SINKS=[AGGREGATOR_SINK],
+    CP_INSTRUMENTATION_FLUSH_INTERVAL=3600,
+)
+class TestAggregatorSink(TestCase):
+    """Test the in-process aggregation of the measurements."""
+
+    def setUp(self):
+        cache.clear()
+        self.catalog = FixedCatalog.objects.create(name='Fixed', slug='fixed')
+
+    def test_totals_are_shared_through_the_cache(self):
+        """Flushed totals are read back and printed by the management command."""
+        for _ in range(3):
+            self.catalog.get_course_keys()
+
+        self.assertEqual(read_metrics(), {})
+        flush_aggregator()
+        self.assertEqual(read_metrics()['models.FixedCatalog.get_course_keys']['calls'], 3)
+
+        stdout = StringIO()
+        call_command('show_catalog_metrics', '--reset', stdout=stdout)
+
+        self.assertIn('models.FixedCatalog.get_course_keys', stdout.getvalue())
+        self.assertEqual(read_metrics(), {})
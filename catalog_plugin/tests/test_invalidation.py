@@ -0,0 +1,92 @@
+"""Tests for the `catalog_plugin` invalidation module."""
+import sys
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase, override_settings
+
+from catalog_plugin.invalidation import DatabaseTransport, get_transport, poll_invalidations, publish_invalidations
+from catalog_plugin.membership_index import get_membership_index
+from catalog_plugin.models import CatalogInvalidation, FixedCatalog
+from catalog_plugin.tests.backends_for_tests import CourseOverviewTestModel
+
+
+@override_settings(CP_INVALIDATION_TRANSPORT='catalog_plugin.invalidation.DatabaseTransport')
+class TestInvalidationBroadcast(TestCase):
+    """Test the broadcast of the catalog changes to the other processes."""
+
+    def setUp(self):
+        cache.clear()
+        self.course = CourseOverviewTestModel.objects.create(id='course-v1:edX+C0+2024', org='edX')
+        self.catalog = FixedCatalog.objects.create(name='Fixed', slug='fixed')
+
+    def test_database_round_trip(self):
+        """Another process receives the membership bumps, saves and deletes of the catalogs."""
+        transport = DatabaseTransport()
+        self.assertEqual(transport.poll(), [])
+
+        self.catalog.course_runs.add(self.course)
+        self.assertEqual(transport.poll(), [(self.catalog.pk, 1)])
+
+        self.catalog.name = 'Renamed'
+        self.catalog.save()
+        catalog_id = self.catalog.pk
+        self.catalog.delete()
+
+        self.assertEqual(transport.poll(), [(catalog_id, 1), (catalog_id, None), (catalog_id, None)])
+        self.assertEqual(transport.poll(), [])
+
+    def test_late_commits_are_read(self):
+        """Rows committed after a more recent row are still read while their gap is tracked."""
+        transport = DatabaseTransport()
+        transport.poll()
+        rows = [CatalogInvalidation.objects.create(catalog_id=self.catalog.pk, membership_version=version)
+                for version in range(3)]
+        late_id = rows[1].id
+        rows[1].delete()
+
+        self.assertEqual(transport.poll(), [(self.catalog.pk, 0), (self.catalog.pk, 2)])
+        self.assertEqual(set(transport.gaps), {late_id})
+
+        CatalogInvalidation.objects.create(id=late_id, catalog_id=self.catalog.pk, membership_version=1)
+
+        self.assertEqual(transport.poll(), [(self.catalog.pk, 1)])
+        self.assertEqual(transport.gaps, {})
+
+    def test_poll_invalidates_the_membership_index(self):
+        """Polled events drop the catalogs from the membership index of the process."""
+        index = get_membership_index()
+        poll_invalidations(force=True)
+        index.contains(self.catalog.pk, self.course.id)
+
+        publish_invalidations([(self.catalog.pk, 5)])
+
+        self.assertEqual(poll_invalidations(), [])
+        self.assertEqual(poll_invalidations(force=True), [(self.catalog.pk, 5)])
+        self.assertNotIn(self.catalog.pk, index.catalogs)
+
+    @override_settings(CP_INVALIDATION_TRANSPORT='catalog_plugin.invalidation.RedisTransport')
+    def test_redis_requires_the_package(self):
+        """The Redis transport reports the missing package as a configuration error."""
+        with mock.patch.dict(sys.modules, {'redis': None}), self.assertRaises(ImproperlyConfigured):
+            get_transport()
+
+
+class TestDefaultTransport(TestCase):
+    """Test the transport used when CP_INVALIDATION_TRANSPORT is not defined."""
+
+    def test_disabled_by_default(self):
+        """Nothing is published nor polled unless a transport is configured."""
+        catalog = FixedCatalog.objects.create(name='Fixed', slug='fixed')
+        catalog.course_runs.add(CourseOverviewTestModel.objects.create(id='course-v1:edX+C0+2024', org='edX'))
+
+        self.assertIsNone(get_transport())
+        self.assertFalse(CatalogInvalidation.objects.exists())
+        self.assertEqual(poll_invalidations(force=True), [])
+
+    @override_settings(CP_INVALIDATION_REDIS_URL='redis://localhost:6379/1')
+    def test_redis_is_the_default_when_configured(self):
+        """Defining the Redis URL selects the Redis transport."""
+        with mock.patch.dict(sys.modules, {'redis': None}), self.assertRaises(ImproperlyConfigured):
+            get_transport()
@@ -0,0 +1,120 @@
+"""Tests for the `catalog_plugin` materialization module."""
+import json
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from catalog_plugin.materialization import rebuild_catalog, refresh_course
+from catalog_plugin.models import DynamicCatalog, DynamicCatalogMembership
+from catalog_plugin.tests.backends_for_tests import CourseOverviewTestModel
+
+
+class TestMaterializedDynamicCatalog(TestCase):
+    """Test the materialized mode of DynamicCatalog."""
+
+    def setUp(self):
+        self.course_a = CourseOverviewTestModel.objects.create(id='course-v1:edX+A+2024', org='edX')
+        self.course_b = CourseOverviewTestModel.objects.create(id='course-v1:MITx+B+2024', org='MITx')
+        self.catalog = DynamicCatalog.objects.create(
+            name='Materialized',
+            slug='materialized',
+            query_string=json.dumps({'org': 'edX'}),
+            materialized=True,
+        )
+
+    def materialized_ids(self):
+        """Return the course ids stored for the catalog."""
+        return set(self.catalog.memberships.values_list('course_id', flat=True))
+
+    def test_created_catalog_is_built(self):
+        """Creating a materialized catalog fills its membership table."""
+        self.assertEqual(self.materialized_ids(), {self.course_a.id})
+        self.assertEqual(list(self.catalog.get_courses()), [self.course_a])
+
+    def test_course_overview_save_refreshes_only_that_row(self):
+        """Saving a course overview adds or removes only its own membership."""
+        self.course_b.org = 'edX'
+        self.course_b.save()
+        self.assertEqual(self.materialized_ids(), {self.course_a.id, self.course_b.id})
+
+        self.course_a.org = 'Other'
+        self.course_a.save()
+        self.assertEqual(self.materialized_ids(), {self.course_b.id})
+
+    def test_refresh_course_is_constant_in_queries(self):
+        """Refreshing a course evaluates every materialized catalog in the same statement."""
+        for index in range(5):
+            DynamicCatalog.objects.create(
+                name=f'Catalog {index}',
+                slug=f'catalog-{index}',
+                query_string=json.dumps({'org': 'MITx'}),
+                materialized=True,
+            )
+        DynamicCatalogMembership.objects.filter(course=self.course_b).delete()
+
+        # Savepoint, locked catalogs, aggregation, current memberships, insert,
+        # changelog, catalogs to bump, version bump and release.
+        with self.assertNumQueries(9):
+            changed_ids = refresh_course(self.course_b.pk)
+
+        self.assertEqual(len(changed_ids), 5)
+        self.assertEqual(DynamicCatalogMembership.objects.filter(course=self.course_b).count(), 5)
+
+    def test_query_change_rebuilds_catalog(self):
+        """Changing the query of a materialized catalog rebuilds its membership."""
+        version = self.catalog.membership_version
+
+        self.catalog.query_string = json.dumps({'org': 'MITx'})
+        self.catalog.save()
+
+        self.assertEqual(self.materialized_ids(), {self.course_b.id})
+        self.assertEqual(self.catalog.membership_version, version + 1)
+
+    def test_unchanged_matches_keep_the_version(self):
+        """A new query matching the same courses does not invalidate the materialized catalog."""
+        version = self.catalog.membership_version
+
+        self.catalog.query_string = json.dumps({'org': 'edX', 'id__startswith': 'course-v1:'})
+        self.catalog.save()
+
+        self.assertEqual(self.materialized_ids(), {self.course_a.id})
+        self.assertEqual(self.catalog.membership_version, version)
+
+    def test_disabling_materialization_clears_table(self):
+        """Switching a catalog to live mode removes its stored memberships."""
+        self.catalog.materialized = False
+        self.catalog.save()
+
+        self.assertEqual(self.materialized_ids(), set())
+        self.assertEqual(list(self.catalog.get_courses()), [self.course_a])
+
+    def test_rebuild_catalog_reports_changes(self):
+        """A rebuild returns the number of added and removed memberships."""
+        DynamicCatalogMembership.objects.create(catalog=self.catalog, course=self.course_b)
+
+        self.assertEqual(rebuild_catalog(self.catalog), (0, 1))
+        self.assertEqual(rebuild_catalog(self.catalog), (0, 0))
+
+    def test_rebuild_command(self):
+        """The management command rebuilds every materialized catalog."""
+        self.catalog.memberships.all().delete()
+        stdout = StringIO()
+
+        call_command('rebuild_dynamic_catalogs', '--compare', stdout=stdout)
+
+        self.assertEqual(self.materialized_ids(), {self.course_a.id})
+        self.assertIn(f'{self.catalog.pk}: 1 added, 0 removed', stdout.getvalue())
+        self.assertIn('materialized read', stdout.getvalue())
+
+    def test_validate_command(self):
+        """The validation lists every dynamic catalog whose stored query string is not supported."""
+        live = DynamicCatalog.objects.create(name='Live', slug='live', query_string=json.dumps({'org': 'edX'}))
+        DynamicCatalog.objects.filter(pk=live.pk).update(query_string=json.dumps({'start__year': 2024}))
+        stdout = StringIO()
+
+        with self.assertRaisesMessage(CommandError, '1 dynamic catalogs have an unsupported query string.'):
+            call_command('rebuild_dynamic_catalogs', '--validate', stdout=stdout)
+
+        self.assertIn(f'{live.pk} (live): The lookup "year" is not allowed.', stdout.getvalue())
+        self.assertNotIn(str(self.catalog.pk), stdout.getvalue())
@@ -0,0 +1,496 @@
+"""Tests for the `catalog_plugin` membership module."""
+import json
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase
+
+from catalog_plugin.membership import (
+    bump_membership_versions,
+    get_cached_course_keys,
+    get_catalog_ids_for_courses,
+    get_many_cached_course_keys,
+)
+from catalog_plugin.models import (
+    AvailableCourse,
+    CatalogCourses,
+    CompositeCatalog,
+    CompositeCatalogChild,
+    DynamicCatalog,
+    FixedCatalog,
+    FlexibleCatalogModel,
+    MembershipEvent,
+)
+from catalog_plugin.tests.backends_for_tests import CourseOverviewTestModel
+
+
+class TestMembershipCache(TestCase):
+    """Test the versioned membership cache of the catalogs."""
+
+    def setUp(self):
+        cache.clear()
+        self.course_a = CourseOverviewTestModel.objects.create(id='course-v1:edX+A+2024', org='edX')
+        self.course_b = CourseOverviewTestModel.objects.create(id='course-v1:edX+B+2024', org='edX')
+        self.course_c = CourseOverviewTestModel.objects.create(id='course-v1:Other+C+2024', org='Other')
+
+    def test_cached_read_does_not_hit_the_database(self):
+        """A second read of an unchanged catalog is served from the cache."""
+        catalog = FixedCatalog.objects.create(name='Fixed', slug='fixed')
+        catalog.course_runs.add(self.course_a, self.course_b)
+
+        self.assertEqual(get_cached_course_keys(catalog), [self.course_a.id, self.course_b.id])
+
+        with self.assertNumQueries(0):
+            self.assertEqual(get_cached_course_keys(catalog), [self.course_a.id, self.course_b.id])
+
+    def test_fixed_catalog_m2m_changes_bump_version(self):
+        """Adding, removing and clearing course runs invalidates the fixed catalog."""
+        catalog = FixedCatalog.objects.create(name='Fixed', slug='fixed')
+
+        catalog.course_runs.add(self.course_a)
+        self.assertEqual(get_cached_course_keys(catalog), [self.course_a.id])
+
+        catalog.course_runs.add(self.course_b)
+        self.assertEqual(get_cached_course_keys(catalog), [self.course_a.id, self.course_b.id])
+
+        catalog.course_runs.remove(self.course_a)
+        self.assertEqual(get_cached_course_keys(catalog), [self.course_b.id])
+
+        catalog.course_runs.clear()
+        self.assertEqual(get_cached_course_keys(catalog), [])
+
+    def test_reverse_m2m_changes_bump_version(self):
+        """Changing the relation from the course side invalidates every affected catalog."""
+        first = FixedCatalog.objects.create(name='First', slug='first')
+        second = FixedCatalog.objects.create(name='Second', slug='second')
+        self.course_a.fixedcatalog_set.add(first, second)
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(get_cached_course_keys(first), [self.course_a.id])
+        self.assertEqual(get_cached_course_keys(second), [self.course_a.id])
+
+        self.course_a.fixedcatalog_set.clear()
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(get_cached_course_keys(first), [])
+        self.assertEqual(get_cached_course_keys(second), [])
+
+    def test_available_course_active_flag_keeps_memberships(self):
+        """Toggling the active flag of an available course keeps the cached memberships of every catalog."""
+        available_course = AvailableCourse.objects.create(course=self.course_a)
+        catalog = CatalogCourses.objects.create(name='Courses', slug='courses')
+        catalog.courses.add(available_course)
+        catalogs = [
+            catalog,
+            FlexibleCatalogModel.objects.create(name='Plain', slug='plain'),
+            DynamicCatalog.objects.create(name='Dynamic', slug='dynamic', query_string=json.dumps({'org': 'edX'})),
+        ]
+        versions = [FlexibleCatalogModel.objects.get(pk=catalog.pk).membership_version for catalog in catalogs]
+
+        available_course.active = False
+        available_course.save()
+
+        self.assertEqual(
+            [FlexibleCatalogModel.objects.get(pk=catalog.pk).membership_version for catalog in catalogs],
+            versions,
+        )
+
+    def test_available_course_creation_bumps_plain_catalogs(self):
+        """Only the plain catalogs, which gain the new course, are invalidated by a new available course."""
+        plain_catalog = FlexibleCatalogModel.objects.create(name='Plain', slug='plain')
+        fixed_catalog = FixedCatalog.objects.create(name='Fixed', slug='fixed')
+        fixed_catalog.course_runs.add(self.course_a)
+        fixed_catalog.refresh_from_db()
+        self.assertEqual(get_cached_course_keys(plain_catalog), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            AvailableCourse.objects.create(course=self.course_a)
+
+        plain_catalog.refresh_from_db()
+        self.assertEqual(get_cached_course_keys(plain_catalog), [self.course_a.id])
+        self.assertEqual(
+            FlexibleCatalogModel.objects.get(pk=fixed_catalog.pk).membership_version,
+            fixed_catalog.membership_version,
+        )
+        self.assertEqual(FlexibleCatalogModel.objects.get(pk=fixed_catalog.pk).active_course_count, 1)
+
+    def test_available_course_deletion_bumps_catalog_courses(self):
+        """Deleting an available course invalidates the catalogs that contained it."""
+        available_course = AvailableCourse.objects.create(course=self.course_a)
+        catalog = CatalogCourses.objects.create(name='Courses', slug='courses')
+        catalog.courses.add(available_course)
+        self.assertEqual(get_cached_course_keys(catalog), [self.course_a.id])
+
+        available_course.delete()
+
+        catalog.refresh_from_db()
+        self.assertEqual(get_cached_course_keys(catalog), [])
+
+    def test_dynamic_catalog_query_string_bumps_version(self):
+        """Changing the query string of a dynamic catalog invalidates it."""
+        catalog = DynamicCatalog.objects.create(name='Dynamic', slug='dynamic', query_string=json.dumps({'org': 'edX'}))
+        self.assertEqual(get_cached_course_keys(catalog), [self.course_a.id, self.course_b.id])
+
+        catalog.query_string = json.dumps({'org': 'Other'})
+        catalog.save()
+
+        self.assertEqual(get_cached_course_keys(catalog), [self.course_c.id])
+
+    def test_dynamic_catalog_name_change_keeps_version(self):
+        """Saving a dynamic catalog without changing its query keeps the cached membership."""
+        catalog = DynamicCatalog.objects.create(name='Dynamic', slug='dynamic', query_string=json.dumps({'org': 'edX'}))
+        version = catalog.membership_version
+
+        catalog.name = 'Renamed'
+        catalog.save()
+
+        catalog.refresh_from_db()
+        self.assertEqual(catalog.membership_version, version)
+
+    def test_course_overview_changes_bump_dynamic_catalogs(self):
+        """Saving a course overview invalidates the dynamic catalogs."""
+        catalog = DynamicCatalog.objects.create(name='Dynamic', slug='dynamic', query_string=json.dumps({'org': 'edX'}))
+        self.assertEqual(get_cached_course_keys(catalog), [self.course_a.id, self.course_b.id])
+
+        self.course_c.org = 'edX'
+        self.course_c.save()
+
+        catalog.refresh_from_db()
+        self.assertEqual(
+            get_cached_course_keys(catalog),
+            sorted([self.course_a.id, self.course_b.id, self.course_c.id]),
+        )
+
+    def test_course_overview_changes_only_bump_changed_dynamic_catalogs(self):
+        """Saves that change no queried field, or no match, keep the memberships and record no event."""
+        DynamicCatalog.objects.create(name='edX', slug='edx', query_string=json.dumps({'org': 'edX'}))
+        mit_catalog = DynamicCatalog.objects.create(name='MIT', slug='mit', query_string=json.dumps({'org': 'MITx'}))
+        DynamicCatalog.objects.create(
+            name='Materialized',
+            slug='materialized',
+            query_string=json.dumps({'org': 'edX'}),
+            materialized=True,
+        )
+        versions = {catalog.pk: catalog.membership_version for catalog in FlexibleCatalogModel.objects.all()}
+        last_seq = MembershipEvent.objects.order_by('seq').values_list('seq', flat=True).last()
+
+        # The dynamic catalogs, the stored values of the queried fields and the update.
+        with self.assertNumQueries(3):
+            self.course_c.display_name = 'Renamed'
+            self.course_c.save()
+        self.course_c.org = 'Another'
+        self.course_c.save()
+
+        self.assertEqual(
+            {catalog.pk: catalog.membership_version for catalog in FlexibleCatalogModel.objects.all()},
+            versions,
+        )
+        self.assertFalse(MembershipEvent.objects.filter(seq__gt=last_seq).exists())
+
+        self.course_c.org = 'MITx'
+        self.course_c.save()
+
+        versions[mit_catalog.pk] += 1
+        self.assertEqual(
+            {catalog.pk: catalog.membership_version for catalog in FlexibleCatalogModel.objects.all()},
+            versions,
+        )
+        self.assertEqual(
+            list(MembershipEvent.objects.filter(seq__gt=last_seq).values_list('event', 'catalog_id')),
+            [(MembershipEvent.MEMBERSHIP_CHANGED, mit_catalog.pk)],
+        )
+
+    def test_bump_membership_versions_without_ids(self):
+        """Bumping an empty set of catalogs does not touch the database."""
+        with self.assertNumQueries(0):
+            self.assertEqual(bump_membership_versions([]), 0)
+
+
+class TestCourseKeysProjection(TestCase):
+    """Test the course key projection of every catalog type."""
+
+    def test_one_query_per_catalog(self):
+        """get_course_keys() returns the keys of the course overviews of every catalog type in one query."""
+        courses = [
+            CourseOverviewTestModel.objects.create(id=f'course-v1:{org}+C{index}+2024', org=org)
+            for index, org in enumerate(('edX', 'edX', 'Other'))
+        ]
+        available_courses = [AvailableCourse.objects.create(course=course) for course in courses[:2]]
+        fixed_catalog = FixedCatalog.objects.create(name='Fixed', slug='fixed')
+        fixed_catalog.course_runs.add(courses[0], courses[2])
+        catalog_courses = CatalogCourses.objects.create(name='Courses', slug='courses')
+        catalog_courses.courses.add(available_courses[1])
+        query_string = json.dumps({'org': 'edX'})
+        catalogs = [
+            FlexibleCatalogModel.objects.create(name='Plain', slug='plain'),
+            fixed_catalog,
+            catalog_courses,
+            DynamicCatalog.objects.create(name='Live', slug='live', query_string=query_string),
+            DynamicCatalog.objects.create(name='Stored', slug='stored', query_string=query_string, materialized=True),
+        ]
+
+        for catalog in catalogs:
+            expected_keys = frozenset(str(course.pk) for course in catalog.get_course_overviews())
+            with self.subTest(catalog=catalog.slug), self.assertNumQueries(1):
+                self.assertEqual(catalog.get_course_keys(), expected_keys)
+
+
+class TestCatalogIdsForCourses(TestCase):
+    """Test the reverse lookup from courses to catalogs."""
+
+    def setUp(self):
+        self.course_a = CourseOverviewTestModel.objects.create(id='course-v1:edX+A+2024', org='edX')
+        self.course_b = CourseOverviewTestModel.objects.create(id='course-v1:Other+B+2024', org='Other')
+        self.fixed_catalog = FixedCatalog.objects.create(name='Fixed', slug='fixed')
+        self.fixed_catalog.course_runs.add(self.course_b)
+        self.catalog_courses = CatalogCourses.objects.create(name='Courses', slug='courses')
+        self.catalog_courses.courses.add(AvailableCourse.objects.create(course=self.course_a))
+        self.live_catalog = DynamicCatalog.objects.create(
+            name='Live',
+            slug='live',
+            query_string=json.dumps({'org': 'edX'}),
+        )
+        self.materialized_catalog = DynamicCatalog.objects.create(
+            name='Materialized',
+            slug='materialized',
+            query_string=json.dumps({'org': 'Other'}),
+            materialized=True,
+        )
+        self.plain_catalog = FlexibleCatalogModel.objects.create(name='Plain', slug='plain')
+
+    def test_every_catalog_type_is_found(self):
+        """Each course is mapped to every catalog that contains it."""
+        catalog_ids = get_catalog_ids_for_courses([self.course_a.id, self.course_b.id, 'course-v1:edX+Missing+2024'])
+
+        self.assertEqual(set(catalog_ids[self.course_a.id]), {
+            self.catalog_courses.pk,
+            self.live_catalog.pk,
+            self.plain_catalog.pk,
+        })
+        self.assertEqual(set(catalog_ids[self.course_b.id]), {self.fixed_catalog.pk, self.materialized_catalog.pk})
+        self.assertEqual(catalog_ids['course-v1:edX+Missing+2024'], [])
+
+    def test_lookup_is_constant_in_queries(self):
+        """The number of queries depends neither on the courses nor on the catalogs."""
+        for index in range(3):
+            DynamicCatalog.objects.create(
+                name=f'Live {index}',
+                slug=f'live-{index}',
+                query_string=json.dumps({'org': 'Other'}),
+            )
+
+        # Fixed, catalog courses, materialized, live catalogs, live evaluation,
+        # composite catalogs, available courses and plain catalogs.
+        with self.assertNumQueries(8):
+            catalog_ids = get_catalog_ids_for_courses([self.course_a.id, self.course_b.id])
+
+        self.assertEqual(len(catalog_ids[self.course_b.id]), 5)
+
+
+class TestCompositeCatalog(TestCase):
+    """Test the set operations of composite catalogs."""
+
+    def setUp(self):
+        cache.clear()
+        self.course_a = CourseOverviewTestModel.objects.create(id='course-v1:edX+A+2024', org='edX')
+        self.course_b = CourseOverviewTestModel.objects.create(id='course-v1:edX+B+2024', org='edX')
+        self.course_c = CourseOverviewTestModel.objects.create(id='course-v1:Other+C+2024', org='Other')
+        self.fixed_catalog = FixedCatalog.objects.create(name='Fixed', slug='fixed')
+        self.fixed_catalog.course_runs.add(self.course_a, self.course_c)
+        self.dynamic_catalog = DynamicCatalog.objects.create(
+            name='Dynamic',
+            slug='dynamic',
+            query_string=json.dumps({'org': 'edX'}),
+        )
+
+    def create_composite(self, operation, *children, slug=None):
+        """Create a composite catalog of the given children, in order."""
+        catalog = CompositeCatalog.objects.create(name=operation, slug=slug or operation, operation=operation)
+        for position, child in enumerate(children):
+            CompositeCatalogChild.objects.create(composite=catalog, child=child, position=position)
+        return CompositeCatalog.objects.get(pk=catalog.pk)
+
+    def test_set_operations(self):
+        """Union, intersection and difference combine the courses of the children."""
+        expected_keys = {
+            CompositeCatalog.UNION: sorted([self.course_a.id, self.course_b.id, self.course_c.id]),
+            CompositeCatalog.INTERSECTION: [self.course_a.id],
+            CompositeCatalog.DIFFERENCE: [self.course_c.id],
+        }
+
+        for operation, course_keys in expected_keys.items():
+            with self.subTest(operation=operation):
+                catalog = self.create_composite(operation, self.fixed_catalog, self.dynamic_catalog)
+                self.assertEqual(get_cached_course_keys(catalog), course_keys)
+
+    def test_single_query_evaluation(self):
+        """The courses are evaluated in one query after loading the children of each composite."""
+        inner = self.create_composite(CompositeCatalog.INTERSECTION, self.fixed_catalog, self.dynamic_catalog)
+        outer = self.create_composite(CompositeCatalog.UNION, inner, self.fixed_catalog, slug='outer')
+
+        with self.assertNumQueries(3):
+            course_keys = sorted(str(key) for key in outer.get_courses().values_list('pk', flat=True))
+
+        self.assertEqual(course_keys, sorted([self.course_a.id, self.course_c.id]))
+        self.assertEqual(get_many_cached_course_keys([outer])[outer.pk], course_keys)
+        self.assertIn(outer.pk, get_catalog_ids_for_courses([self.course_c.id])[self.course_c.id])
+
+    def test_children_changes_bump_the_composites(self):
+        """A change in a child invalidates every composite catalog above it."""
+        inner = self.create_composite(CompositeCatalog.UNION, self.fixed_catalog)
+        outer = self.create_composite(CompositeCatalog.UNION, inner, slug='outer')
+        self.assertEqual(get_cached_course_keys(outer), sorted([self.course_a.id, self.course_c.id]))
+
+        self.fixed_catalog.course_runs.add(self.course_b)
+        outer.refresh_from_db()
+
+        self.assertEqual(
+            get_cached_course_keys(outer),
+            sorted([self.course_a.id, self.course_b.id, self.course_c.id]),
+        )
+
+        outer.children.remove(inner)
+        outer.refresh_from_db()
+
+        self.assertEqual(get_cached_course_keys(outer), [])
+
+    def test_cycles_are_rejected(self):
+        """A composite catalog cannot contain itself, directly or through its children."""
+        inner = self.create_composite(CompositeCatalog.UNION, self.fixed_catalog)
+        outer = self.create_composite(CompositeCatalog.UNION, inner, slug='outer')
+
+        with self.assertRaises(ValidationError), transaction.atomic():
+            inner.children.add(outer)
+        with self.assertRaises(ValidationError), transaction.atomic():
+            CompositeCatalogChild.objects.create(composite=outer, child=outer)
+        with self.assertRaises(ValidationError), transaction.atomic():
+            inner.composite_parents.add(inner)
+
+    def test_nesting_depth_is_limited(self):
+        """Composite catalogs cannot be nested deeper than the maximum depth."""
+        catalog = self.create_composite(CompositeCatalog.UNION, self.fixed_catalog, slug='level-1')
+        for level in range(2, 5):
+            catalog = self.create_composite(CompositeCatalog.UNION, catalog, slug=f'level-{level}')
+
+        with self.assertRaises(ValidationError):
+            self.create_composite(CompositeCatalog.UNION, catalog, slug='level-5')
+
+
+class TestCourseCounts(TestCase):
+    """Test the denormalized course counts of the catalogs."""
+
+    def setUp(self):
+        self.course_a = CourseOverviewTestModel.objects.create(id='course-v1:edX+A+2024', org='edX')
+        self.course_b = CourseOverviewTestModel.objects.create(id='course-v1:edX+B+2024', org='edX')
+        self.course_c = CourseOverviewTestModel.objects.create(id='course-v1:Other+C+2024', org='Other')
+        self.available_a = AvailableCourse.objects.create(course=self.course_a)
+        self.available_b = AvailableCourse.objects.create(course=self.course_b, active=False)
+
+    def assertCounts(self, catalog, course_count, active_course_count):
+        """Assert the stored counts of a catalog."""
+        catalog = FlexibleCatalogModel.objects.get(pk=catalog.pk)
+        self.assertEqual((catalog.course_count, catalog.active_course_count), (course_count, active_course_count))
+
+    def test_counts_per_catalog_type(self):
+        """Every catalog type stores its number of courses and of active courses once the writes commit."""
+        with self.captureOnCommitCallbacks(execute=True):
+            plain_catalog = FlexibleCatalogModel.objects.create(name='Plain', slug='plain')
+            fixed_catalog = FixedCatalog.objects.create(name='Fixed', slug='fixed')
+            fixed_catalog.course_runs.add(self.course_a, self.course_b, self.course_c)
+            catalog_courses = CatalogCourses.objects.create(name='Courses', slug='courses')
+            catalog_courses.courses.add(self.available_a, self.available_b)
+            live_catalog = DynamicCatalog.objects.create(
+                name='Live',
+                slug='live',
+                query_string=json.dumps({'org': 'edX'}),
+            )
+            materialized_catalog = DynamicCatalog.objects.create(
+                name='Materialized',
+                slug='materialized',
+                query_string=json.dumps({'org': 'edX'}),
+                materialized=True,
+            )
+            composite_catalog = CompositeCatalog.objects.create(
+                name='Composite',
+                slug='composite',
+                operation=CompositeCatalog.DIFFERENCE,
+            )
+            composite_catalog.children.add(fixed_catalog, through_defaults={'position': 0})
+            composite_catalog.children.add(live_catalog, through_defaults={'position': 1})
+
+        self.assertCounts(plain_catalog, 2, 1)
+        self.assertCounts(fixed_catalog, 3, 1)
+        self.assertCounts(catalog_courses, 2, 1)
+        self.assertCounts(live_catalog, 2, 1)
+        self.assertCounts(materialized_catalog, 2, 1)
+        self.assertCounts(composite_catalog, 1, 0)
+
+    def test_counts_follow_course_changes(self):
+        """Toggling, adding and deleting available courses update the counts of the affected catalogs."""
+        with self.captureOnCommitCallbacks(execute=True):
+            catalog_courses = CatalogCourses.objects.create(name='Courses', slug='courses')
+            catalog_courses.courses.add(self.available_a, self.available_b)
+            fixed_catalog = FixedCatalog.objects.create(name='Fixed', slug='fixed')
+            fixed_catalog.course_runs.add(self.course_b, self.course_c)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.available_b.active = True
+            self.available_b.save()
+
+        self.assertCounts(catalog_courses, 2, 2)
+        self.assertCounts(fixed_catalog, 2, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            AvailableCourse.objects.create(course=self.course_c)
+        self.assertCounts(fixed_catalog, 2, 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.available_a.delete()
+        self.assertCounts(catalog_courses, 1, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.course_c.delete()
+        self.assertCounts(fixed_catalog, 1, 1)
+
+    def test_counts_are_refreshed_after_the_commit(self):
+        """Counting runs once per transaction after the commit, and a count change moves membership_modified."""
+        fixed_catalog = FixedCatalog.objects.create(name='Fixed', slug='fixed')
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            fixed_catalog.course_runs.add(self.course_a)
+            fixed_catalog.course_runs.add(self.course_b)
+            self.assertCounts(fixed_catalog, 0, 0)
+
+        # One load of the scheduled catalogs, one count and one update, for both additions.
+        with self.assertNumQueries(3):
+            for callback in callbacks:
+                callback()
+
+        self.assertCounts(fixed_catalog, 2, 1)
+        fixed_catalog.refresh_from_db()
+        membership_modified = fixed_catalog.membership_modified
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.available_b.active = True
+            self.available_b.save()
+
+        fixed_catalog.refresh_from_db()
+        self.assertEqual(fixed_catalog.active_course_count, 2)
+        self.assertGreater(fixed_catalog.membership_modified, membership_modified)
+
+    def test_refresh_command(self):
+        """The refresh_catalog_counts command restores counts written outside of the membership paths."""
+        fixed_catalog = FixedCatalog.objects.create(name='Fixed', slug='fixed')
+        fixed_catalog.course_runs.add(self.course_a)
+        FlexibleCatalogModel.objects.update(course_count=0, active_course_count=0)
+        stdout = StringIO()
+
+        call_command('refresh_catalog_counts', stdout=stdout)
+
+        self.assertCounts(fixed_catalog, 1, 1)
+        self.assertIn('Refreshed the course counts of 1 catalogs', stdout.getvalue())
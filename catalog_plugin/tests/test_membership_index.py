@@ -0,0 +1,95 @@
+"""Tests for the `catalog_plugin` membership index module."""
+import json
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from catalog_plugin.membership_index import MembershipIndex, get_membership_index
+from catalog_plugin.models import AvailableCourse, CatalogCourses, DynamicCatalog, FixedCatalog, FlexibleCatalogModel
+from catalog_plugin.tests.backends_for_tests import CourseOverviewTestModel
+
+
+class TestMembershipIndex(TestCase):
+    """Test the in-process membership checks."""
+
+    def setUp(self):
+        cache.clear()
+        self.courses = [
+            CourseOverviewTestModel.objects.create(id=f'course-v1:{org}+C{index}+2024', org=org)
+            for index, org in enumerate(['edX'] * 120 + ['Other'] * 4)
+        ]
+        self.course_keys = [course.id for course in self.courses]
+        available_courses = AvailableCourse.objects.bulk_create(
+            AvailableCourse(course=course) for course in self.courses
+        )
+        self.fixed_catalog = FixedCatalog.objects.create(name='Fixed', slug='fixed')
+        self.fixed_catalog.course_runs.add(self.courses[0], self.courses[121])
+        self.catalog_courses = CatalogCourses.objects.create(name='Courses', slug='courses')
+        self.catalog_courses.courses.add(*available_courses[:30])
+        self.dynamic_catalog = DynamicCatalog.objects.create(
+            name='Dynamic',
+            slug='dynamic',
+            query_string=json.dumps({'org': 'edX'}),
+        )
+        self.catalogs = [self.fixed_catalog, self.catalog_courses, self.dynamic_catalog]
+        self.index = MembershipIndex(refresh_interval=60)
+
+    def test_checks_match_the_catalogs(self):
+        """contains, contains_many and intersect agree with the courses of the catalogs."""
+        catalog_ids = [catalog.pk for catalog in self.catalogs]
+        expected_keys = {catalog.pk: catalog.get_course_keys() for catalog in self.catalogs}
+
+        contained = self.index.contains_many(catalog_ids, self.course_keys)
+
+        self.assertEqual(contained, expected_keys)
+        with self.assertNumQueries(0):
+            for catalog in self.catalogs:
+                for course_key in self.course_keys:
+                    self.assertEqual(
+                        self.index.contains(str(catalog.pk), course_key),
+                        course_key in expected_keys[catalog.pk],
+                    )
+            self.assertEqual(self.index.intersect(catalog_ids), frozenset([self.course_keys[0]]))
+            self.assertEqual(self.index.intersect(catalog_ids[1:]), expected_keys[self.catalog_courses.pk])
+            self.assertFalse(self.index.contains(self.fixed_catalog.pk, 'course-v1:edX+Unknown+2024'))
+
+    def test_representation_and_memory_usage(self):
+        """Sparse catalogs are stored as arrays, dense ones as bitsets, and their size is reported."""
+        self.index.contains_many([catalog.pk for catalog in self.catalogs], [])
+
+        usage = self.index.memory_usage()
+
+        self.assertEqual(usage['catalogs'], 3)
+        self.assertEqual(usage['courses'], 121)
+        self.assertEqual(usage['bitsets'], 2)
+        self.assertGreater(usage['membership_bytes'], 0)
+        self.assertGreater(usage['course_bytes'], 0)
+
+    def test_bumps_in_this_process_invalidate_the_index(self):
+        """A membership change drops the catalog from the process index when it is committed."""
+        index = get_membership_index()
+        self.assertFalse(index.contains(self.fixed_catalog.pk, self.course_keys[1]))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.fixed_catalog.course_runs.add(self.courses[1])
+
+        self.assertTrue(index.contains(self.fixed_catalog.pk, self.course_keys[1]))
+
+    def test_periodic_refresh(self):
+        """Catalogs whose version changed elsewhere are reloaded after the refresh interval."""
+        self.assertFalse(self.index.contains(self.fixed_catalog.pk, self.course_keys[1]))
+        self.fixed_catalog.course_runs.add(self.courses[1])
+
+        self.assertFalse(self.index.contains(self.fixed_catalog.pk, self.course_keys[1]))
+
+        self.index.refresh_interval = 0
+        self.assertTrue(self.index.contains(self.fixed_catalog.pk, self.course_keys[1]))
+
+    def test_missing_catalogs(self):
+        """Catalogs that do not exist contain no course."""
+        catalog = FlexibleCatalogModel.objects.create(name='Deleted', slug='deleted')
+        catalog_id = catalog.pk
+        catalog.delete()
+
+        self.assertFalse(self.index.contains(catalog_id, self.course_keys[0]))
+        self.assertEqual(self.index.intersect([]), frozenset())
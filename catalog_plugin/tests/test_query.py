@@ -0,0 +1,133 @@
+"""Tests for the `catalog_plugin` query module."""
+import json
+
+from django.core.exceptions import ValidationError
+from django.test import TestCase, override_settings
+
+from catalog_plugin.models import DynamicCatalog
+from catalog_plugin.query import clear_compiled_queries, compile_query_string, parse_query_string
+from catalog_plugin.tests.backends_for_tests import CourseOverviewTestModel
+
+
+class TestParseQueryString(TestCase):
+    """Test the parsing and validation of dynamic catalog queries."""
+
+    def test_flat_object_is_an_and_of_lookups(self):
+        """Keys of a JSON object are normalized into a sorted AND node."""
+        plan = parse_query_string(json.dumps({'org': 'edX', 'display_name__icontains': 'python'}))
+
+        self.assertEqual(
+            plan,
+            ('and', (
+                ('lookup', 'display_name', 'icontains', 'python'),
+                ('lookup', 'org', 'exact', 'edX'),
+            )),
+        )
+
+    def test_groups(self):
+        """The `and`, `or` and `not` keys are normalized into groups."""
+        plan = parse_query_string(json.dumps({
+            'or': [{'org': 'edX'}, {'org': 'MITx'}],
+            'not': {'id__in': ['course-v1:edX+A+2024']},
+        }))
+
+        self.assertEqual(
+            plan,
+            ('and', (
+                ('not', ('lookup', 'id', 'in', ('course-v1:edX+A+2024',))),
+                ('or', (('lookup', 'org', 'exact', 'edX'), ('lookup', 'org', 'exact', 'MITx'))),
+            )),
+        )
+
+    def test_invalid_queries(self):
+        """Malformed queries are rejected with a validation error."""
+        invalid_queries = (
+            'not json',
+            json.dumps(['org', 'edX']),
+            json.dumps({'unknown_field': 'value'}),
+            json.dumps({'org__regex': '.*'}),
+            json.dumps({'org__in': 'edX'}),
+            json.dumps({'start__range': ['2024-01-01']}),
+            json.dumps({'start__gte': 'yesterday'}),
+            json.dumps({'end__isnull': 'yes'}),
+            json.dumps({'or': []}),
+            json.dumps({'not': {}}),
+        )
+
+        for query_string in invalid_queries:
+            with self.subTest(query_string=query_string), self.assertRaises(ValidationError):
+                parse_query_string(query_string)
+
+    @override_settings(CP_DYNAMIC_CATALOG_ALLOWED_FIELDS=['org'])
+    def test_allowed_fields_setting(self):
+        """Only the fields listed in the setting can be used."""
+        self.assertEqual(parse_query_string(json.dumps({'org': 'edX'})), ('lookup', 'org', 'exact', 'edX'))
+
+        with self.assertRaises(ValidationError):
+            parse_query_string(json.dumps({'display_name': 'Python'}))
+
+    def test_compiled_query_fields(self):
+        """The compiled query reports the fields it uses."""
+        compiled_query = compile_query_string(json.dumps({'org': 'edX', 'or': [{'start__isnull': True}]}))
+
+        self.assertEqual(compiled_query.fields, frozenset(['org', 'start']))
+
+
+class TestDynamicCatalogCompiledQuery(TestCase):
+    """Test the use of compiled queries by DynamicCatalog."""
+
+    def setUp(self):
+        clear_compiled_queries()
+        CourseOverviewTestModel.objects.create(id='course-v1:edX+A+2024', org='edX', display_name='Python')
+        CourseOverviewTestModel.objects.create(id='course-v1:edX+B+2024', org='edX', display_name='Rust')
+        CourseOverviewTestModel.objects.create(id='course-v1:MITx+C+2024', org='MITx', display_name='Python')
+
+    def test_invalid_query_is_rejected_on_save(self):
+        """Saving a catalog with an invalid query raises a validation error."""
+        with self.assertRaises(ValidationError):
+            DynamicCatalog.objects.create(name='Invalid', slug='invalid', query_string='{"unknown": 1}')
+
+        self.assertFalse(DynamicCatalog.objects.exists())
+
+    def test_clean_reports_query_string_errors(self):
+        """Model validation reports query errors on the query_string field."""
+        catalog = DynamicCatalog(name='Invalid', slug='invalid', query_string='{"org__regex": ".*"}')
+
+        with self.assertRaises(ValidationError) as context:
+            catalog.full_clean()
+
+        self.assertIn('query_string', context.exception.message_dict)
+
+    def test_get_courses_with_groups(self):
+        """Boolean groups are applied when resolving the catalog courses."""
+        catalog = DynamicCatalog.objects.create(
+            name='Dynamic',
+            slug='dynamic',
+            query_string=json.dumps({'display_name': 'Python', 'not': {'org': 'MITx'}}),
+        )
+
+        self.assertEqual(list(catalog.get_courses().values_list('id', flat=True)), ['course-v1:edX+A+2024'])
+
+    def test_compiled_query_is_reused(self):
+        """Fetching the catalog again reuses the query compiled on save."""
+        catalog = DynamicCatalog.objects.create(name='Dynamic', slug='dynamic', query_string='{"org": "edX"}')
+        fetched_catalog = DynamicCatalog.objects.get(pk=catalog.pk)
+
+        self.assertIs(fetched_catalog.get_compiled_query(), catalog.get_compiled_query())
+
+    def test_get_courses_without_query_string(self):
+        """A catalog without query string has no courses."""
+        catalog = DynamicCatalog.objects.create(name='Dynamic', slug='dynamic')
+
+        self.assertIsNone(catalog.get_compiled_query())
+        self.assertFalse(catalog.get_courses().exists())
+
+    def test_legacy_invalid_query_fails_on_read(self):
+        """Invalid queries stored before validation existed still raise ValueError on read."""
+        catalog = DynamicCatalog.objects.create(name='Dynamic', slug='dynamic', query_string='{"org": "edX"}')
+        DynamicCatalog.objects.filter(pk=catalog.pk).update(query_string='[]')
+        clear_compiled_queries()
+        catalog.refresh_from_db()
+
+        with self.assertRaises(ValueError):
+            catalog.get_courses()
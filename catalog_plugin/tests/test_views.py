@@ -0,0 +1,498 @@
+"""Tests for the `catalog_plugin` api v0 views."""
+import json
+from urllib.parse import urlparse
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import QueryDict
+from django.test import TestCase, override_settings
+from django.utils.http import http_date, parse_http_date
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from catalog_plugin.api.v0.views import (
+    AvailableCourseViewSet,
+    CatalogCoursesViewSet,
+    CourseCatalogsViewSet,
+    FixedCatalogViewSet,
+    FlexibleCatalogViewSet,
+    MembershipEventsViewSet,
+)
+from catalog_plugin.models import (
+    AvailableCourse,
+    CatalogCourses,
+    CompositeCatalog,
+    CompositeCatalogChild,
+    DynamicCatalog,
+    FixedCatalog,
+    FlexibleCatalogModel,
+    MembershipEvent,
+)
+from catalog_plugin.query import clear_compiled_queries
+from catalog_plugin.tests.backends_for_tests import CourseOverviewTestModel
+
+
+class ViewTestMixin:
+    """Helpers to call the v0 viewsets as a staff user."""
+
+    factory = APIRequestFactory()
+
+    def setUp(self):
+        """Create the staff user and the course overviews used by the tests."""
+        super().setUp()
+        self.user = get_user_model().objects.create(username='staff', is_staff=True)
+        self.courses = [
+            CourseOverviewTestModel.objects.create(id=f'course-v1:edX+C{index}+2024', display_name=f'Course {index}')
+            for index in range(5)
+        ]
+
+    def get(self, viewset, action='list', data=None, headers=None, **kwargs):
+        """Perform an authenticated GET request against a viewset action."""
+        request = self.factory.get('/', data=data, **(headers or {}))
+        force_authenticate(request, user=self.user)
+        return viewset.as_view({'get': action})(request, **kwargs)
+
+
+class TestQueryCounts(ViewTestMixin, TestCase):
+    """
+    Lock the number of queries of every list and detail endpoint.
+
+    Each test measures the same request with a small and a large number of
+    rows; both must run the same, fixed number of queries.
+    """
+
+    def create_fixed_catalogs(self, count):
+        """Create fixed catalogs with every course run."""
+        for _ in range(count):
+            index = FlexibleCatalogModel.objects.count()
+            catalog = FixedCatalog.objects.create(name=f'Fixed {index}', slug=f'fixed-{index}')
+            catalog.course_runs.add(*self.courses)
+
+    def create_catalog_courses(self, count):
+        """Create catalog courses with every available course."""
+        available_courses = list(AvailableCourse.objects.all()) or [
+            AvailableCourse.objects.create(course=course) for course in self.courses
+        ]
+        for _ in range(count):
+            index = FlexibleCatalogModel.objects.count()
+            catalog = CatalogCourses.objects.create(name=f'Courses {index}', slug=f'courses-{index}')
+            catalog.courses.add(*available_courses)
+
+    def create_available_courses(self, count):
+        """Create available courses for new course overviews."""
+        for _ in range(count):
+            index = CourseOverviewTestModel.objects.count()
+            course = CourseOverviewTestModel.objects.create(id=f'course-v1:edX+Extra{index}+2024')
+            AvailableCourse.objects.create(course=course)
+
+    def create_flexible_catalogs(self, count):
+        """Create plain flexible catalogs."""
+        for _ in range(count):
+            index = FlexibleCatalogModel.objects.count()
+            FlexibleCatalogModel.objects.create(name=f'Flexible {index}', slug=f'flexible-{index}')
+
+    def assert_list_queries(self, viewset, create_rows, num_queries, data=None):
+        """Assert the list endpoint runs `num_queries` queries for 2 and for 10 rows."""
+        for total_rows in (2, 10):
+            create_rows(total_rows - viewset.queryset.count())
+            with self.subTest(total_rows=total_rows), self.assertNumQueries(num_queries):
+                response = self.get(viewset, data=data)
+                self.assertEqual(response.status_code, 200)
+                response.render()
+
+    def test_available_course_list(self):
+        """Listing available courses never fetches the course overviews."""
+        self.assert_list_queries(AvailableCourseViewSet, self.create_available_courses, 1)
+
+    def test_flexible_catalog_list(self):
+        """Listing flexible catalogs runs the ETag aggregate and a single query."""
+        self.assert_list_queries(FlexibleCatalogViewSet, self.create_flexible_catalogs, 2)
+
+    def test_fixed_catalog_list(self):
+        """Listing fixed catalogs prefetches the course runs of the page at once."""
+        self.assert_list_queries(FixedCatalogViewSet, self.create_fixed_catalogs, 3)
+
+    def test_catalog_courses_list(self):
+        """Listing catalog courses prefetches the courses of the page at once."""
+        self.assert_list_queries(CatalogCoursesViewSet, self.create_catalog_courses, 3)
+
+    def test_catalog_courses_search(self):
+        """Searching through the related courses neither duplicates rows nor adds queries."""
+        self.create_catalog_courses(3)
+
+        with self.assertNumQueries(3):
+            response = self.get(CatalogCoursesViewSet, data={'search': 'Course'})
+
+        self.assertEqual(len(response.data['results']), 3)
+
+    def test_detail_endpoints(self):
+        """Retrieving a single object runs a fixed number of queries."""
+        self.create_fixed_catalogs(1)
+        self.create_catalog_courses(1)
+        expected_queries = (
+            (AvailableCourseViewSet, AvailableCourse.objects.first(), 1),
+            (FlexibleCatalogViewSet, FlexibleCatalogModel.objects.first(), 1),
+            (FixedCatalogViewSet, FixedCatalog.objects.first(), 2),
+            (CatalogCoursesViewSet, CatalogCourses.objects.first(), 2),
+        )
+
+        for viewset, instance, num_queries in expected_queries:
+            with self.subTest(viewset=viewset.__name__), self.assertNumQueries(num_queries):
+                response = self.get(viewset, action='retrieve', pk=instance.pk)
+                self.assertEqual(response.status_code, 200)
+
+    def test_available_course_representation(self):
+        """Available courses are represented with their course key."""
+        self.create_available_courses(1)
+
+        response = self.get(AvailableCourseViewSet)
+
+        self.assertEqual(response.data['results'][0]['course'], 'course-v1:edX+Extra5+2024')
+
+
+class TestPagination(ViewTestMixin, TestCase):
+    """Test the cursor pagination of the v0 endpoints."""
+
+    def setUp(self):
+        super().setUp()
+        for index in range(7):
+            FlexibleCatalogModel.objects.create(name=f'Catalog {index}', slug=f'catalog-{index}')
+
+    def test_stream_through_pages(self):
+        """Following the next links returns every row once, in creation order."""
+        names = []
+        data = {'page_size': 3}
+
+        while data:
+            response = self.get(FlexibleCatalogViewSet, data=data)
+            names.extend(row['name'] for row in response.data['results'])
+            data = QueryDict(urlparse(response.data['next']).query) if response.data['next'] else None
+
+        self.assertEqual(names, [f'Catalog {index}' for index in range(7)])
+
+    def test_duplicate_ordering_values(self):
+        """Ordering by a non-unique field still returns every row once, tied rows ordered by id."""
+        FlexibleCatalogModel.objects.update(name='Same')
+        ids = []
+        data = {'page_size': 2, 'ordering': '-name'}
+
+        while data:
+            response = self.get(FlexibleCatalogViewSet, data=data)
+            ids.extend(row['id'] for row in response.data['results'])
+            data = QueryDict(urlparse(response.data['next']).query) if response.data['next'] else None
+
+        catalog_ids = [str(pk) for pk in FlexibleCatalogModel.objects.values_list('pk', flat=True)]
+        self.assertEqual(ids, sorted(catalog_ids, reverse=True))
+
+    @override_settings(CP_API_PAGE_SIZE=2, CP_API_MAX_PAGE_SIZE=4)
+    def test_page_size_is_bounded(self):
+        """The default page size comes from settings and requests cannot exceed the maximum."""
+        self.assertEqual(len(self.get(FlexibleCatalogViewSet).data['results']), 2)
+        self.assertEqual(len(self.get(FlexibleCatalogViewSet, data={'page_size': 100}).data['results']), 4)
+        self.assertEqual(len(self.get(FlexibleCatalogViewSet, data={'page_size': 'all'}).data['results']), 2)
+
+
+class TestExpandedFlexibleCatalogs(ViewTestMixin, TestCase):
+    """Test the expanded mode of the flexible catalog list endpoint."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.available_course = AvailableCourse.objects.create(course=self.courses[0])
+
+    def create_catalogs(self, count):
+        """Create `count` catalogs of every type."""
+        for _ in range(count):
+            index = FlexibleCatalogModel.objects.count()
+            fixed_catalog = FixedCatalog.objects.create(name=f'Fixed {index}', slug=f'fixed-{index}')
+            fixed_catalog.course_runs.add(self.courses[1], self.courses[2])
+            catalog_courses = CatalogCourses.objects.create(name=f'Courses {index}', slug=f'courses-{index}')
+            catalog_courses.courses.add(self.available_course)
+            DynamicCatalog.objects.create(
+                name=f'Live {index}',
+                slug=f'live-{index}',
+                query_string=json.dumps({'display_name__in': ['Course 3', 'Course 4']}),
+            )
+            DynamicCatalog.objects.create(
+                name=f'Materialized {index}',
+                slug=f'materialized-{index}',
+                query_string=json.dumps({'display_name': 'Course 4'}),
+                materialized=True,
+            )
+            FlexibleCatalogModel.objects.create(name=f'Plain {index}', slug=f'plain-{index}')
+
+    def test_expanded_representation(self):
+        """Every catalog includes its type and resolved course keys."""
+        self.create_catalogs(1)
+
+        response = self.get(FlexibleCatalogViewSet, data={'expand': 'courses'})
+
+        self.assertEqual(
+            [(row['type'], row['course_keys']) for row in response.data['results']],
+            [
+                ('FixedCatalog', [self.courses[1].id, self.courses[2].id]),
+                ('CatalogCourses', [self.courses[0].id]),
+                ('DynamicCatalog', [self.courses[3].id, self.courses[4].id]),
+                ('DynamicCatalog', [self.courses[4].id]),
+                ('FlexibleCatalogModel', [self.courses[0].id]),
+            ],
+        )
+
+    def test_expanded_list_is_constant_in_queries(self):
+        """The ETag, the page and one query per catalog type are needed, and only the first two once cached."""
+        for count in (1, 4):
+            self.create_catalogs(count)
+            cache.clear()
+            with self.subTest(count=count), self.assertNumQueries(7):
+                self.get(FlexibleCatalogViewSet, data={'expand': 'courses'})
+            with self.subTest(count=count, cached=True), self.assertNumQueries(2):
+                self.get(FlexibleCatalogViewSet, data={'expand': 'courses'})
+
+    def test_expanded_detail(self):
+        """The detail endpoint also supports the expanded mode."""
+        self.create_catalogs(1)
+        catalog = FixedCatalog.objects.get()
+
+        response = self.get(FlexibleCatalogViewSet, action='retrieve', data={'expand': 'courses'}, pk=catalog.pk)
+
+        self.assertEqual(response.data['type'], 'FixedCatalog')
+        self.assertEqual(response.data['course_keys'], [self.courses[1].id, self.courses[2].id])
+
+    def test_default_representation(self):
+        """Without expand, catalogs keep the compact representation."""
+        self.create_catalogs(1)
+
+        response = self.get(FlexibleCatalogViewSet)
+
+        self.assertEqual(set(response.data['results'][0]), {
+            'id',
+            'slug',
+            'name',
+            'course_count',
+            'active_course_count',
+            'membership_modified',
+        })
+
+
+class TestCourseCatalogs(ViewTestMixin, TestCase):
+    """Test the course catalogs endpoint."""
+
+    def test_catalogs_of_each_course(self):
+        """Every requested course is answered once, in the requested order."""
+        catalog = FixedCatalog.objects.create(name='Fixed', slug='fixed')
+        catalog.course_runs.add(self.courses[1])
+        course_ids = [self.courses[1].id, self.courses[0].id, self.courses[1].id]
+
+        response = self.get(CourseCatalogsViewSet, data={'course_id': course_ids})
+
+        self.assertEqual(response.data['results'], [
+            {'course_id': self.courses[1].id, 'catalog_ids': [catalog.pk]},
+            {'course_id': self.courses[0].id, 'catalog_ids': []},
+        ])
+
+    @override_settings(CP_API_MAX_PAGE_SIZE=2)
+    def test_invalid_requests(self):
+        """Missing, invalid or too many course keys are rejected."""
+        for data in ({}, {'course_id': 'invalid'}, {'course_id': [course.id for course in self.courses[:3]]}):
+            with self.subTest(data=data):
+                self.assertEqual(self.get(CourseCatalogsViewSet, data=data).status_code, 400)
+
+
+class TestMembershipEvents(ViewTestMixin, TestCase):
+    """Test the membership events feed."""
+
+    def test_events_since(self):
+        """Consumers read the events after the sequence number they send back, page by page."""
+        catalog = FixedCatalog.objects.create(name='Fixed', slug='fixed')
+        catalog.course_runs.add(*self.courses[:3])
+        # The first event is the creation of the catalog, then one per added course.
+        seqs = list(MembershipEvent.objects.order_by('seq').values_list('seq', flat=True))
+
+        response = self.get(MembershipEventsViewSet, data={'since': seqs[0], 'page_size': 2})
+
+        self.assertEqual(
+            [(event['seq'], event['event'], event['catalog_id']) for event in response.data['results']],
+            [(seq, MembershipEvent.COURSE_ADDED, str(catalog.pk)) for seq in seqs[1:3]],
+        )
+        self.assertEqual(response.data['since'], seqs[2])
+        self.assertEqual(QueryDict(urlparse(response.data['next']).query)['since'], str(seqs[2]))
+
+        response = self.get(MembershipEventsViewSet, data={'since': seqs[2], 'page_size': 2})
+
+        self.assertEqual([event['seq'] for event in response.data['results']], seqs[3:])
+        self.assertEqual(response.data['since'], seqs[3])
+        self.assertIsNone(response.data['next'])
+
+        with self.assertNumQueries(2):
+            response = self.get(MembershipEventsViewSet, data={'since': seqs[3]})
+
+        self.assertEqual((response.data['results'], response.data['since']), ([], seqs[3]))
+
+    def test_pruned_events_require_a_resync(self):
+        """Consumers behind the retained events are told to read the catalogs again."""
+        catalog = FixedCatalog.objects.create(name='Fixed', slug='fixed')
+        catalog.course_runs.add(*self.courses[:2])
+        seqs = list(MembershipEvent.objects.order_by('seq').values_list('seq', flat=True))
+        MembershipEvent.objects.filter(seq__lt=seqs[2]).delete()
+
+        response = self.get(MembershipEventsViewSet, data={'since': seqs[0]})
+
+        self.assertEqual(response.status_code, 410)
+        self.assertTrue(response.data['resync_required'])
+        self.assertEqual(response.data['since'], seqs[1])
+        self.assertEqual(self.get(MembershipEventsViewSet, data={'since': seqs[1]}).status_code, 200)
+
+    def test_invalid_since(self):
+        """Negative or non numeric sequence numbers are rejected."""
+        for since in ('-1', 'last'):
+            with self.subTest(since=since):
+                self.assertEqual(self.get(MembershipEventsViewSet, data={'since': since}).status_code, 400)
+
+
+class TestExport(ViewTestMixin, TestCase):
+    """Test the streaming export of a catalog."""
+
+    def setUp(self):
+        """Create a fixed catalog with some course runs."""
+        super().setUp()
+        self.catalog = FixedCatalog.objects.create(name='Fixed', slug='fixed')
+        self.catalog.course_runs.add(*self.courses[:3])
+
+    def export(self, export_format=None):
+        """Request the export of the catalog and return the response."""
+        data = {'export_format': export_format} if export_format else None
+        return self.get(FlexibleCatalogViewSet, action='export', data=data, pk=self.catalog.pk)
+
+    def test_ndjson(self):
+        """Every course overview is exported as a JSON object on its own line, in course key order."""
+        response = self.export()
+
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="fixed.ndjson"')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([row['id'] for row in rows], [course.id for course in self.courses[:3]])
+        self.assertEqual(set(rows[0]), {'id', 'display_name', 'org', 'start', 'end'})
+
+    @override_settings(CP_EXPORT_COURSE_FIELDS=['id', 'display_name'])
+    def test_csv(self):
+        """The CSV export starts with a header row with the configured fields."""
+        response = self.export('csv')
+
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(b''.join(response.streaming_content).decode().splitlines(), [
+            'id,display_name',
+            *(f'{course.id},{course.display_name}' for course in self.courses[:3]),
+        ])
+
+    def test_invalid_format(self):
+        """Unknown export formats are rejected."""
+        self.assertEqual(self.export('xml').status_code, 400)
+
+    def test_invalid_query_is_rejected_before_streaming(self):
+        """A dynamic catalog with an invalid stored query is answered with a 400 instead of a broken stream."""
+        self.catalog = DynamicCatalog.objects.create(name='Dynamic', slug='dynamic', query_string='{"org": "edX"}')
+        DynamicCatalog.objects.filter(pk=self.catalog.pk).update(query_string='[]')
+        clear_compiled_queries()
+
+        response = self.export()
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.streaming)
+
+    def test_composite_cycle_is_rejected_before_streaming(self):
+        """A composite catalog that contains itself is answered with a 400 instead of a broken stream."""
+        self.catalog = CompositeCatalog.objects.create(name='Composite', slug='composite')
+        CompositeCatalogChild.objects.bulk_create([CompositeCatalogChild(composite=self.catalog, child=self.catalog)])
+
+        response = self.export()
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('contains itself', response.data['detail'][0])
+
+    @override_settings(CP_EXPORT_CHUNK_SIZE=1)
+    def test_query_count(self):
+        """The export runs a fixed number of queries whatever the number of courses."""
+        with self.assertNumQueries(2):
+            b''.join(self.export().streaming_content)
+
+        self.catalog.course_runs.add(*self.courses)
+
+        with self.assertNumQueries(2):
+            b''.join(self.export().streaming_content)
+
+
+class TestConditionalGet(ViewTestMixin, TestCase):
+    """Test the ETag and Last-Modified validators of the catalog endpoints."""
+
+    def setUp(self):
+        super().setUp()
+        self.catalog = FixedCatalog.objects.create(name='Fixed', slug='fixed')
+        self.catalog.course_runs.add(self.courses[0])
+
+    def test_unchanged_catalog_is_not_modified(self):
+        """Sending back the ETag of an unchanged catalog returns 304 without serializing it."""
+        # The list only runs the ETag aggregate, the detail fetches the catalog and its course runs.
+        for action, kwargs, num_queries in (('list', {}, 1), ('retrieve', {'pk': self.catalog.pk}, 2)):
+            with self.subTest(action=action):
+                etag = self.get(FixedCatalogViewSet, action=action, **kwargs)['ETag']
+
+                with self.assertNumQueries(num_queries):
+                    response = self.get(
+                        FixedCatalogViewSet,
+                        action=action,
+                        headers={'HTTP_IF_NONE_MATCH': etag},
+                        **kwargs,
+                    )
+
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response['ETag'], etag)
+
+    def test_membership_change_updates_validators(self):
+        """Changing the courses of a catalog produces new validators."""
+        for action, kwargs in (('list', {}), ('retrieve', {'pk': self.catalog.pk})):
+            with self.subTest(action=action):
+                etag = self.get(FixedCatalogViewSet, action=action, **kwargs)['ETag']
+                self.catalog.course_runs.add(self.courses[1])
+
+                response = self.get(FixedCatalogViewSet, action=action, headers={'HTTP_IF_NONE_MATCH': etag}, **kwargs)
+
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response['ETag'], etag)
+
+    def test_representation_is_part_of_the_etag(self):
+        """Different query parameters select a different ETag."""
+        response = self.get(FlexibleCatalogViewSet)
+        expanded_response = self.get(FlexibleCatalogViewSet, data={'expand': 'courses'})
+
+        self.assertNotEqual(response['ETag'], expanded_response['ETag'])
+
+    def test_if_modified_since(self):
+        """Sending back the Last-Modified of an unchanged catalog returns 304, older copies are served in full."""
+        last_modified = self.get(FixedCatalogViewSet, action='retrieve', pk=self.catalog.pk)['Last-Modified']
+
+        response = self.get(
+            FixedCatalogViewSet,
+            action='retrieve',
+            headers={'HTTP_IF_MODIFIED_SINCE': last_modified},
+            pk=self.catalog.pk,
+        )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['Last-Modified'], last_modified)
+
+        response = self.get(
+            FixedCatalogViewSet,
+            action='retrieve',
+            headers={'HTTP_IF_MODIFIED_SINCE': http_date(parse_http_date(last_modified) - 1)},
+            pk=self.catalog.pk,
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_list_is_only_validated_by_etag(self):
+        """The list has no Last-Modified, and deleting a catalog produces a new ETag."""
+        other_catalog = FixedCatalog.objects.create(name='Other', slug='other')
+        response = self.get(FixedCatalogViewSet)
+        self.assertNotIn('Last-Modified', response)
+
+        other_catalog.delete()
+
+        response = self.get(FixedCatalogViewSet, headers={'HTTP_IF_NONE_MATCH': response['ETag']})
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,19 @@
+"""
+Django settings to check that the plugin migrations match its models.
+
+The migrations are enabled and the CourseOverview model comes from a stand-in
+of the edx-platform `course_overviews` app:
+
+    python manage.py makemigrations catalog_plugin --check --dry-run --settings=migration_settings
+"""
+from test_settings import *  # pylint: disable=wildcard-import, unused-wildcard-import
+
+MIGRATION_MODULES = {}
+INSTALLED_APPS = [*INSTALLED_APPS, 'catalog_plugin.tests.course_overviews']
+CP_COURSE_OLIVE_BACKEND = 'catalog_plugin.tests.course_overviews.models'
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+    },
+}